@@ -1,6 +1,6 @@
 from django.utils import timezone
-from django.core.cache import cache
-from .models import User
+from analytics import activity
+from . import presence
 
 class UpdateLastSeenMiddleware:
     def __init__(self, get_response):
@@ -8,13 +8,10 @@ class UpdateLastSeenMiddleware:
 
     def __call__(self, request):
         if request.user.is_authenticated:
-            cache_key = f'last_seen_update_{request.user.pk}'
-            last_update = cache.get(cache_key)
-            
+            # Buffered; accounts.presence writes it back in bulk
             now = timezone.now()
-            if not last_update or (now - last_update).seconds > 30:
-                User.objects.filter(pk=request.user.pk).update(last_seen=now)
-                cache.set(cache_key, now, 60)
+            presence.touch(request.user.pk, now)
+            activity.record(request.user.pk, timezone.localdate(now))
         
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
@@ -1,6 +1,5 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.utils import timezone
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
@@ -15,9 +14,8 @@ class User(AbstractUser):
     last_seen = models.DateTimeField(null=True, blank=True)
     
     def is_online(self):
-        if self.last_seen:
-            return (timezone.now() - self.last_seen) < timezone.timedelta(minutes=5)
-        return False
+        from . import presence
+        return presence.is_online(self)
 
     def is_admin(self):
         return self.user_type == 'admin'
@@ -0,0 +1,160 @@
+"""Online presence and the write-behind buffer for ``User.last_seen``.
+
+Presence is a heartbeat key per user that expires ONLINE_TIMEOUT after the
+last heartbeat: requests beat through ``touch``, open sockets through
+``connected`` and their pings. Whether a page of N users is online is a
+single ``get_many``. Going online, and closing the last socket, is pushed
+to the user's conversation partners.
+
+``last_seen`` is only persisted in bulk: the first request of each
+FLUSH_INTERVAL per user stores the timestamp in the cache and appends the
+user to that interval's dirty list, and a ``flush_last_seen`` job queued
+for the end of the interval writes every dirty user with one UPDATE.
+The job runs in the ``run_jobs`` worker, so the buffer has to live in a
+cache both processes share (settings.SHARED_CACHE). Without one, or with
+JOBS_ALWAYS_EAGER and so no worker to run the job later, each user's first
+request of an interval writes ``last_seen`` directly.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+ONLINE_TIMEOUT = 5 * 60
+FLUSH_INTERVAL = 30
+# How far back a flush looks for intervals nobody flushed (e.g. a lost job)
+MAX_PENDING_INTERVALS = 120
+BUFFER_TIMEOUT = 60 * 60 * 24
+FLUSH_BATCH_SIZE = 500
+
+FLUSHED_KEY = 'last_seen:flushed'
+
+
+def _key(user_id):
+    return f'last_seen:{user_id}'
+
+
+def _online_key(user_id):
+    return f'presence:{user_id}'
+
+
+def _sockets_key(user_id):
+    return f'presence:{user_id}:sockets'
+
+
+def _interval(now=None):
+    return int((now.timestamp() if now else time.time()) // FLUSH_INTERVAL)
+
+
+def _dirty_key(interval, slot=None):
+    return f'last_seen:dirty:{interval}' if slot is None else f'last_seen:dirty:{interval}:{slot}'
+
+
+def touch(user_id, now):
+    """Record that ``user_id`` was seen at ``now``; one cache op on most requests."""
+    interval = _interval(now)
+    timeout = FLUSH_INTERVAL * MAX_PENDING_INTERVALS
+    if not cache.add(f'last_seen:queued:{interval}:{user_id}', True, timeout):
+        return
+    cache.set(_key(user_id), now, BUFFER_TIMEOUT)
+    heartbeat(user_id)
+    if settings.JOBS_ALWAYS_EAGER or not settings.SHARED_CACHE:
+        # An eager job would run inside the interval it is meant to flush, and a worker
+        # with its own cache would find nothing to flush: write through instead
+        from .models import User
+        User.objects.filter(pk=user_id).update(last_seen=now)
+        return
+    cache.add(_dirty_key(interval), 0, timeout)
+    slot = cache.incr(_dirty_key(interval))
+    cache.set(_dirty_key(interval, slot), user_id, timeout)
+    if slot == 1:
+        from jobs.queue import enqueue
+        from .tasks import flush_last_seen
+        end = datetime.fromtimestamp((interval + 1) * FLUSH_INTERVAL, tz=dt_timezone.utc)
+        enqueue(flush_last_seen, run_at=end)
+
+
+def flush(now=None):
+    """Write the buffered timestamps of every closed interval. Returns the users written."""
+    from .models import User
+
+    current = _interval(now)
+    first = max((cache.get(FLUSHED_KEY) or 0) + 1, current - MAX_PENDING_INTERVALS)
+    user_ids = set()
+    for interval in range(first, current):
+        count = cache.get(_dirty_key(interval)) or 0
+        slots = [_dirty_key(interval, slot) for slot in range(1, count + 1)]
+        user_ids.update(cache.get_many(slots).values())
+
+    buffered = cache.get_many([_key(user_id) for user_id in user_ids])
+    users = [User(pk=user_id, last_seen=buffered[_key(user_id)]) for user_id in user_ids if _key(user_id) in buffered]
+    # bulk_update writes each batch as a single UPDATE ... CASE
+    User.objects.bulk_update(users, ['last_seen'], batch_size=FLUSH_BATCH_SIZE)
+    # Only once the write is in: a failed flush leaves its intervals for the retry
+    transaction.on_commit(lambda: cache.set(FLUSHED_KEY, current - 1, None))
+    return len(users)
+
+
+def heartbeat(user_id):
+    """Keep ``user_id`` online for another ONLINE_TIMEOUT."""
+    if cache.add(_online_key(user_id), True, ONLINE_TIMEOUT):
+        from dashboard.realtime import push_presence
+        push_presence(user_id, True)
+    else:
+        cache.touch(_online_key(user_id), ONLINE_TIMEOUT)
+
+
+def connected(user_id):
+    cache.add(_sockets_key(user_id), 0, ONLINE_TIMEOUT)
+    cache.incr(_sockets_key(user_id))
+    heartbeat(user_id)
+
+
+def ping(user_id):
+    cache.touch(_sockets_key(user_id), ONLINE_TIMEOUT)
+    heartbeat(user_id)
+
+
+def disconnected(user_id):
+    """Drop ``user_id`` offline straight away when their last socket closes."""
+    try:
+        remaining = cache.decr(_sockets_key(user_id))
+    except ValueError:
+        return
+    if remaining <= 0:
+        cache.delete_many([_online_key(user_id), _sockets_key(user_id)])
+        from dashboard.realtime import push_presence
+        push_presence(user_id, False)
+
+
+def online_ids(user_ids):
+    """Which of ``user_ids`` are online, in one cache round trip."""
+    user_ids = list(user_ids)
+    found = cache.get_many([_online_key(user_id) for user_id in user_ids])
+    return {user_id for user_id in user_ids if _online_key(user_id) in found}
+
+
+def is_online(user):
+    if not hasattr(user, '_online'):
+        user._online = cache.get(_online_key(user.pk)) is not None
+    return user._online
+
+
+def last_seen(user):
+    """The freshest known last-seen time of ``user``: buffered, else the stored one."""
+    if not hasattr(user, '_buffered_last_seen'):
+        user._buffered_last_seen = cache.get(_key(user.pk))
+    return user._buffered_last_seen or user.last_seen
+
+
+def prefetch(users):
+    """Load presence and buffered last-seen times of ``users`` in one cache round trip."""
+    users = list(users)
+    keys = [key for user in users for key in (_online_key(user.pk), _key(user.pk))]
+    found = cache.get_many(keys)
+    for user in users:
+        user._online = _online_key(user.pk) in found
+        user._buffered_last_seen = found.get(_key(user.pk))
+    return users
@@ -0,0 +1,7 @@
+from jobs.queue import task
+from . import presence
+
+
+@task
+def flush_last_seen():
+    presence.flush()
@@ -1,3 +1,110 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from . import presence
+from .models import User
+
+
+@override_settings(SHARED_CACHE=True, JOBS_ALWAYS_EAGER=False)
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'user{i}', password='password123') for i in range(3)]
+
+    def test_requests_buffer_instead_of_updating(self):
+        self.client.force_login(self.users[0])
+        for _ in range(3):
+            self.client.get('/')
+        self.assertIsNone(User.objects.get(id=self.users[0].id).last_seen)
+        self.assertTrue(User.objects.get(id=self.users[0].id).is_online())
+        # One flush job per interval, however many users and requests
+        self.assertEqual(Job.objects.filter(name='accounts.tasks.flush_last_seen').count(), 1)
+
+    def test_flush_writes_closed_intervals_in_one_update(self):
+        now = timezone.now()
+        for user in self.users:
+            presence.touch(user.id, now)
+            presence.touch(user.id, now)
+
+        # The interval is still open
+        self.assertEqual(presence.flush(now), 0)
+        later = now + timedelta(seconds=presence.FLUSH_INTERVAL)
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(presence.flush(later), 3)
+        self.assertEqual(set(User.objects.values_list('last_seen', flat=True)), {now})
+        # Already flushed intervals aren't written again
+        self.assertEqual(presence.flush(later), 0)
+
+    def test_failed_flush_is_retried(self):
+        now = timezone.now()
+        presence.touch(self.users[0].id, now)
+        later = now + timedelta(seconds=presence.FLUSH_INTERVAL)
+        with mock.patch.object(User.objects, 'bulk_update', side_effect=RuntimeError), \
+                self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                presence.flush(later)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(presence.flush(later), 1)
+        self.assertEqual(User.objects.get(id=self.users[0].id).last_seen, now)
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    def test_eager_jobs_write_through(self):
+        now = timezone.now()
+        presence.touch(self.users[0].id, now)
+        self.assertEqual(User.objects.get(id=self.users[0].id).last_seen, now)
+        self.assertFalse(Job.objects.exists())
+        # Once per interval
+        with self.assertNumQueries(0):
+            presence.touch(self.users[0].id, now)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_per_process_cache_writes_through(self):
+        now = timezone.now()
+        presence.touch(self.users[0].id, now)
+        self.assertFalse(Job.objects.exists())
+        # What the worker sees: a cache this process never wrote to
+        cache.clear()
+        later = now + timedelta(seconds=presence.FLUSH_INTERVAL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(presence.flush(later), 0)
+        self.assertEqual(User.objects.get(id=self.users[0].id).last_seen, now)
+
+    def test_heartbeats_expire_and_sockets_go_offline(self):
+        a, b, c = self.users
+        presence.touch(a.id, timezone.now())
+        presence.connected(b.id)
+        presence.connected(b.id)
+        self.assertEqual(presence.online_ids([a.id, b.id, c.id]), {a.id, b.id})
+
+        # Closing one of two tabs keeps b online, closing the last drops them
+        presence.disconnected(b.id)
+        self.assertEqual(presence.online_ids([b.id]), {b.id})
+        presence.disconnected(b.id)
+        self.assertEqual(presence.online_ids([b.id]), set())
+
+        cache.delete(f'presence:{a.id}')  # what the TTL does
+        self.assertFalse(User.objects.get(id=a.id).is_online())
+
+    def test_going_online_is_pushed_to_partners(self):
+        from clubs.models import Message
+        a, b, c = self.users
+        Message.objects.create(sender=a, receiver=b, content='hi')
+        with mock.patch('dashboard.realtime.push_to_users') as push:
+            presence.connected(a.id)
+            presence.ping(a.id)
+        push.assert_called_once_with([b.id], {'type': 'presence', 'user_id': a.id, 'online': True})
+
+    def test_prefetch_resolves_a_page_in_one_round_trip(self):
+        presence.touch(self.users[0].id, timezone.now())
+        users = list(User.objects.order_by('id'))
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            presence.prefetch(users)
+        self.assertEqual(get_many.call_count, 1)
+        with mock.patch.object(cache, 'get') as get:
+            self.assertEqual([user.is_online() for user in users], [True, False, False])
+        get.assert_not_called()
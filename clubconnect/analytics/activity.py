@@ -0,0 +1,65 @@
+"""Daily active users.
+
+The middleware calls ``record`` on every authenticated request. A cache
+``add`` lets only the first request of the day per user (per cache) through
+to the database, and the insert ignores the duplicate a second cache or
+process might race in, so the log holds exactly one row per user per day.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import UserActivity
+
+RETENTION_DAYS = (1, 7, 30)
+
+
+def record(user_id, day=None):
+    day = day or timezone.localdate()
+    # Lives a little past the day so a late request can't reinsert it
+    if cache.add(f'active:{day.isoformat()}:{user_id}', True, 60 * 60 * 25):
+        UserActivity.objects.bulk_create([UserActivity(day=day, user_id=user_id)], ignore_conflicts=True)
+
+
+def daily_active(start, end):
+    """``{day: active users}`` for ``start``..``end``."""
+    return dict(
+        UserActivity.objects.filter(day__range=(start, end))
+        .values_list('day').annotate(count=Count('id')).order_by()
+    )
+
+
+def active_users(on=None):
+    """Distinct users active on ``on``, the week and the 30 days ending then."""
+    on = on or timezone.localdate()
+    return UserActivity.objects.filter(day__range=(on - timedelta(days=29), on)).aggregate(
+        dau=Count('user', distinct=True, filter=Q(day=on)),
+        wau=Count('user', distinct=True, filter=Q(day__gte=on - timedelta(days=6))),
+        mau=Count('user', distinct=True),
+    )
+
+
+def retention(on=None, days=RETENTION_DAYS):
+    """Share of the users active N days before ``on`` who were active on ``on``.
+
+    ``on`` defaults to yesterday, the last complete day. None where the
+    cohort is empty.
+    """
+    on = on or timezone.localdate() - timedelta(days=1)
+    cohorts = {n: on - timedelta(days=n) for n in days}
+    returned = UserActivity.objects.filter(user_id=OuterRef('user_id'), day=on)
+    counts = (
+        UserActivity.objects.filter(day__in=cohorts.values())
+        .annotate(returned=Exists(returned))
+        .aggregate(**{
+            key: Count('id', filter=Q(day=day, **extra))
+            for n, day in cohorts.items()
+            for key, extra in ((f'cohort_{n}', {}), (f'returned_{n}', {'returned': True}))
+        })
+    )
+    return {
+        n: counts[f'returned_{n}'] / counts[f'cohort_{n}'] if counts[f'cohort_{n}'] else None
+        for n in days
+    }
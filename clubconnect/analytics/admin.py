@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import DailyStats, UserActivity
+
+admin.site.register(DailyStats)
+admin.site.register(UserActivity)
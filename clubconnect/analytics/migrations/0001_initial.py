@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:23
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from analytics import rollups
+    rollups.rebuild(apps=apps)
+    # Sign-ins were never recorded; last_seen is the closest history there is
+    DailyStats = apps.get_model('analytics', 'DailyStats')
+    signins = rollups.daily_counts(apps.get_model('accounts', 'User'), 'last_seen')
+    signins.pop(None, None)
+    DailyStats.objects.bulk_create(
+        [DailyStats(date=day, signins=count) for day, count in signins.items()],
+        update_conflicts=True, unique_fields=['date'], update_fields=['signins'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0002_user_last_seen'),
+        ('clubs', '0011_club_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('signins', models.IntegerField(default=0)),
+                ('signups', models.IntegerField(default=0)),
+                ('clubs', models.IntegerField(default=0)),
+                ('events', models.IntegerField(default=0)),
+                ('announcements', models.IntegerField(default=0)),
+                ('memberships', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'daily stats',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    # Only the last active day of each user survived in last_seen, plus the day they joined
+    User = apps.get_model('accounts', 'User')
+    UserActivity = apps.get_model('analytics', 'UserActivity')
+    rows = []
+    for user_id, date_joined, last_seen in User.objects.values_list('id', 'date_joined', 'last_seen').iterator():
+        days = {timezone.localdate(date_joined)}
+        if last_seen:
+            days.add(timezone.localdate(last_seen))
+        rows.extend(UserActivity(day=day, user_id=user_id) for day in days)
+    UserActivity.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user activity',
+                'indexes': [models.Index(fields=['user', 'day'], name='activity_user_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'user'), name='activity_day_user_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import models
+
+
+class DailyStats(models.Model):
+    """One row of site activity per day, kept current by analytics.rollups."""
+    date = models.DateField(unique=True)
+    signins = models.IntegerField(default=0)
+    signups = models.IntegerField(default=0)
+    clubs = models.IntegerField(default=0)
+    events = models.IntegerField(default=0)
+    announcements = models.IntegerField(default=0)
+    memberships = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'daily stats'
+
+    def __str__(self):
+        return str(self.date)
+
+
+class UserActivity(models.Model):
+    """A user was active on ``day``. Written at most once per user per day."""
+    day = models.DateField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='activity_days')
+
+    class Meta:
+        constraints = [
+            # Also the index for per-day counts
+            models.UniqueConstraint(fields=['day', 'user'], name='activity_day_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='activity_user_day_idx'),
+        ]
+        verbose_name_plural = 'user activity'
+
+    def __str__(self):
+        return f'{self.user_id} on {self.day}'
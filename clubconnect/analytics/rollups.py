@@ -0,0 +1,103 @@
+"""Daily rollups behind the admin analytics.
+
+Every counter in DailyStats except ``signins`` counts the rows of a source
+table created on that day and still present: signals add one when a row is
+created and take one away from its creation day when it is deleted. Summing
+a column over all days therefore gives the table's current size, and a
+range of days is a single indexed read of at most a year of rows.
+
+Sign-ins are counted as they happen (``user_logged_in``); they have no
+source table to recount, so ``rebuild`` leaves them alone.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyStats
+
+SIGNINS = 'signins'
+
+# Counter -> (model, datetime field that dates its rows)
+SOURCES = {
+    'signups': ('accounts.User', 'date_joined'),
+    'clubs': ('clubs.Club', 'created_at'),
+    'events': ('clubs.Event', 'created_at'),
+    'announcements': ('clubs.Announcement', 'created_at'),
+    'memberships': ('clubs.Membership', 'joined_at'),
+}
+
+COUNTERS = (SIGNINS, *SOURCES)
+
+
+def bump(counter, when=None, delta=1):
+    """Add ``delta`` to ``counter`` on the day of ``when`` (default: today)."""
+    day = timezone.localdate(when) if when else timezone.localdate()
+    rows = DailyStats.objects.filter(date=day)
+    if not rows.update(**{counter: F(counter) + delta}):
+        # First write of the day; a concurrent creator is fine, the update below still lands
+        DailyStats.objects.bulk_create([DailyStats(date=day)], ignore_conflicts=True)
+        rows.update(**{counter: F(counter) + delta})
+
+
+def daily_counts(model, field, start=None, end=None):
+    """``{date: rows created that day}`` for ``model``, grouped in the database."""
+    rows = model.objects.all()
+    if start:
+        rows = rows.filter(**{f'{field}__date__gte': start})
+    if end:
+        rows = rows.filter(**{f'{field}__date__lte': end})
+    return dict(
+        rows.annotate(day=TruncDate(field)).values_list('day').annotate(count=Count('pk')).order_by()
+    )
+
+
+def rebuild(start=None, end=None, apps=None):
+    """Recount the source counters for ``start``..``end`` (default: all history).
+
+    Migrations pass their historical ``apps``. Returns the number of days written.
+    """
+    from django.apps import apps as global_apps
+    apps = apps or global_apps
+    stats_model = apps.get_model('analytics', 'DailyStats')
+
+    counts = {
+        counter: daily_counts(apps.get_model(label), field, start, end)
+        for counter, (label, field) in SOURCES.items()
+    }
+    days = set().union(*counts.values())
+    if start is None:
+        start = min(days, default=timezone.localdate())
+    if end is None:
+        end = timezone.localdate()
+
+    rows = []
+    day = start
+    while day <= end:
+        rows.append(stats_model(date=day, **{counter: counts[counter].get(day, 0) for counter in SOURCES}))
+        day += timedelta(days=1)
+    stats_model.objects.bulk_create(
+        rows, batch_size=500,
+        update_conflicts=True, unique_fields=['date'], update_fields=list(SOURCES),
+    )
+    return len(rows)
+
+
+def series(start, end):
+    """Per-day counters for ``start``..``end`` inclusive, zero-filled, in one query."""
+    stored = {
+        row['date']: row
+        for row in DailyStats.objects.filter(date__range=(start, end)).values('date', *COUNTERS)
+    }
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return days, {
+        counter: [stored[day][counter] if day in stored else 0 for day in days]
+        for counter in COUNTERS
+    }
+
+
+def totals():
+    """Current size of each source table, summed from the rollups in one query."""
+    sums = DailyStats.objects.aggregate(**{counter: Sum(counter) for counter in SOURCES})
+    return {counter: value or 0 for counter, value in sums.items()}
@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import rollups
+
+
+@receiver(user_logged_in)
+def count_signin(sender, user, **kwargs):
+    rollups.bump(rollups.SIGNINS)
+
+
+def _connect(counter, label, field):
+    def created(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            rollups.bump(counter, getattr(instance, field))
+
+    def deleted(sender, instance, **kwargs):
+        rollups.bump(counter, getattr(instance, field), -1)
+
+    model = apps.get_model(label)
+    post_save.connect(created, sender=model, weak=False, dispatch_uid=f'analytics_{counter}_created')
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f'analytics_{counter}_deleted')
+
+
+for counter, (label, field) in rollups.SOURCES.items():
+    _connect(counter, label, field)
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Announcement, Club, Event, Membership
+from . import activity, rollups
+from .models import DailyStats, UserActivity
+
+
+class DailyStatsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='password123', user_type='admin')
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        now = timezone.now()
+        self.event = Event.objects.create(club=self.club, title='Open', description='', location='Hall',
+                                          start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=1))
+        Announcement.objects.create(title='Hello', content='')
+        Membership.objects.create(user=self.admin, club=self.club, status='approved')
+
+    def today(self):
+        return DailyStats.objects.get(date=timezone.localdate())
+
+    def test_signals_keep_today_current(self):
+        stats = self.today()
+        self.assertEqual(
+            (stats.signups, stats.clubs, stats.events, stats.announcements, stats.memberships),
+            (1, 1, 1, 1, 1),
+        )
+        self.club.delete()
+        stats = self.today()
+        self.assertEqual((stats.clubs, stats.events, stats.memberships), (0, 0, 0))
+
+    def test_login_counts_a_signin(self):
+        self.client.login(username='admin', password='password123')
+        self.assertEqual(self.today().signins, 1)
+
+    def test_rebuild_matches_signals(self):
+        # Deletions are counted against the day the row was created
+        old = User.objects.create_user(username='old', password='password123')
+        User.objects.filter(id=old.id).update(date_joined=timezone.now() - timedelta(days=3))
+        DailyStats.objects.update(signups=0, clubs=0, events=0, announcements=0, memberships=0)
+
+        rollups.rebuild()
+        self.assertEqual(rollups.totals(), {'signups': 2, 'clubs': 1, 'events': 1, 'announcements': 1, 'memberships': 1})
+        day = timezone.localdate() - timedelta(days=3)
+        self.assertEqual(DailyStats.objects.get(date=day).signups, 1)
+        # Days without activity get a row too, so ranges read back contiguous
+        self.assertEqual(DailyStats.objects.count(), 4)
+
+    def test_endpoint_reads_a_range_in_constant_queries(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin_analytics_data'))  # records last_seen
+        # Session and user lookups, rollup range, active users per day, DAU/WAU/MAU,
+        # retention, rollup totals, upcoming events
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('admin_analytics_data'), {'days': 365})
+        data = response.json()
+        self.assertEqual(len(data['signup_data']), 365)
+        self.assertEqual(data['signup_data'][-1], 1)
+        self.assertEqual((data['total_users'], data['total_clubs'], data['upcoming_events']), (1, 1, 1))
+
+        today = timezone.localdate()
+        response = self.client.get(reverse('admin_analytics_data'), {
+            'start': (today - timedelta(days=2)).isoformat(), 'end': today.isoformat(),
+        })
+        self.assertEqual(response.json()['signin_labels'], [
+            (today - timedelta(days=i)).strftime('%b %d') for i in (2, 1, 0)
+        ])
+
+
+class UserActivityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='password123') for i in range(4)
+        ]
+
+    def log(self, user, days_ago):
+        UserActivity.objects.create(user=user, day=self.today - timedelta(days=days_ago))
+
+    def test_requests_record_one_row_per_day(self):
+        self.client.force_login(self.users[0])
+        with self.assertNumQueries(1):
+            activity.record(self.users[1].id)
+        with self.assertNumQueries(0):
+            activity.record(self.users[1].id)
+        # A cold cache costs one ignored insert, not a duplicate row
+        cache.clear()
+        activity.record(self.users[1].id)
+        for _ in range(3):
+            self.client.get('/')
+        self.assertEqual(
+            sorted(UserActivity.objects.values_list('user__username', 'day')),
+            [('user0', self.today), ('user1', self.today)],
+        )
+
+    def test_earlier_days_survive_later_activity(self):
+        self.log(self.users[0], 3)
+        self.log(self.users[0], 0)
+        self.assertEqual(activity.daily_active(self.today - timedelta(days=3), self.today), {
+            self.today - timedelta(days=3): 1, self.today: 1,
+        })
+
+    def test_active_users_and_retention(self):
+        a, b, c, d = self.users
+        for user, days_ago in ((a, 0), (a, 1), (a, 2), (b, 2), (b, 7), (c, 20), (d, 40)):
+            self.log(user, days_ago)
+        self.assertEqual(activity.active_users(), {'dau': 1, 'wau': 2, 'mau': 3})
+        # Of a and b, active two days ago, only a was back yesterday; b wasn't back after six days
+        self.assertEqual(activity.retention(days=(1, 6, 30)), {1: 0.5, 6: 0.0, 30: None})
@@ -0,0 +1,179 @@
+"""Keyset (seek) pagination.
+
+Instead of ``OFFSET n``, each page starts from the ordering values of the
+last row the client saw, so the database seeks straight to it through an
+index and page 1,000 costs the same as page 1. Rows inserted or deleted
+between requests don't shift the pages either.
+
+The ordering must be total: the primary key is appended as a tie-breaker
+unless the ordering already ends with it. Ordering fields must not be NULL.
+
+Cursors are opaque to clients: a url-safe base64 JSON list of the boundary
+values plus the direction to read in.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Default cap for estimated totals: counting stops once this many rows are seen
+COUNT_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder drops microseconds, which would break the seek
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f'Cannot use {type(value).__name__} in a cursor')
+
+
+def encode_cursor(values, backwards=False):
+    payload = json.dumps(['p' if backwards else 'n', list(values)], default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(values, backwards)`` for a cursor made by encode_cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values, direction == 'p'
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, has_next, has_previous, count=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+        # Only set when the paginator was asked to count
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def count_is_estimate(self):
+        limit = self.paginator.count_limit
+        return self.count is not None and limit is not None and self.count > limit
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(self.paginator.key(self.object_list[-1]))
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(self.paginator.key(self.object_list[0]), backwards=True)
+        return None
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by ``ordering`` (field names, ``-`` for descending).
+
+    ``count`` controls the total: ``None`` skips it, ``'exact'`` runs a full
+    COUNT, and ``'estimate'`` counts at most ``count_limit`` rows, so the
+    total reads "1000+" on big tables without scanning them.
+    """
+
+    def __init__(self, queryset, ordering, per_page, count=None, count_limit=COUNT_LIMIT):
+        ordering = list(ordering)
+        pk = queryset.model._meta.pk
+        if ordering[-1].lstrip('-') not in ('pk', pk.name, pk.attname):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        self.queryset = queryset
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.per_page = per_page
+        self.count_mode = count
+        self.count_limit = count_limit if count == 'estimate' else None
+
+    def key(self, row):
+        """The ordering values of ``row`` (a model instance or a values() dict)."""
+        if isinstance(row, dict):
+            return [row['id' if field == 'pk' else field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def _seek(self, values, backwards):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), per-column direction
+        condition = Q()
+        for i, ordering in enumerate(self.ordering):
+            descending = ordering.startswith('-') != backwards
+            step = Q(**{f'{self.fields[i]}__{"lt" if descending else "gt"}': values[i]})
+            for field, value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{field: value})
+            condition |= step
+        return condition
+
+    def page_from(self, values=None, backwards=False):
+        """The page after ``values`` (or before them when ``backwards``)."""
+        queryset = self.queryset
+        if values is not None:
+            if len(values) != len(self.fields):
+                raise InvalidCursor(values)
+            try:
+                queryset = queryset.filter(self._seek(values, backwards))
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidCursor(values)
+        ordering = self.ordering
+        if backwards:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        return KeysetPage(rows, self, has_next, has_previous, self.count())
+
+    def page(self, cursor=None):
+        """The page a client cursor points at; the first page when it is empty."""
+        if not cursor:
+            return self.page_from()
+        values, backwards = decode_cursor(cursor)
+        return self.page_from(values, backwards)
+
+    def count(self):
+        if self.count_mode == 'exact':
+            return self.queryset.count()
+        if self.count_mode == 'estimate':
+            return self.queryset.order_by()[:self.count_limit + 1].count()
+        return None
+
+
+def paginate(request, queryset, ordering, per_page, param='cursor', **kwargs):
+    """Page ``queryset`` by the cursor in ``request.GET``; a bad cursor means page one."""
+    paginator = KeysetPaginator(queryset, ordering, per_page, **kwargs)
+    try:
+        return paginator.page(request.GET.get(param))
+    except InvalidCursor:
+        return paginator.page()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,6 +35,7 @@ CSRF_TRUSTED_ORIGINS = ['https://helloworld-junj.onrender.com']
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -41,10 +43,17 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
+    'channels',
+
     'accounts',
     'clubs',
     'dashboard',
     'sitetheme',
+    'jobs',
+    'search',
+    'analytics',
+    'profiling',
+    'feed',
 ]
 
 MIDDLEWARE = [
@@ -92,6 +101,29 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
 WSGI_APPLICATION = 'clubconnect.wsgi.application'
+# Served by daphne (`python manage.py runserver`, or `daphne clubconnect.asgi:application`).
+# With REDIS_URL set, run `python manage.py run_jobs` next to it: notifications
+# and last-seen flushes are background jobs (see JOBS_ALWAYS_EAGER below).
+ASGI_APPLICATION = 'clubconnect.asgi.application'
+
+# Channel layer used to push chat messages and badge counts over WebSockets.
+# The in-memory layer only fans out within a single process; set REDIS_URL
+# when running more than one worker so every worker sees every event.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 
 # Database
@@ -105,6 +137,62 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Unread badge counters and other shared state live here. The local-memory
+# cache is per process, so use Redis (REDIS_URL) when running several workers.
+# Signal invalidation only reaches the process that saved the change, so
+# permission data (clubs.roles) is only cached when the cache is shared.
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+SHARED_CACHE = bool(REDIS_URL)
+
+
+# Background jobs
+# Notification fan-outs and last-seen flushes are queued in the database and
+# run by `python manage.py run_jobs`, which has to run as its own process
+# next to the web server: without it they are never delivered. A worker's
+# badge counters and socket pushes only reach the web server through Redis,
+# so without REDIS_URL jobs run inline (eagerly) by default.
+# JOBS_ALWAYS_EAGER=1/0 overrides that.
+
+JOBS_ALWAYS_EAGER = os.environ.get('JOBS_ALWAYS_EAGER', '0' if REDIS_URL else '1') == '1'
+JOBS_MAX_ATTEMPTS = 5
+
+
+# Search
+# The FTS5 index only exists on SQLite; use 'search.backends.DatabaseBackend'
+# (unindexed icontains matching) on other databases.
+
+SEARCH_BACKEND = 'search.backends.SqliteFTSBackend'
+
+
+# Profiling
+# PROFILING=1 installs ProfilingMiddleware, which records query counts,
+# duplicate queries, DB/render time and latency per view for the staff
+# report at /profiling/. PROFILING_SAMPLE_RATE is the share of requests run
+# under cProfile; the slowest of those keep their profile.
+
+PROFILING = os.environ.get('PROFILING') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.05'))
+
+if PROFILING:
+    MIDDLEWARE.insert(0, 'profiling.middleware.ProfilingMiddleware')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
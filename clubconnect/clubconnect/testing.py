@@ -0,0 +1,358 @@
+"""Test helpers shared by the apps' test suites."""
+import json
+import os
+import random
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.template import engines
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from feed import stream
+from clubs import surveys
+from clubs.models import (
+    Announcement, BroadcastNotification, Club, ClubFeedback, ClubMeeting, ClubPost, Conversation, Event,
+    EventAttendance, MemberPoints, Membership, MentorSession, Message, Notification, Survey, SurveyQuestion,
+    SurveyResponse,
+)
+
+BATCH_SIZE = 5000
+
+
+class RenderQueryCountMixin:
+    """Count the queries a template costs when rendered with every context processor."""
+
+    def render_with_queries(self, template, user=None, context=None, path='/'):
+        """Render ``template`` (a name or a template string) for ``user``.
+
+        Returns ``(output, queries)`` where ``queries`` is the list of SQL
+        statements the render executed, context processors included.
+        """
+        request = RequestFactory().get(path)
+        request.user = user or AnonymousUser()
+        engine = engines['django']
+        if '{' in template or '\n' in template:
+            compiled = engine.from_string(template)
+        else:
+            compiled = engine.get_template(template)
+
+        with CaptureQueriesContext(connection) as captured:
+            output = compiled.render(context or {}, request)
+        return output, [query['sql'] for query in captured.captured_queries]
+
+    def assertRenderQueries(self, num, template, user=None, context=None, path='/'):
+        output, queries = self.render_with_queries(template, user, context, path)
+        self.assertEqual(
+            len(queries), num,
+            f"Rendering {template!r} ran {len(queries)} queries, expected {num}:\n" + '\n'.join(queries),
+        )
+        return output
+
+
+class PerfWorld:
+    """A dataset for query-budget tests, seeded in two steps.
+
+    ``seed`` creates the users and objects the routes are requested with;
+    ``grow`` then piles more rows onto those same objects (members, messages,
+    notifications, posts, responses, ...) and adds thousands of unrelated
+    users, clubs, messages and notifications. A view whose query count
+    changes between the two has an N+1.
+    """
+
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.now = timezone.now()
+        self.password = make_password('password123')
+
+    def users(self, prefix, count, **fields):
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', password=self.password, **fields) for i in range(count)],
+            batch_size=BATCH_SIZE,
+        )
+        return list(User.objects.filter(username__startswith=prefix).order_by('id'))
+
+    def seed(self):
+        self.admin = User.objects.create_user(username='admin', password='password123', user_type='admin', is_staff=True)
+        self.founder = User.objects.create_user(username='founder', password='password123', user_type='founder')
+        self.student = User.objects.create_user(username='student', password='password123')
+        self.applicant = User.objects.create_user(username='applicant', password='password123')
+
+        self.club = Club.objects.create(name='Robotics Club', short_description='Robots', long_description='We build robots',
+                                        domain_tags='Engineering, AI', president=self.founder)
+        self.club.founders.add(self.founder)
+        self.other_club = Club.objects.create(name='Chess Club', short_description='Chess', long_description='',
+                                              domain_tags='Games')
+        Membership.objects.create(user=self.student, club=self.club, status='approved')
+        self.pending = Membership.objects.create(user=self.applicant, club=self.club, status='pending')
+
+        self.event = Event.objects.create(club=self.club, title='Build night', description='', location='Lab',
+                                          qr_code='event_qr_codes/build-night.png',
+                                          start_time=self.now + timedelta(days=2), end_time=self.now + timedelta(days=2, hours=2))
+        EventAttendance.objects.create(event=self.event, user=self.student)
+        self.post = ClubPost.objects.create(club=self.club, author=self.founder, title='Welcome', content='Hello')
+        self.post.likes.add(self.student)
+        MemberPoints.objects.create(user=self.student, club=self.club, points=5)
+        self.club_announcement = Announcement.objects.create(club=self.club, author=self.founder, title='Kickoff', content='')
+        self.announcement = Announcement.objects.create(author=self.admin, title='Welcome week', content='')
+
+        self.survey = Survey.objects.create(club=self.club, creator=self.founder, title='Feedback', description='')
+        self.questions = [
+            SurveyQuestion.objects.create(survey=self.survey, question_text='Rating?', question_type='rating', order=1),
+            SurveyQuestion.objects.create(survey=self.survey, question_text='Pick', question_type='choice',
+                                          choices='A,B,C', order=2),
+            SurveyQuestion.objects.create(survey=self.survey, question_text='Thoughts?', question_type='text', order=3),
+        ]
+        self.feedback = ClubFeedback.objects.create(club=self.club, student=self.student, title='More events', description='')
+        self.mentor_session = MentorSession.objects.create(club=self.club, student=self.student, mentor_topic='ROS',
+                                                           description='', preferred_date=self.now + timedelta(days=3))
+        self.meeting = ClubMeeting.objects.create(club=self.club, title='Standup', description='', created_by=self.founder,
+                                                  scheduled_time=self.now + timedelta(hours=1))
+        self.live_meeting = ClubMeeting.objects.create(club=self.club, title='Live', description='', created_by=self.founder,
+                                                       scheduled_time=self.now, status='started', is_active=True,
+                                                       meeting_link=f'/clubs/{self.club.id}/meeting/live-room/')
+
+        self.message = Message.objects.create(sender=self.student, receiver=self.founder, content='Hi!')
+        Message.objects.create(sender=self.founder, receiver=self.student, content='Welcome', club=self.club)
+        self.notification = Notification.objects.create(user=self.student, notification_type='general', title='Hi', message='')
+        self.broadcast = BroadcastNotification.objects.create(scope='all', notification_type='general', title='News', message='')
+
+    def grow(self):
+        scale = self.scale
+        rng = random.Random(42)
+        now = self.now
+
+        crowd = self.users('crowd', 2000 * scale)
+        crowd_ids = [user.id for user in crowd]
+        Club.objects.bulk_create([
+            Club(name=f'Club {i}', short_description='', long_description='', domain_tags='')
+            for i in range(200 * scale)
+        ])
+        clubs = list(Club.objects.filter(name__startswith='Club ').values_list('id', flat=True))
+
+        members = crowd[:100 * scale]
+        Membership.objects.bulk_create(
+            [Membership(user=user, club=self.club, status='approved') for user in members]
+            + [Membership(user=user, club=self.club, status='pending') for user in crowd[-20:]]
+            + [Membership(user=self.student, club_id=club_id, status='approved') for club_id in clubs[:20]]
+            + [Membership(user_id=rng.choice(crowd_ids), club_id=rng.choice(clubs), status='approved')
+               for _ in range(2000 * scale)],
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        MemberPoints.objects.bulk_create([
+            MemberPoints(user=user, club=self.club, points=rng.randrange(100)) for user in members
+        ])
+        self.club.favorited_by.add(*members[:50])
+        self.student.favorite_clubs.add(*clubs[:10])
+        for club_id in clubs[:5]:
+            Club.founders.through.objects.create(club_id=club_id, user_id=self.founder.id)
+
+        Event.objects.bulk_create([
+            Event(club=self.club, title=f'Event {i}', description='', location='Hall',
+                  start_time=now + timedelta(days=i % 14, hours=1), end_time=now + timedelta(days=i % 14, hours=3))
+            for i in range(50)
+        ])
+        events = list(Event.objects.filter(club=self.club).values_list('id', flat=True))
+        EventAttendance.objects.bulk_create([
+            EventAttendance(event_id=event_id, user=user, checked_in_via_qr=rng.random() < 0.5)
+            for event_id in events for user in rng.sample(members, 30)
+        ] + [EventAttendance(event_id=event_id, user=self.student) for event_id in events[:20]],
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+        ClubPost.objects.bulk_create([
+            ClubPost(club=self.club, author=rng.choice([self.founder, *members[:5]]), title=f'Post {i}', content='')
+            for i in range(50)
+        ])
+        Like = ClubPost.likes.through
+        Like.objects.bulk_create([
+            Like(clubpost_id=post_id, user_id=user.id)
+            for post_id in ClubPost.objects.filter(club=self.club).values_list('id', flat=True)
+            for user in rng.sample(members, 20)
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+        Announcement.objects.bulk_create(
+            [Announcement(club=self.club, author=self.founder, title=f'Club news {i}', content='') for i in range(30)]
+            + [Announcement(author=self.admin, title=f'Site news {i}', content='') for i in range(30)]
+        )
+        answers = {'rating': lambda: str(rng.randint(1, 5)), 'choice': lambda: rng.choice('ABC'),
+                   'text': lambda: 'fine'}
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(survey=self.survey, user=user, question=question, answer=answers[question.question_type]())
+            for user in members for question in self.questions
+        ], batch_size=BATCH_SIZE)
+        surveys.recount([self.survey.id])
+        ClubFeedback.objects.bulk_create([
+            ClubFeedback(club=self.club, student=user, title='Idea', description='') for user in members[:50]
+        ])
+        MentorSession.objects.bulk_create([
+            MentorSession(club=self.club, student=user, mentor_topic='Help', description='', preferred_date=now + timedelta(days=1),
+                          assigned_mentor=self.founder if i % 2 else None)
+            for i, user in enumerate(members[:50])
+        ])
+        ClubMeeting.objects.bulk_create([
+            ClubMeeting(club=self.club, title=f'Meeting {i}', description='', created_by=self.founder,
+                        scheduled_time=now + timedelta(days=i % 7, hours=2))
+            for i in range(20)
+        ])
+        self.live_meeting.participants.add(*members[:50])
+
+        # Conversations of the hot users, plus unrelated history
+        partners = members[:50]
+        Message.objects.bulk_create(
+            [Message(sender=self.student, receiver=self.founder, content=f'ping {i}', is_read=True) for i in range(500 * scale)]
+            + [Message(sender=partner, receiver=self.student, content='hey') for partner in partners]
+            + [Message(sender=partner, receiver=self.founder, content='hey', club=self.club) for partner in partners]
+            + [Message(sender_id=rng.choice(crowd_ids), receiver_id=rng.choice(crowd_ids), content='noise', is_read=True)
+               for _ in range(20000 * scale)],
+            batch_size=BATCH_SIZE,
+        )
+        for message in Message.objects.filter(content='hey').order_by('id'):
+            Conversation.record_message(message)
+        Notification.objects.bulk_create(
+            [Notification(user=self.student, notification_type='general', title=f'Note {i}', message='')
+             for i in range(500 * scale)]
+            + [Notification(user_id=rng.choice(crowd_ids), notification_type='general', title='Noise', message='')
+               for _ in range(20000 * scale)],
+            batch_size=BATCH_SIZE,
+        )
+        BroadcastNotification.objects.bulk_create(
+            [BroadcastNotification(scope='all', notification_type='general', title=f'News {i}', message='') for i in range(20)]
+            + [BroadcastNotification(scope='club', club=self.club, notification_type='general', title=f'Club {i}', message='')
+               for i in range(20)]
+        )
+        # bulk_create skips the signals that write the activity stream
+        stream.rebuild()
+
+
+class Route:
+    """One request of a query-budget table.
+
+    ``kwargs`` and ``data`` may be callables taking the PerfWorld, for ids
+    that only exist once it is seeded. ``as_json`` posts ``data`` as a JSON
+    body instead of a form.
+    """
+
+    def __init__(self, name, user, budget, kwargs=None, method='get', data=None, as_json=False, status=200, label=None):
+        self.name = name
+        self.user = user
+        self.budget = budget
+        self.kwargs = kwargs
+        self.method = method
+        self.data = data
+        self.as_json = as_json
+        self.status = status
+        self.label = label or f'{name}[{user}]'
+
+    def resolve(self, world, value):
+        return value(world) if callable(value) else value
+
+
+class QueryBudgetMixin:
+    """Assert every route in ROUTES stays within its query budget at any data size.
+
+    Each route is requested against the seeded PerfWorld, the world is grown
+    by orders of magnitude, and the route is requested again: the count must
+    not go up and must stay within the route's budget. Requests run in a
+    rolled-back transaction with a cold cache, so routes don't see each
+    other's writes.
+
+    Set PERF_SCALE to grow further (default 1: ~2k users, 200 clubs, 20k
+    messages and notifications). Set PERF_BASELINE to a JSON file to also
+    time every route PERF_REPEAT times on the grown world: the p50/p95 are
+    written there on the first run and compared against it afterwards,
+    failing when p95 is over PERF_TOLERANCE times the baseline.
+    PERF_BASELINE_UPDATE=1 rewrites the stored numbers.
+    """
+
+    # The URLconf whose named routes must all appear in ROUTES
+    URLCONF = None
+    ROUTES = ()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.world = PerfWorld(scale=int(os.environ.get('PERF_SCALE', 1)))
+        cls.world.seed()
+
+    def request_route(self, route):
+        cache.clear()
+        self.client.force_login(getattr(self.world, route.user))
+        url = reverse(route.name, kwargs=route.resolve(self.world, route.kwargs))
+        data = route.resolve(self.world, route.data)
+        if route.as_json:
+            kwargs = {'data': json.dumps(data), 'content_type': 'application/json'}
+        else:
+            kwargs = {'data': data}
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(self.client, route.method)(url, **kwargs)
+                if response.streaming:
+                    # Streamed bodies run their queries as they are read
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        self.assertEqual(response.status_code, route.status, f'{route.label} answered {response.status_code}')
+        return [query['sql'] for query in captured.captured_queries], elapsed * 1000
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in import_module(self.URLCONF).urlpatterns}
+        self.assertEqual(names - {route.name for route in self.ROUTES}, set())
+
+    def test_query_budgets(self):
+        base = {route.label: self.request_route(route)[0] for route in self.ROUTES}
+        self.world.grow()
+        for route in self.ROUTES:
+            with self.subTest(route.label):
+                queries, _ = self.request_route(route)
+                self.assertLessEqual(
+                    len(queries), len(base[route.label]),
+                    f'{route.label} ran {len(base[route.label])} queries, {len(queries)} on the grown data:\n'
+                    + '\n'.join(queries),
+                )
+                self.assertLessEqual(
+                    len(queries), route.budget,
+                    f'{route.label} ran {len(queries)} queries, budget {route.budget}:\n' + '\n'.join(queries),
+                )
+        if os.environ.get('PERF_BASELINE'):
+            self.check_latency(os.environ['PERF_BASELINE'])
+
+    def check_latency(self, path):
+        repeat = int(os.environ.get('PERF_REPEAT', 20))
+        tolerance = float(os.environ.get('PERF_TOLERANCE', 2.0))
+        measured = {}
+        for route in self.ROUTES:
+            timings = sorted(self.request_route(route)[1] for _ in range(repeat))
+            measured[route.label] = {
+                'p50_ms': round(timings[len(timings) // 2], 2),
+                'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            }
+
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            baseline = {}
+        if os.environ.get('PERF_BASELINE_UPDATE') == '1':
+            compared = {}
+            baseline.update(measured)
+        else:
+            compared = {label: numbers for label, numbers in measured.items() if label in baseline}
+            baseline.update({label: numbers for label, numbers in measured.items() if label not in baseline})
+        with open(path, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+
+        for label, numbers in compared.items():
+            with self.subTest(label):
+                self.assertLessEqual(
+                    numbers['p95_ms'], baseline[label]['p95_ms'] * tolerance,
+                    f"{label}: p95 {numbers['p95_ms']}ms against a baseline of {baseline[label]['p95_ms']}ms",
+                )
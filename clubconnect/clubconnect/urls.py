@@ -8,6 +8,7 @@ urlpatterns = [
     path('', include('dashboard.urls')),
     path('accounts/', include('accounts.urls')),
     path('clubs/', include('clubs.urls')),
+    path('profiling/', include('profiling.urls')),
 ]
 
 if settings.DEBUG:
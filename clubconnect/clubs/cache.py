@@ -0,0 +1,24 @@
+"""Versions for the club_detail fragment caches.
+
+Each club has a version number in the shared cache that is part of every
+fragment cache key on its detail page. Saving the club, changing its
+founders or its announcements replaces the version (see signals.py), so
+stale fragments are never read again and simply expire. The fragments
+themselves expire after five minutes, which bounds how long anything the
+version doesn't track (e.g. a founder's profile picture) can stay stale.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(club_id):
+    return f'club:{club_id}:version'
+
+
+def club_version(club_id):
+    return cache.get_or_set(_key(club_id), time.time_ns, None)
+
+
+def bump_club_version(club_id):
+    cache.set(_key(club_id), time.time_ns(), None)
@@ -0,0 +1,116 @@
+"""Unread badge counters kept in the cache.
+
+Reading a badge is a single cache hit. Writers adjust the counters when
+notifications and messages are created or read. A missing key is recounted
+from the database, keys expire after COUNTER_TIMEOUT, and the
+``reconcile_unread_counters`` command resyncs them in bulk, so any drift
+(a lost increment, a write to another cache) only lasts until then.
+
+Broadcast notifications have no per-user rows to increment on. Site-wide
+and role broadcasts reach nearly everyone, so broadcast counters are keyed
+by a generation that those replace; the old keys are simply never read
+again and expire. A club broadcast only drops its members' counters.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+from .models import Membership, Message, Notification, BroadcastNotification
+
+NOTIFICATIONS = 'notifications'
+MESSAGES = 'messages'
+BROADCASTS = 'broadcasts'
+
+COUNTER_TIMEOUT = 60 * 60
+
+BROADCAST_GENERATION_KEY = 'unread:broadcasts:generation'
+
+
+def _key(kind, user_id):
+    if kind == BROADCASTS:
+        return f'unread:{kind}:{broadcast_generation()}:{user_id}'
+    return f'unread:{kind}:{user_id}'
+
+
+def broadcast_generation():
+    # A time-based value, so an evicted generation can't come back as an old one
+    return cache.get_or_set(BROADCAST_GENERATION_KEY, time.time_ns, None)
+
+
+def new_broadcast(club_id=None):
+    """Invalidate the broadcast counters of a new broadcast's audience: a club's members, or everyone."""
+    if club_id is None:
+        cache.set(BROADCAST_GENERATION_KEY, time.time_ns(), None)
+        return
+    member_ids = Membership.objects.filter(club_id=club_id, status='approved').values_list('user_id', flat=True)
+    cache.delete_many([_key(BROADCASTS, user_id) for user_id in member_ids])
+
+
+def _unread_rows(kind):
+    if kind == NOTIFICATIONS:
+        return Notification.objects.filter(is_read=False), 'user_id'
+    return Message.objects.filter(is_read=False), 'receiver_id'
+
+
+def count_from_db(kind, user_id):
+    if kind == BROADCASTS:
+        return BroadcastNotification.unread_for(user_id).count()
+    rows, user_field = _unread_rows(kind)
+    return rows.filter(**{user_field: user_id}).count()
+
+
+def get_count(kind, user_id):
+    value = cache.get(_key(kind, user_id))
+    if value is None:
+        value = count_from_db(kind, user_id)
+        # add() rather than set() so a concurrent increment isn't overwritten
+        cache.add(_key(kind, user_id), value, COUNTER_TIMEOUT)
+    return value
+
+
+def unread_notifications(user_id):
+    """The notification badge: personal notifications plus unread broadcasts."""
+    return get_count(NOTIFICATIONS, user_id) + get_count(BROADCASTS, user_id)
+
+
+def reset(kind, user_id):
+    cache.delete(_key(kind, user_id))
+
+
+def increment(kind, user_ids, delta=1):
+    for user_id in user_ids:
+        try:
+            cache.incr(_key(kind, user_id), delta)
+        except ValueError:
+            # Not cached yet; the next read counts from the database
+            pass
+
+
+def decrement(kind, user_id, delta=1):
+    if not delta:
+        return
+    try:
+        if cache.decr(_key(kind, user_id), delta) < 0:
+            cache.delete(_key(kind, user_id))
+    except ValueError:
+        pass
+
+
+def reconcile(kind, user_ids):
+    """Overwrite the cached counters of ``user_ids`` with database counts."""
+    user_ids = list(user_ids)
+    if kind == BROADCASTS:
+        # Recounted lazily on the next read
+        cache.delete_many([_key(kind, user_id) for user_id in user_ids])
+        return
+    rows, user_field = _unread_rows(kind)
+    counts = dict(
+        rows.filter(**{f'{user_field}__in': user_ids})
+        .values_list(user_field)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    cache.set_many(
+        {_key(kind, user_id): counts.get(user_id, 0) for user_id in user_ids},
+        COUNTER_TIMEOUT,
+    )
@@ -0,0 +1,175 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import User
+from clubconnect.benchmarks import throwaway_database
+from clubs.models import Club, Event, EventAttendance, Membership, Message, Notification
+
+INDEXED_MODELS = [Message, Notification, Membership, EventAttendance]
+BATCH_SIZE = 20000
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database with a large message/notification history and report "
+        "query plans and latencies for the hot queries with and without the Meta.indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help='Messages and notifications to seed, each (default: 1,000,000)')
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--clubs', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query; the median is reported')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.stdout.write(f"Seeding {options['rows']:,} messages and notifications...")
+            sample = self.seed(options)
+            queries = self.hot_queries(**sample)
+
+            after = self.measure(queries, options['repeat'])
+            with connection.schema_editor() as editor:
+                for model in INDEXED_MODELS:
+                    for index in model._meta.indexes:
+                        editor.remove_index(model, index)
+            self.analyze()
+            before = self.measure(queries, options['repeat'])
+
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            self.stdout.write(f"  before: {before[name]['ms']:8.3f} ms  {before[name]['plan']}")
+            self.stdout.write(f"  after:  {after[name]['ms']:8.3f} ms  {after[name]['plan']}")
+            if after[name]['ms']:
+                self.stdout.write(f"  speedup: {before[name]['ms'] / after[name]['ms']:.1f}x")
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        password = make_password('password123')
+
+        User.objects.bulk_create([
+            User(username=f'bench{i}', password=password, user_type='founder' if i % 50 == 0 else 'student')
+            for i in range(options['users'])
+        ], batch_size=BATCH_SIZE)
+        user_ids = list(User.objects.values_list('id', flat=True))
+        hot_user, hot_partner = user_ids[0], user_ids[1]
+
+        Club.objects.bulk_create([
+            Club(name=f'Club {i}', short_description='', long_description='', domain_tags='')
+            for i in range(options['clubs'])
+        ])
+        club_ids = list(Club.objects.values_list('id', flat=True))
+
+        Membership.objects.bulk_create([
+            Membership(user_id=user_id, club_id=club_id, status=rng.choice(['approved', 'approved', 'pending', 'rejected']))
+            for user_id in user_ids
+            for club_id in rng.sample(club_ids, 3)
+        ], batch_size=BATCH_SIZE)
+
+        Event.objects.bulk_create([
+            Event(club_id=club_id, title=f'Event {i}', description='', location='Hall',
+                  start_time=now + timedelta(days=i % 30), end_time=now + timedelta(days=i % 30, hours=2))
+            for i, club_id in enumerate(club_ids * 5)
+        ])
+        event_ids = list(Event.objects.values_list('id', flat=True))
+        EventAttendance.objects.bulk_create([
+            EventAttendance(event_id=event_id, user_id=user_id, checked_in_via_qr=rng.random() < 0.5)
+            for event_id in event_ids
+            for user_id in rng.sample(user_ids, 50)
+        ], batch_size=BATCH_SIZE)
+
+        def pick_pair():
+            # A tenth of the traffic is one busy conversation
+            if rng.random() < 0.1:
+                return (hot_user, hot_partner) if rng.random() < 0.5 else (hot_partner, hot_user)
+            return rng.sample(user_ids, 2)
+
+        for start in range(0, options['rows'], BATCH_SIZE):
+            batch = []
+            for i in range(start, min(start + BATCH_SIZE, options['rows'])):
+                sender, receiver = pick_pair()
+                batch.append(Message(sender_id=sender, receiver_id=receiver, content=f'message {i}',
+                                     club_id=rng.choice(club_ids) if rng.random() < 0.2 else None,
+                                     is_read=rng.random() < 0.9))
+            Message.objects.bulk_create(batch)
+
+            Notification.objects.bulk_create([
+                Notification(user_id=hot_user if rng.random() < 0.05 else rng.choice(user_ids),
+                             notification_type='general', title='Bench', message='', is_read=rng.random() < 0.9)
+                for _ in range(start, min(start + BATCH_SIZE, options['rows']))
+            ])
+
+        self.analyze()
+
+        return {
+            'user': hot_user,
+            'partner': hot_partner,
+            'club': club_ids[0],
+            'event': event_ids[0],
+        }
+
+    def analyze(self):
+        # Refresh planner statistics so index choices reflect the seeded data
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def hot_queries(self, user, partner, club, event):
+        """The filters the views and context processors actually run."""
+        return {
+            'unread message count (dashboard)':
+                lambda: Message.objects.filter(receiver_id=user, is_read=False).count(),
+            'unread from partner (get_messages mark read)':
+                lambda: Message.objects.filter(sender_id=partner, receiver_id=user, is_read=False).count(),
+            'conversation page (get_messages)':
+                lambda: list(Message.objects.filter(
+                    Q(sender_id=user, receiver_id=partner) | Q(sender_id=partner, receiver_id=user)
+                ).order_by('-id').values('id')[:50]),
+            'club chat (club_chat)':
+                lambda: list(Message.objects.filter(club_id=club).order_by('created_at').values('id')[:100]),
+            'unread notification count (notification_count)':
+                lambda: Notification.objects.filter(user_id=user, is_read=False).count(),
+            'latest notifications (notifications)':
+                lambda: list(Notification.objects.filter(user_id=user).order_by('-created_at').values('id')[:20]),
+            'approved members (notify_club_members)':
+                lambda: list(Membership.objects.filter(club_id=club, status='approved').values('user_id')),
+            'approved clubs (my_clubs)':
+                lambda: list(Membership.objects.filter(user_id=user, status='approved').values('club_id')),
+            'checked-in count (manage_event_attendance)':
+                lambda: EventAttendance.objects.filter(event_id=event, checked_in_via_qr=True).count(),
+        }
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, run in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {'ms': statistics.median(timings), 'plan': self.plan(run)}
+        return results
+
+    def plan(self, run):
+        """EXPLAIN output of the last query ``run`` executes, on one line."""
+        with connection.execute_wrapper(self._capture):
+            self._captured = None
+            run()
+        sql, params = self._captured
+        with connection.cursor() as cursor:
+            prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+            cursor.execute(prefix + sql, params)
+            return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def _capture(self, execute, sql, params, many, context):
+        self._captured = (sql, params)
+        return execute(sql, params, many, context)
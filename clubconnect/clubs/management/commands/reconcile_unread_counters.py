@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+from clubs import counters
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Resync the cached unread notification/message counters with the database. "
+        "Run it periodically (e.g. from cron every few minutes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Only users seen in the last N hours (default: 24)')
+        parser.add_argument('--all', action='store_true', help='Reconcile every user')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if not options['all']:
+            users = users.filter(last_seen__gte=timezone.now() - timedelta(hours=options['hours']))
+
+        total = 0
+        chunk = []
+        for user_id in users.values_list('id', flat=True).iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(user_id)
+            if len(chunk) == CHUNK_SIZE:
+                self.reconcile(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            self.reconcile(chunk)
+            total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled unread counters for {total} users."))
+
+    def reconcile(self, user_ids):
+        counters.reconcile(counters.NOTIFICATIONS, user_ids)
+        counters.reconcile(counters.MESSAGES, user_ids)
+        counters.reconcile(counters.BROADCASTS, user_ids)
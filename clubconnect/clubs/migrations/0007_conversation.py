@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_conversations(apps, schema_editor):
+    Message = apps.get_model('clubs', 'Message')
+    Conversation = apps.get_model('clubs', 'Conversation')
+
+    summaries = {}
+    rows = Message.objects.values('sender_id', 'receiver_id').annotate(
+        last_id=models.Max('id'),
+        unread=models.Count('id', filter=models.Q(is_read=False)),
+    )
+    for row in rows:
+        sender_id, receiver_id = row['sender_id'], row['receiver_id']
+        low, high = min(sender_id, receiver_id), max(sender_id, receiver_id)
+        summary = summaries.setdefault((low, high), {'last_id': 0, 'unread_low': 0, 'unread_high': 0})
+        summary['last_id'] = max(summary['last_id'], row['last_id'])
+        summary['unread_low' if receiver_id == low else 'unread_high'] += row['unread']
+
+    last_messages = Message.objects.in_bulk([s['last_id'] for s in summaries.values()])
+    Conversation.objects.bulk_create([
+        Conversation(
+            user_low_id=low,
+            user_high_id=high,
+            last_message_id=summary['last_id'],
+            last_activity_at=last_messages[summary['last_id']].created_at,
+            unread_low=summary['unread_low'],
+            unread_high=summary['unread_high'],
+        )
+        for (low, high), summary in summaries.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0006_message_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity_at', models.DateTimeField()),
+                ('unread_low', models.PositiveIntegerField(default=0)),
+                ('unread_high', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='clubs.message')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_low', '-last_activity_at'], name='conversation_low_recent_idx'), models.Index(fields=['user_high', '-last_activity_at'], name='conversation_high_recent_idx')],
+                'unique_together': {('user_low', 'user_high')},
+            },
+        ),
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
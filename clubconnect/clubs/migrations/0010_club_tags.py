@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:16
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def split_domain_tags(apps, schema_editor):
+    Club = apps.get_model('clubs', 'Club')
+    Tag = apps.get_model('clubs', 'Tag')
+    ClubTag = Club.tags.through
+
+    tags = {}
+    links = []
+    for club_id, domain_tags in Club.objects.values_list('id', 'domain_tags').iterator():
+        slugs = []
+        for name in (domain_tags or '').split(','):
+            name = ' '.join(name.split())[:50]
+            slug = slugify(name)[:50]
+            if slug and slug not in slugs:
+                slugs.append(slug)
+                tags.setdefault(slug, {'name': name, 'count': 0})['count'] += 1
+        links.append((club_id, slugs))
+
+    Tag.objects.bulk_create(
+        [Tag(slug=slug, name=tag['name'], club_count=tag['count']) for slug, tag in tags.items()],
+        batch_size=500,
+    )
+    tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+    ClubTag.objects.bulk_create(
+        [ClubTag(club_id=club_id, tag_id=tag_ids[slug]) for club_id, slugs in links for slug in slugs],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0009_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(unique=True)),
+                ('club_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['-club_count', 'name'], name='tag_popular_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='clubs', to='clubs.tag'),
+        ),
+        migrations.RunPython(split_domain_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def count_answers(apps, schema_editor):
+    from clubs import surveys
+    surveys.add_counters(apps.get_model('clubs', 'SurveyQuestion').objects.iterator(), apps=apps)
+    surveys.recount(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0011_club_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SurveyAnswerCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('option', models.TextField(blank=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='clubs.surveyquestion')),
+            ],
+            options={
+                'unique_together': {('question', 'option')},
+            },
+        ),
+        migrations.RunPython(count_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_submissions(apps, schema_editor):
+    SurveyResponse = apps.get_model('clubs', 'SurveyResponse')
+    SurveySubmission = apps.get_model('clubs', 'SurveySubmission')
+    respondents = SurveyResponse.objects.values_list('survey_id', 'user_id').distinct().order_by()
+    SurveySubmission.objects.bulk_create(
+        (SurveySubmission(survey_id=survey_id, user_id=user_id) for survey_id, user_id in respondents.iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0012_survey_answer_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='clubs.survey')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('survey', 'user')},
+            },
+        ),
+        migrations.RunPython(record_submissions, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,42 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
 
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
+    # Maintained by signals (see Tag.refresh_counts) so tag facets never count clubs on read
+    club_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['-club_count', 'name'], name='tag_popular_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def parse(value):
+        """Split a comma separated tag string into ``{slug: name}``, in order, without duplicates."""
+        from django.utils.text import slugify
+        tags = {}
+        for name in (value or '').split(','):
+            name = ' '.join(name.split())[:50]
+            slug = slugify(name)[:50]
+            if slug and slug not in tags:
+                tags[slug] = name
+        return tags
+
+    @classmethod
+    def refresh_counts(cls, tag_ids):
+        from django.db.models.functions import Coalesce
+        counts = (
+            Club.tags.through.objects.filter(tag_id=models.OuterRef('pk'))
+            .values('tag_id').annotate(count=models.Count('*')).values('count')
+        )
+        cls.objects.filter(id__in=tag_ids).update(club_count=Coalesce(models.Subquery(counts), 0))
+
 class Club(models.Model):
     name = models.CharField(max_length=100)
     short_description = models.CharField(max_length=200)
@@ -14,17 +50,32 @@ class Club(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     favorited_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='favorite_clubs', blank=True)
+    tags = models.ManyToManyField(Tag, related_name='clubs', blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pages of the club listings seek on (name, id)
+            models.Index(fields=['name', 'id'], name='club_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
-    
-    def get_representatives(self):
-        reps = list(self.founders.all())
-        if self.president:
-            reps.append(self.president)
-        if self.vice_president:
-            reps.append(self.vice_president)
-        return list(set(reps))
+
+    def sync_tags(self):
+        """Point ``tags`` at the tags listed in ``domain_tags``, creating missing ones."""
+        wanted = Tag.parse(self.domain_tags)
+        existing = set(Tag.objects.filter(slug__in=wanted).values_list('slug', flat=True))
+        Tag.objects.bulk_create(
+            [Tag(slug=slug, name=name) for slug, name in wanted.items() if slug not in existing],
+            ignore_conflicts=True,
+        )
+        self.tags.set(Tag.objects.filter(slug__in=wanted))
+    
+    def representative_ids(self):
+        """Ids of the founders, president and vice president."""
+        ids = set(self.founders.values_list('id', flat=True))
+        ids.update(user_id for user_id in (self.president_id, self.vice_president_id) if user_id)
+        return ids
 
 class Event(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='events')
@@ -57,6 +108,10 @@ class Membership(models.Model):
     
     class Meta:
         unique_together = ('user', 'club')
+        indexes = [
+            models.Index(fields=['club', 'status'], name='membership_club_status_idx'),
+            models.Index(fields=['user', 'status'], name='membership_user_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.club.name}"
@@ -67,11 +122,108 @@ class Message(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, null=True, blank=True)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_read = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # Conversation pages: (sender, receiver) pairs paged by id
+            models.Index(fields=['sender', 'receiver', 'id'], name='message_pair_idx'),
+            # Unread counts and mark-as-read only ever look at unread rows
+            models.Index(fields=['receiver', 'sender'], condition=models.Q(is_read=False), name='message_unread_idx'),
+            models.Index(fields=['club', 'created_at'], name='message_club_created_idx'),
+        ]
+    
     def __str__(self):
         return f"From {self.sender.username} to {self.receiver.username}"
 
+class Conversation(models.Model):
+    """Summary of the direct messages between two users, one row per pair.
+
+    The pair is stored ordered by id (``user_low.id < user_high.id``) and each
+    side keeps its own unread count, so the chat sidebar and the unread badges
+    are read from here instead of scanning Message.
+    """
+    user_low = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity_at = models.DateTimeField()
+    unread_low = models.PositiveIntegerField(default=0)
+    unread_high = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('user_low', 'user_high')
+        indexes = [
+            models.Index(fields=['user_low', '-last_activity_at'], name='conversation_low_recent_idx'),
+            models.Index(fields=['user_high', '-last_activity_at'], name='conversation_high_recent_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_low_id} <-> {self.user_high_id}"
+    
+    @staticmethod
+    def ordered_pair(user_id, other_id):
+        return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+    
+    @classmethod
+    def for_user(cls, user):
+        return cls.objects.filter(models.Q(user_low=user) | models.Q(user_high=user))
+    
+    @classmethod
+    def partner_ids(cls, user):
+        """Subqueries for the ids of everyone ``user`` has a conversation with."""
+        return (
+            cls.objects.filter(user_low=user).values('user_high'),
+            cls.objects.filter(user_high=user).values('user_low'),
+        )
+    
+    @classmethod
+    def record_message(cls, message):
+        low, high = cls.ordered_pair(message.sender_id, message.receiver_id)
+        unread_field = 'unread_low' if message.receiver_id == low else 'unread_high'
+        changes = {
+            'last_message': message,
+            'last_activity_at': message.created_at,
+            unread_field: models.F(unread_field) + 1,
+        }
+        if cls.objects.filter(user_low_id=low, user_high_id=high).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_low_id=low,
+                    user_high_id=high,
+                    last_message=message,
+                    last_activity_at=message.created_at,
+                    **{unread_field: 1},
+                )
+        except IntegrityError:
+            # Another request created the row first
+            cls.objects.filter(user_low_id=low, user_high_id=high).update(**changes)
+    
+    @classmethod
+    def record_read(cls, reader_id, other_id):
+        low, high = cls.ordered_pair(reader_id, other_id)
+        unread_field = 'unread_low' if reader_id == low else 'unread_high'
+        cls.objects.filter(user_low_id=low, user_high_id=high).update(**{unread_field: 0})
+    
+    @classmethod
+    def unread_by_partner(cls, user_id):
+        """Map of partner id -> unread messages from that partner for ``user_id``."""
+        rows = cls.objects.filter(
+            models.Q(user_low_id=user_id, unread_low__gt=0) | models.Q(user_high_id=user_id, unread_high__gt=0)
+        ).values_list('user_low_id', 'user_high_id', 'unread_low', 'unread_high')
+        return {
+            (high if low == user_id else low): (unread_low if low == user_id else unread_high)
+            for low, high, unread_low, unread_high in rows
+        }
+    
+    def other_user(self, user):
+        return self.user_high if self.user_low_id == user.id else self.user_low
+    
+    def unread_for(self, user):
+        return self.unread_low if self.user_low_id == user.id else self.unread_high
+
 class Announcement(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='announcements', null=True, blank=True)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
@@ -101,10 +253,88 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notification_user_recent_idx'),
+            models.Index(fields=['user', 'created_at'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
+    def get_mark_read_url(self):
+        from django.urls import reverse
+        return reverse('mark_notification_read', kwargs={'notification_id': self.id})
+
+class BroadcastNotification(models.Model):
+    """One notification row shown to a whole audience.
+
+    Announcements to everyone, a club's members or a user type are stored
+    once instead of once per recipient; who has read one is tracked in
+    BroadcastRead.
+    """
+    SCOPE_CHOICES = (
+        ('all', 'Everyone'),
+        ('club', 'Club members'),
+        ('role', 'User type'),
+    )
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, null=True, blank=True, related_name='broadcasts')
+    role = models.CharField(max_length=10, blank=True, help_text="User type the broadcast is for (role scope)")
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    link = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['scope', '-created_at'], name='broadcast_scope_recent_idx'),
+            models.Index(fields=['club', '-created_at'], name='broadcast_club_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_scope_display()} - {self.title}"
+
+    def get_mark_read_url(self):
+        from django.urls import reverse
+        return reverse('mark_broadcast_read', kwargs={'broadcast_id': self.id})
+
+    @classmethod
+    def visible_to(cls, user_id):
+        """Broadcasts ``user_id`` is in the audience of, annotated with ``is_read``.
+
+        Users only see what was sent after they signed up (or, for club
+        broadcasts, after they joined the club), like the per-user rows did.
+        """
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.filter(pk=user_id)
+        member = Membership.objects.filter(
+            user_id=user_id, club=models.OuterRef('club'), status='approved',
+            joined_at__lte=models.OuterRef('created_at'),
+        )
+        return cls.objects.filter(
+            models.Q(scope='all')
+            | models.Q(scope='role', role=models.Subquery(user.values('user_type')))
+            | (models.Q(scope='club') & models.Exists(member)),
+            created_at__gte=models.Subquery(user.values('date_joined')),
+        ).annotate(
+            is_read=models.Exists(BroadcastRead.objects.filter(broadcast=models.OuterRef('pk'), user_id=user_id))
+        )
+
+    @classmethod
+    def unread_for(cls, user_id):
+        return cls.visible_to(user_id).filter(is_read=False)
+
+class BroadcastRead(models.Model):
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name='reads')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('broadcast', 'user')
+
 class ClubPost(models.Model):
     POST_TYPES = (
         ('event', 'Event'),
@@ -144,6 +374,19 @@ class MemberPoints(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.club.name}: {self.points} pts"
+    
+    @classmethod
+    def award(cls, user_id, club_id, points, count_field):
+        """Add ``points`` and one to ``count_field`` in a single update, creating the row if needed."""
+        changes = {'points': models.F('points') + points, count_field: models.F(count_field) + 1}
+        if cls.objects.filter(user_id=user_id, club_id=club_id).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, club_id=club_id, points=points, **{count_field: 1})
+        except IntegrityError:
+            # Another request created the row first
+            cls.objects.filter(user_id=user_id, club_id=club_id).update(**changes)
 
 class Survey(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='surveys')
@@ -152,6 +395,7 @@ class Survey(models.Model):
     description = models.TextField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    response_count = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return self.title
@@ -174,6 +418,9 @@ class SurveyQuestion(models.Model):
     
     def __str__(self):
         return self.question_text
+    
+    def choice_list(self):
+        return [choice.strip() for choice in self.choices.split(',') if choice.strip()]
 
 class SurveyResponse(models.Model):
     survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='responses')
@@ -188,6 +435,35 @@ class SurveyResponse(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.survey.title}"
 
+class SurveySubmission(models.Model):
+    """One user having submitted a survey; inserted before their answers so a second submit fails."""
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='submissions')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('survey', 'user')
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.survey_id}"
+
+class SurveyAnswerCount(models.Model):
+    """How many times one answer option of a question was picked.
+
+    Choice questions have a row per choice and rating questions a row per
+    rating; every question also has a row with an empty ``option`` counting
+    all its answers. Kept up to date by clubs.surveys as answers come in.
+    """
+    question = models.ForeignKey(SurveyQuestion, on_delete=models.CASCADE, related_name='answer_counts')
+    option = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('question', 'option')
+    
+    def __str__(self):
+        return f"{self.question_id} {self.option or '(all)'}: {self.count}"
+
 class EventAttendance(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='attendances')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -196,6 +472,10 @@ class EventAttendance(models.Model):
     
     class Meta:
         unique_together = ('event', 'user')
+        indexes = [
+            models.Index(fields=['event', 'checked_in_via_qr'], name='attendance_event_checkin_idx'),
+            models.Index(fields=['user', 'event'], name='attendance_user_event_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.event.title}"
@@ -276,8 +556,8 @@ class ClubMeeting(models.Model):
     
     def can_start(self, user):
         """Check if user can start the meeting"""
-        representatives = self.club.get_representatives()
-        return user in representatives and self.status == 'scheduled'
+        from . import roles
+        return self.status == 'scheduled' and roles.for_user(user).is_rep(self.club_id)
     
     def start_meeting(self, user):
         """Start the meeting"""
@@ -0,0 +1,99 @@
+"""Which clubs a user founds, leads or belongs to.
+
+``for_user(user)`` returns a ClubRoles map built from three small queries.
+With a shared cache (settings.SHARED_CACHE) the map is kept there, so
+permission checks don't hit the database on every request; a per-process
+cache isn't used, since a revoked role would live on in other workers. The
+map is memoized on the user object, which makes it free for the rest of
+the request once ``request.user`` has been resolved. signals.py drops a
+user's cached map when their memberships, founder links or president/vice
+president posts change.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from .models import Club, Membership
+
+FOUNDER = 'founder'
+PRESIDENT = 'president'
+VICE_PRESIDENT = 'vice_president'
+MEMBER = 'member'
+PENDING = 'pending'
+
+REPRESENTATIVE_ROLES = {FOUNDER, PRESIDENT, VICE_PRESIDENT}
+
+ROLES_TIMEOUT = 10 * 60
+
+
+def _key(user_id):
+    return f'club_roles:{user_id}'
+
+
+class ClubRoles:
+    def __init__(self, roles):
+        self._roles = roles
+
+    def roles(self, club):
+        club_id = club if isinstance(club, int) else club.id
+        return self._roles.get(club_id, ())
+
+    def is_founder(self, club):
+        return FOUNDER in self.roles(club)
+
+    def is_rep(self, club):
+        """Founder, president or vice president."""
+        return not REPRESENTATIVE_ROLES.isdisjoint(self.roles(club))
+
+    def is_member(self, club):
+        """An approved member."""
+        return MEMBER in self.roles(club)
+
+    def is_pending(self, club):
+        return PENDING in self.roles(club)
+
+    def club_ids(self, role):
+        return [club_id for club_id, roles in self._roles.items() if role in roles]
+
+
+def load_roles(user_id):
+    roles = {}
+
+    def add(club_id, role):
+        roles.setdefault(club_id, []).append(role)
+
+    for club_id in Club.founders.through.objects.filter(user_id=user_id).values_list('club_id', flat=True):
+        add(club_id, FOUNDER)
+    led = Club.objects.filter(Q(president_id=user_id) | Q(vice_president_id=user_id))
+    for club_id, president_id, vice_president_id in led.values_list('id', 'president_id', 'vice_president_id'):
+        if president_id == user_id:
+            add(club_id, PRESIDENT)
+        if vice_president_id == user_id:
+            add(club_id, VICE_PRESIDENT)
+    memberships = Membership.objects.filter(user_id=user_id, status__in=['approved', 'pending'])
+    for club_id, status in memberships.values_list('club_id', 'status'):
+        add(club_id, MEMBER if status == 'approved' else PENDING)
+    return roles
+
+
+def for_user(user):
+    if not user.is_authenticated:
+        return ClubRoles({})
+    try:
+        return user._club_roles
+    except AttributeError:
+        pass
+
+    if not settings.SHARED_CACHE:
+        user._club_roles = ClubRoles(load_roles(user.id))
+        return user._club_roles
+
+    roles = cache.get(_key(user.id))
+    if roles is None:
+        roles = load_roles(user.id)
+        cache.set(_key(user.id), roles, ROLES_TIMEOUT)
+    user._club_roles = ClubRoles(roles)
+    return user._club_roles
+
+
+def invalidate(*user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids if user_id])
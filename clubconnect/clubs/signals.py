@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Club, Message, Conversation, Membership, Announcement, Tag, Survey, SurveyQuestion, SurveyResponse
+from .cache import bump_club_version
+from . import counters, roles, surveys
+
+
+@receiver(post_save, sender=Message)
+def update_conversation(sender, instance, created, **kwargs):
+    if created:
+        Conversation.record_message(instance)
+        counters.increment(counters.MESSAGES, [instance.receiver_id])
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def reset_membership_state(sender, instance, **kwargs):
+    roles.invalidate(instance.user_id)
+    # Joining or leaving a club changes which club broadcasts the user sees
+    counters.reset(counters.BROADCASTS, instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reset_broadcast_counter_on_role(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'user_type' in update_fields):
+        counters.reset(counters.BROADCASTS, instance.id)
+
+
+@receiver(pre_save, sender=Club)
+def remember_club_state(sender, instance, **kwargs):
+    instance._previous_leader_ids = ()
+    instance._previous_domain_tags = None
+    if instance.pk:
+        previous = Club.objects.filter(pk=instance.pk).values_list(
+            'president_id', 'vice_president_id', 'domain_tags',
+        ).first()
+        if previous:
+            instance._previous_leader_ids = previous[:2]
+            instance._previous_domain_tags = previous[2]
+
+
+@receiver(post_save, sender=Club)
+@receiver(post_delete, sender=Club)
+def invalidate_club_state(sender, instance, **kwargs):
+    bump_club_version(instance.id)
+    leader_ids = {instance.president_id, instance.vice_president_id, *getattr(instance, '_previous_leader_ids', ())}
+    roles.invalidate(*leader_ids)
+
+
+@receiver(post_save, sender=Club)
+def sync_club_tags(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'domain_tags' not in update_fields:
+        return
+    if instance.domain_tags != getattr(instance, '_previous_domain_tags', None):
+        instance.sync_tags()
+
+
+@receiver(m2m_changed, sender=Club.tags.through)
+def refresh_tag_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._cleared_tag_pks = set((instance.clubs if reverse else instance.tags).values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        changed = pk_set or getattr(instance, '_cleared_tag_pks', set())
+        Tag.refresh_counts({instance.id} if reverse else changed)
+
+
+@receiver(pre_delete, sender=Club)
+def remember_club_tags(sender, instance, **kwargs):
+    instance._deleted_tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Club)
+def refresh_tag_counts_on_delete(sender, instance, **kwargs):
+    Tag.refresh_counts(getattr(instance, '_deleted_tag_ids', []))
+
+
+@receiver(m2m_changed, sender=Club.founders.through)
+def invalidate_founder_state(sender, instance, action, reverse, pk_set, **kwargs):
+    # club.founders.clear() / user.founded_clubs.clear() don't say what they cleared
+    if action == 'pre_clear':
+        related = instance.founded_clubs if reverse else instance.founders
+        instance._cleared_founder_pks = set(related.values_list('id', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+
+    changed = pk_set or getattr(instance, '_cleared_founder_pks', set())
+    if reverse:
+        club_ids, user_ids = changed, {instance.id}
+    else:
+        club_ids, user_ids = {instance.id}, changed
+    for club_id in club_ids:
+        bump_club_version(club_id)
+    roles.invalidate(*user_ids)
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def invalidate_club_fragments_on_announcement(sender, instance, **kwargs):
+    if instance.club_id:
+        bump_club_version(instance.club_id)
+
+
+@receiver(post_save, sender=Survey)
+@receiver(post_delete, sender=SurveyQuestion)
+def invalidate_survey_results(sender, instance, **kwargs):
+    surveys.invalidate(instance.pk if sender is Survey else instance.survey_id)
+
+
+@receiver(post_save, sender=SurveyQuestion)
+def sync_survey_counters(sender, instance, created, **kwargs):
+    surveys.add_counters([instance])
+    if created:
+        surveys.invalidate(instance.survey_id)
+    else:
+        # Changed choices can match answers that were given before
+        surveys.recount([instance.survey_id])
+
+
+@receiver(pre_delete, sender=Survey)
+def skip_recounts_for_deleted_survey(sender, instance, **kwargs):
+    surveys.start_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=Survey)
+def forget_deleted_survey(sender, instance, **kwargs):
+    surveys.finish_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=SurveyResponse)
+def recount_survey_on_response_delete(sender, instance, **kwargs):
+    # Sent once per row, cascades included: recount each survey once, at commit
+    surveys.recount_on_commit(instance.survey_id)
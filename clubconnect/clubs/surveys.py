@@ -0,0 +1,203 @@
+"""Survey results, read from counters kept in the database.
+
+Every question has a SurveyAnswerCount row per answer option (and one
+counting all its answers), and Survey.response_count counts respondents.
+record_submission bumps them with ``F()`` updates as answers are saved,
+so a results page reads O(questions x options) rows however many people
+answered. Free-text answers are only counted; the page shows the newest
+TEXT_ANSWERS_SHOWN of each text question and the export has the rest.
+
+Edits that the counters can't follow (changed choices, deleted answers)
+recount them from SurveyResponse, once per survey when the transaction
+commits. Closed surveys can't change, so their
+finished results are cached, keyed by a per-survey version that edits
+replace (see signals.py).
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.expressions import Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from .models import Survey, SurveyAnswerCount, SurveyResponse
+
+RATINGS = ['1', '2', '3', '4', '5']
+TEXT_ANSWERS_SHOWN = 20
+
+# Surveys waiting for a recount at commit, and surveys being deleted (which need none)
+_local = threading.local()
+
+
+def _ids(name):
+    if not hasattr(_local, name):
+        setattr(_local, name, set())
+    return getattr(_local, name)
+
+
+def _version(survey_id):
+    return cache.get_or_set(f'survey:{survey_id}:version', time.time_ns, None)
+
+
+def invalidate(survey_id):
+    cache.set(f'survey:{survey_id}:version', time.time_ns(), None)
+
+
+def options(question):
+    """The answers a question's results are broken down by."""
+    if question.question_type == 'choice':
+        # Not question.choice_list(): migrations pass historical models
+        return [choice.strip() for choice in question.choices.split(',') if choice.strip()]
+    if question.question_type == 'rating':
+        return RATINGS
+    return []
+
+
+def add_counters(questions, apps=None):
+    """Create the counter rows ``questions`` are missing, at zero."""
+    counter_model = apps.get_model('clubs', 'SurveyAnswerCount') if apps else SurveyAnswerCount
+    counter_model.objects.bulk_create([
+        counter_model(question_id=question.id, option=option)
+        for question in questions for option in ['', *options(question)]
+    ], ignore_conflicts=True)
+
+
+def recount(survey_ids=None, apps=None):
+    """Set the counters of ``survey_ids`` (all surveys by default) from their responses.
+
+    Only updates rows, so it is safe to run while a question and its
+    counters are being deleted. Migrations pass their historical ``apps``.
+    """
+    if apps:
+        survey_model = apps.get_model('clubs', 'Survey')
+        counter_model = apps.get_model('clubs', 'SurveyAnswerCount')
+        response_model = apps.get_model('clubs', 'SurveyResponse')
+    else:
+        survey_model, counter_model, response_model = Survey, SurveyAnswerCount, SurveyResponse
+    counters = counter_model.objects.all()
+    surveys = survey_model.objects.all()
+    if survey_ids is not None:
+        counters = counters.filter(question__survey_id__in=survey_ids)
+        surveys = surveys.filter(id__in=survey_ids)
+
+    def count(responses, group_by, **aggregate):
+        return Coalesce(Subquery(responses.values(group_by).annotate(n=Count(**aggregate)).values('n')), 0)
+
+    answers = response_model.objects.filter(question_id=OuterRef('question_id'))
+    respondents = response_model.objects.filter(survey_id=OuterRef('pk'))
+    with transaction.atomic():
+        counters.filter(option='').update(count=count(answers, 'question_id', expression='id'))
+        counters.exclude(option='').update(
+            count=count(answers.filter(answer=OuterRef('option')), 'question_id', expression='id'),
+        )
+        surveys.update(response_count=count(respondents, 'survey_id', expression='user_id', distinct=True))
+    if not apps:
+        for survey_id in survey_ids or surveys.values_list('id', flat=True):
+            invalidate(survey_id)
+
+
+def recount_on_commit(survey_id):
+    """Recount ``survey_id`` when the transaction commits, once however many of its rows were deleted."""
+    if survey_id in _ids('deleting'):
+        return
+    pending = _ids('pending')
+    pending.add(survey_id)
+
+    def run():
+        # Every delete queues a run (a rollback drops them all); the first one does the work
+        if survey_id in pending:
+            pending.discard(survey_id)
+            recount([survey_id])
+
+    transaction.on_commit(run)
+
+
+def start_deleting(survey_id):
+    """Skip recounts for a survey whose responses are going with it."""
+    _ids('deleting').add(survey_id)
+
+
+def finish_deleting(survey_id):
+    _ids('deleting').discard(survey_id)
+    invalidate(survey_id)
+
+
+def record_submission(survey, questions, answers):
+    """Count one respondent's ``{question_id: answer}``."""
+    picked = Q(pk__in=[])
+    for question in questions:
+        if question.id in answers:
+            picked |= Q(question_id=question.id, option='')
+            if answers[question.id] in options(question):
+                picked |= Q(question_id=question.id, option=answers[question.id])
+    with transaction.atomic():
+        Survey.objects.filter(id=survey.id).update(response_count=F('response_count') + 1)
+        SurveyAnswerCount.objects.filter(picked).update(count=F('count') + 1)
+
+
+def count_answers(questions):
+    """``{question_id: {'answers': n, option: n, ...}}`` from the counters, in one query."""
+    counts = {question.id: {'answers': 0, **dict.fromkeys(options(question), 0)} for question in questions}
+    rows = SurveyAnswerCount.objects.filter(question__in=list(counts)).values_list('question_id', 'option', 'count')
+    for question_id, option, count in rows:
+        if option == '':
+            counts[question_id]['answers'] = count
+        elif option in counts[question_id]:
+            counts[question_id][option] = count
+    return counts
+
+
+def latest_text_answers(questions):
+    """``{question_id: [answer, ...]}``, the newest TEXT_ANSWERS_SHOWN per text question, in one query."""
+    question_ids = [question.id for question in questions if question.question_type == 'text']
+    if not question_ids:
+        return {}
+    rows = SurveyResponse.objects.filter(question_id__in=question_ids).annotate(
+        position=Window(RowNumber(), partition_by=F('question_id'), order_by=F('id').desc()),
+    ).filter(position__lte=TEXT_ANSWERS_SHOWN).values_list('question_id', 'answer').order_by('question_id', '-id')
+    answers = {}
+    for question_id, answer in rows:
+        answers.setdefault(question_id, []).append(answer)
+    return answers
+
+
+def _results(survey):
+    questions = list(survey.questions.all())
+    counts = count_answers(questions)
+    texts = latest_text_answers(questions)
+
+    results = []
+    for question in questions:
+        question_counts = counts[question.id]
+        result = {
+            'question': question.question_text,
+            'type': question.question_type,
+            'type_display': question.get_question_type_display(),
+            'answers': question_counts['answers'],
+        }
+        if question.question_type == 'choice':
+            result['data'] = {choice: question_counts[choice] for choice in options(question)}
+        elif question.question_type == 'rating':
+            result['data'] = {int(rating): question_counts[rating] for rating in RATINGS}
+            rated = sum(result['data'].values())
+            total = sum(rating * count for rating, count in result['data'].items())
+            result['average'] = round(total / rated, 2) if rated else 0
+        else:
+            result['responses'] = texts.get(question.id, [])
+            result['more'] = question_counts['answers'] - len(result['responses'])
+        results.append(result)
+    return {'results': results, 'total_responses': survey.response_count}
+
+
+def results(survey):
+    """What the results page shows: per-question breakdowns and the number of respondents."""
+    if survey.is_active:
+        return _results(survey)
+    key = f'survey:{survey.id}:{_version(survey.id)}:results'
+    cached = cache.get(key)
+    if cached is None:
+        cached = _results(survey)
+        cache.set(key, cached, None)
+    return cached
@@ -0,0 +1,32 @@
+from django.db import transaction
+
+from jobs.queue import task
+from .models import Notification
+from . import counters
+
+# Rows per Notification insert
+NOTIFICATION_BATCH_SIZE = 500
+
+
+@task
+def send_notifications(user_ids, notification_type, title, message, link=''):
+    Notification.objects.bulk_create(
+        [
+            Notification(user_id=user_id, notification_type=notification_type,
+                         title=title, message=message, link=link)
+            for user_id in user_ids
+        ],
+        batch_size=NOTIFICATION_BATCH_SIZE,
+    )
+
+    def deliver():
+        counters.increment(counters.NOTIFICATIONS, user_ids)
+        from dashboard.realtime import push_to_users
+        push_to_users(
+            user_ids,
+            {'type': 'notification', 'notification_type': notification_type, 'title': title, 'link': link},
+        )
+
+    # Cache and socket side effects can't be rolled back with a failed attempt, so they wait for
+    # the commit; robust, so a failing push can't mark delivered notifications for a retry
+    transaction.on_commit(deliver, robust=True)
@@ -1,3 +1,616 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from clubconnect.testing import QueryBudgetMixin, Route
+from . import counters, roles, surveys
+from .models import (
+    Announcement, BroadcastNotification, Club, ClubPost, Conversation, Event, EventAttendance, MemberPoints, Membership,
+    Message, Notification, Survey, SurveyAnswerCount, SurveyQuestion, SurveyResponse, SurveySubmission,
+    Tag,
+)
+from .utils import broadcast, notify_all_users, notify_club_members
+
+
+class BroadcastNotificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        self.member = User.objects.create_user(username='member', password='password123')
+        self.outsider = User.objects.create_user(username='outsider', password='password123', user_type='founder')
+        Membership.objects.create(user=self.member, club=self.club, status='approved')
+
+    def visible_titles(self, user):
+        return set(BroadcastNotification.visible_to(user.id).values_list('title', flat=True))
+
+    def test_one_row_per_broadcast(self):
+        notify_all_users('announcement', 'Hello', 'Everyone')
+        notify_club_members(self.club, 'event', 'Meetup', 'Members only')
+        broadcast('role', 'general', 'Founders', 'Founders only', role='founder')
+        self.assertEqual(BroadcastNotification.objects.count(), 3)
+
+        self.assertEqual(self.visible_titles(self.member), {'Hello', 'Meetup'})
+        self.assertEqual(self.visible_titles(self.outsider), {'Hello', 'Founders'})
+
+    def test_users_do_not_see_broadcasts_from_before_they_joined(self):
+        notify_club_members(self.club, 'event', 'Old news', '')
+        late = User.objects.create_user(username='late', password='password123')
+        Membership.objects.create(user=late, club=self.club, status='approved')
+        self.assertEqual(self.visible_titles(late), set())
+
+    def test_unread_badge_counts_broadcasts_until_read(self):
+        self.assertEqual(counters.unread_notifications(self.member.id), 0)
+        notice = notify_all_users('announcement', 'Hello', 'Everyone')
+        self.assertEqual(counters.unread_notifications(self.member.id), 1)
+
+        self.client.force_login(self.member)
+        self.client.post(reverse('mark_broadcast_read', args=[notice.id]))
+        self.client.post(reverse('mark_broadcast_read', args=[notice.id]))
+        self.assertEqual(counters.unread_notifications(self.member.id), 0)
+        self.assertEqual(counters.count_from_db(counters.BROADCASTS, self.member.id), 0)
+        self.assertEqual(counters.unread_notifications(self.outsider.id), 1)
+
+    def test_club_broadcast_only_resets_its_members(self):
+        counters.unread_notifications(self.member.id)
+        counters.unread_notifications(self.outsider.id)
+        notify_club_members(self.club, 'event', 'Meetup', 'Members only')
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.unread_notifications(self.outsider.id), 0)
+        self.assertEqual(counters.unread_notifications(self.member.id), 1)
+
+    def test_mark_read_needs_post(self):
+        notice = notify_all_users('announcement', 'Hello', 'Everyone')
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('mark_broadcast_read', args=[notice.id]))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(counters.unread_notifications(self.member.id), 1)
+
+    def test_notifications_page_merges_personal_and_broadcasts(self):
+        from .tasks import send_notifications
+        send_notifications([self.member.id], 'general', 'Personal', '')
+        notify_club_members(self.club, 'event', 'Meetup', '')
+
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('notifications'))
+        self.assertEqual([n.title for n in response.context['notifications']], ['Meetup', 'Personal'])
+        self.assertEqual(response.context['unread_count'], 2)
+
+
+class ClubDetailQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        self.founder = User.objects.create_user(username='founder', password='password123', user_type='founder')
+        self.club.founders.add(self.founder)
+        self.student = User.objects.create_user(username='student', password='password123')
+
+        def add_content(count):
+            now = timezone.now()
+            for i in range(count):
+                event = Event.objects.create(club=self.club, title=f'Event {i}', description='', location='Hall',
+                                             start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=1))
+                EventAttendance.objects.create(event=event, user=self.student)
+                post = ClubPost.objects.create(club=self.club, author=self.founder, title=f'Post {i}', content='')
+                post.likes.add(self.student, self.founder)
+                Announcement.objects.create(club=self.club, author=self.founder, title=f'News {i}', content='')
+        self.add_content = add_content
+
+    def count_queries(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('club_detail', args=[self.club.id]))
+        self.assertEqual(response.status_code, 200)
+        return len(captured), response
+
+    def test_query_count_does_not_grow_with_events_and_posts(self):
+        for user in (self.founder, self.student):
+            with self.subTest(user=user.username):
+                cache.clear()
+                self.add_content(1)
+                small, _ = self.count_queries(user)
+                cache.clear()
+                self.add_content(10)
+                large, response = self.count_queries(user)
+                self.assertEqual(small, large)
+
+    def test_role_flags_and_like_state(self):
+        self.add_content(2)
+        _, response = self.count_queries(self.founder)
+        self.assertTrue(response.context['is_founder'])
+        self.assertTrue(response.context['is_rep'])
+        self.assertContains(response, 'Manage Attendance (1)')
+        self.assertContains(response, '2 likes')
+
+        _, response = self.count_queries(User.objects.create_user(username='other', password='password123'))
+        self.assertFalse(response.context['is_rep'])
+        self.assertNotContains(response, 'Manage Attendance')
+        self.assertFalse(any(post.is_liked for post in response.context['recent_posts']))
+
+    def test_cached_fragments_skip_founder_and_announcement_queries(self):
+        self.add_content(3)
+        cold, _ = self.count_queries(self.student)
+        warm, _ = self.count_queries(self.student)
+        self.assertLess(warm, cold)
+
+        Announcement.objects.create(club=self.club, author=self.founder, title='Fresh news', content='')
+        _, response = self.count_queries(self.student)
+        self.assertContains(response, 'Fresh news')
+
+
+@override_settings(SHARED_CACHE=True)
+class ClubRolesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        self.user = User.objects.create_user(username='student', password='password123')
+
+    def fresh_roles(self):
+        return roles.for_user(User.objects.get(pk=self.user.pk))
+
+    def test_roles_are_cached_across_requests(self):
+        Membership.objects.create(user=self.user, club=self.club, status='approved')
+        self.assertTrue(self.fresh_roles().is_member(self.club))
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.for_user(user).is_member(self.club.id))
+            self.assertFalse(roles.for_user(user).is_rep(self.club))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_per_process_cache_is_not_trusted(self):
+        self.fresh_roles()
+        # A revoked role must not outlive the request on another worker
+        with self.assertNumQueries(3):
+            roles.for_user(User(pk=self.user.pk))
+
+    def test_membership_changes_invalidate(self):
+        membership = Membership.objects.create(user=self.user, club=self.club, status='pending')
+        self.assertTrue(self.fresh_roles().is_pending(self.club))
+        membership.status = 'approved'
+        membership.save()
+        self.assertTrue(self.fresh_roles().is_member(self.club))
+        membership.delete()
+        self.assertEqual(self.fresh_roles().roles(self.club), ())
+
+    def test_founder_changes_invalidate(self):
+        self.assertFalse(self.fresh_roles().is_founder(self.club))
+        self.club.founders.add(self.user)
+        self.assertTrue(self.fresh_roles().is_founder(self.club))
+        self.club.founders.clear()
+        self.assertFalse(self.fresh_roles().is_founder(self.club))
+        self.user.founded_clubs.add(self.club)
+        self.assertTrue(self.fresh_roles().is_rep(self.club))
+
+    def test_president_changes_invalidate(self):
+        self.assertFalse(self.fresh_roles().is_rep(self.club))
+        self.club.president = self.user
+        self.club.save()
+        self.assertTrue(self.fresh_roles().is_rep(self.club))
+        self.club.president = None
+        self.club.save()
+        self.assertFalse(self.fresh_roles().is_rep(self.club))
+
+
+class ConversationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.low = User.objects.create_user(username='low', password='password123')
+        self.high = User.objects.create_user(username='high', password='password123')
+        self.other = User.objects.create_user(username='other', password='password123')
+
+    def send(self, sender, receiver, content='hi'):
+        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def test_one_row_per_pair_stored_low_high(self):
+        self.send(self.high, self.low)
+        self.send(self.low, self.high)
+        conversation = Conversation.objects.get()
+        self.assertEqual((conversation.user_low, conversation.user_high), (self.low, self.high))
+        self.assertEqual(Conversation.ordered_pair(self.high.id, self.low.id), (self.low.id, self.high.id))
+
+    def test_send_updates_last_message_and_unread_side(self):
+        self.send(self.low, self.high, 'first')
+        last = self.send(self.low, self.high, 'second')
+        conversation = Conversation.objects.get()
+        self.assertEqual((conversation.last_message, conversation.last_activity_at), (last, last.created_at))
+        self.assertEqual((conversation.unread_low, conversation.unread_high), (0, 2))
+        self.assertEqual(Conversation.unread_by_partner(self.high.id), {self.low.id: 2})
+
+        Conversation.record_read(self.high.id, self.low.id)
+        self.assertEqual(Conversation.unread_by_partner(self.high.id), {})
+
+    def test_partner_ids(self):
+        self.send(self.low, self.high)
+        self.send(self.other, self.high)
+        as_low, as_high = Conversation.partner_ids(self.high)
+        self.assertEqual({*as_low.values_list('user_high', flat=True), *as_high.values_list('user_low', flat=True)},
+                         {self.low.id, self.other.id})
+
+    def test_backfill(self):
+        from django.apps import apps
+        from importlib import import_module
+        build_conversations = import_module('clubs.migrations.0007_conversation').build_conversations
+
+        self.send(self.high, self.low)
+        last = self.send(self.low, self.high)
+        Message.objects.filter(id=last.id).update(is_read=True)
+        self.send(self.other, self.low)
+        expected = set(Conversation.objects.values_list('user_low', 'user_high', 'last_message', 'unread_low'))
+        Conversation.objects.all().delete()
+
+        build_conversations(apps, None)
+        self.assertEqual(set(Conversation.objects.values_list('user_low', 'user_high', 'last_message', 'unread_low')),
+                         expected)
+        self.assertEqual(Conversation.objects.get(user_high=self.high).unread_high, 0)
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = User.objects.create_user(username='sender', password='password123')
+        self.receiver = User.objects.create_user(username='receiver', password='password123')
+
+    def unread(self):
+        return counters.get_count(counters.MESSAGES, self.receiver.id)
+
+    def test_send_increments_without_recounting(self):
+        self.assertEqual(self.unread(), 0)
+        Message.objects.create(sender=self.sender, receiver=self.receiver, content='hi')
+        Message.objects.create(sender=self.sender, receiver=self.receiver, content='again')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 2)
+
+    def test_read_resets(self):
+        Message.objects.create(sender=self.sender, receiver=self.receiver, content='hi')
+        self.assertEqual(self.unread(), 1)
+        self.client.force_login(self.receiver)
+        self.client.post(reverse('mark_messages_as_read', args=[self.sender.id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 0)
+
+    def test_evicted_counter_is_rebuilt(self):
+        self.unread()
+        Message.objects.create(sender=self.sender, receiver=self.receiver, content='hi')
+        cache.delete(f'unread:{counters.MESSAGES}:{self.receiver.id}')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.unread(), 1)
+        # Writes the counter never saw (bulk inserts skip signals) are picked up by the recount
+        Message.objects.bulk_create([Message(sender=self.sender, receiver=self.receiver, content='lost')])
+        cache.clear()
+        self.assertEqual(self.unread(), 2)
+
+    def test_reconcile_fixes_drift(self):
+        from django.core.management import call_command
+        Message.objects.create(sender=self.sender, receiver=self.receiver, content='hi')
+        Notification.objects.create(user=self.receiver, notification_type='general', title='Hi', message='')
+        self.unread()
+        counters.get_count(counters.NOTIFICATIONS, self.receiver.id)
+        cache.set(f'unread:{counters.MESSAGES}:{self.receiver.id}', 7)
+        cache.set(f'unread:{counters.NOTIFICATIONS}:{self.receiver.id}', 0)
+
+        call_command('reconcile_unread_counters', '--all', stdout=io.StringIO())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 1)
+            self.assertEqual(counters.get_count(counters.NOTIFICATIONS, self.receiver.id), 1)
+
+
+class TagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password123')
+        self.robotics = Club.objects.create(name='Robotics', short_description='', long_description='',
+                                            domain_tags='AI, Hardware, ai')
+        self.chess = Club.objects.create(name='Chess', short_description='', long_description='',
+                                         domain_tags='Games,  Chair Sports')
+
+    def counts(self):
+        return dict(Tag.objects.values_list('slug', 'club_count'))
+
+    def test_domain_tags_are_split_into_tags(self):
+        self.assertEqual(sorted(self.robotics.tags.values_list('slug', flat=True)), ['ai', 'hardware'])
+        self.assertEqual(self.counts(), {'ai': 1, 'hardware': 1, 'games': 1, 'chair-sports': 1})
+
+    def test_counts_follow_edits_and_deletes(self):
+        self.chess.domain_tags = 'games, AI'
+        self.chess.save()
+        self.assertEqual(self.counts(), {'ai': 2, 'hardware': 1, 'games': 1, 'chair-sports': 0})
+        self.robotics.delete()
+        self.assertEqual(self.counts(), {'ai': 1, 'hardware': 0, 'games': 1, 'chair-sports': 0})
+
+    def test_saves_that_keep_domain_tags_skip_the_sync(self):
+        with mock.patch.object(Club, 'sync_tags') as sync_tags:
+            self.chess.save(update_fields=['president'])
+            self.chess.long_description = 'Openings'
+            self.chess.save()
+            self.chess.domain_tags = 'games'
+            self.chess.save(update_fields=['domain_tags'])
+        sync_tags.assert_called_once_with()
+
+    def test_tag_filter_matches_whole_tags(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('clubs_list'), {'tag': 'ai'})
+        self.assertEqual(list(response.context['clubs']), [self.robotics])
+        self.assertEqual(response.context['selected_tag'].slug, 'ai')
+
+        response = self.client.get(reverse('search_clubs'), {'tag': 'ai', 'q': 'chess'})
+        self.assertEqual(response.context['clubs'], [])
+        response = self.client.get(reverse('search_clubs'), {'tag': 'games', 'q': 'chess'})
+        self.assertEqual(response.context['clubs'], [self.chess])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        self.founder = User.objects.create_user(username='founder', password='password123', user_type='founder')
+        self.club.founders.add(self.founder)
+        self.students = [User.objects.create_user(username=f'student{i}', password='password123') for i in range(3)]
+        now = timezone.now()
+        self.event = Event.objects.create(club=self.club, title='Blitz', description='', location='Hall',
+                                          start_time=now, end_time=now + timedelta(hours=1))
+        for i, student in enumerate(self.students):
+            EventAttendance.objects.create(event=self.event, user=student, checked_in_via_qr=i == 0)
+            MemberPoints.objects.create(user=student, club=self.club, points=10 * i)
+        self.survey = Survey.objects.create(club=self.club, creator=self.founder, title='Feedback', description='')
+        question = SurveyQuestion.objects.create(survey=self.survey, question_text='Rating?', question_type='rating', order=1)
+        SurveyResponse.objects.create(survey=self.survey, user=self.students[0], question=question, answer='5')
+        self.client.force_login(self.founder)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_attendance_csv(self):
+        response = self.client.get(reverse('export_event_attendance', args=[self.event.id]))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'event_{self.event.id}_attendance.csv', response['Content-Disposition'])
+        rows = list(csv.reader(self.read(response).splitlines()))
+        self.assertEqual(rows[0], ['username', 'email', 'checked_in_at', 'checked_in_via_qr'])
+        self.assertEqual([row[0] for row in rows[1:]], ['student0', 'student1', 'student2'])
+        self.assertEqual(rows[1][3], 'True')
+
+    def test_leaderboard_jsonl(self):
+        response = self.client.get(reverse('export_leaderboard', args=[self.club.id]), {'format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([(row['username'], row['points']) for row in rows],
+                         [('student2', 20), ('student1', 10), ('student0', 0)])
+
+    def test_survey_responses(self):
+        response = self.client.get(reverse('export_survey_responses', args=[self.survey.id]), {'format': 'jsonl'})
+        row = json.loads(self.read(response))
+        self.assertEqual((row['username'], row['question'], row['answer']), ('student0', 'Rating?', '5'))
+
+    async def test_streams_under_asgi(self):
+        await self.async_client.aforce_login(self.founder)
+        with mock.patch('clubs.exports.CHUNK_SIZE', 2), self.assertNoLogs('django.request', 'WARNING'):
+            response = await self.async_client.get(reverse('export_event_attendance', args=[self.event.id]))
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        # Header and three rows, two lines per chunk
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual([row[0] for row in csv.reader(b''.join(chunks).decode().splitlines())][1:],
+                         ['student0', 'student1', 'student2'])
+
+    def test_members_cannot_export(self):
+        self.client.force_login(self.students[0])
+        response = self.client.get(reverse('export_event_attendance', args=[self.event.id]))
+        self.assertRedirects(response, reverse('club_detail', args=[self.club.id]), fetch_redirect_response=False)
+
+
+class SurveyResultsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        self.founder = User.objects.create_user(username='founder', password='password123', user_type='founder')
+        self.club.founders.add(self.founder)
+        self.survey = Survey.objects.create(club=self.club, creator=self.founder, title='Feedback', description='')
+        self.rating = SurveyQuestion.objects.create(survey=self.survey, question_text='Rating?', question_type='rating', order=1)
+        self.choice = SurveyQuestion.objects.create(survey=self.survey, question_text='Day?', question_type='choice',
+                                                    choices='Mon, Fri', order=2)
+        self.text = SurveyQuestion.objects.create(survey=self.survey, question_text='Why?', question_type='text', order=3)
+        self.students = []
+        for i, (rating, day) in enumerate([('5', 'Fri'), ('3', 'Fri'), ('4', 'Mon')]):
+            self.submit(self.create_student(i), rating, day, f'reason {i}')
+
+    def create_student(self, i):
+        student = User.objects.create_user(username=f'student{i}', password='password123')
+        Membership.objects.create(user=student, club=self.club, status='approved')
+        self.students.append(student)
+        return student
+
+    def submit(self, student, rating, day, reason):
+        self.client.force_login(student)
+        self.client.post(reverse('view_survey', args=[self.survey.id]), {
+            f'answer_{self.rating.id}': rating, f'answer_{self.choice.id}': day, f'answer_{self.text.id}': reason,
+        })
+
+    def results(self):
+        self.survey.refresh_from_db()
+        found = surveys.results(self.survey)
+        return found['total_responses'], {result['question']: result for result in found['results']}
+
+    def test_counts_and_average(self):
+        total, results = self.results()
+        self.assertEqual(total, 3)
+        self.assertEqual(results['Rating?']['data'], {1: 0, 2: 0, 3: 1, 4: 1, 5: 1})
+        self.assertEqual(results['Rating?']['average'], 4)
+        self.assertEqual(results['Day?']['data'], {'Mon': 1, 'Fri': 2})
+        self.assertEqual(results['Why?']['responses'], ['reason 2', 'reason 1', 'reason 0'])
+        self.assertEqual(results['Why?']['more'], 0)
+
+    def test_counters_match_a_recount(self):
+        self.submit(self.create_student(3), '1', 'Mon', 'reason 3')
+        self.assertEqual(Survey.objects.get(id=self.survey.id).response_count, 4)
+        counted = list(SurveyAnswerCount.objects.order_by('id').values_list('question_id', 'option', 'count'))
+        self.assertIn((self.choice.id, 'Mon', 2), counted)
+        surveys.recount([self.survey.id])
+        self.assertEqual(list(SurveyAnswerCount.objects.order_by('id').values_list('question_id', 'option', 'count')),
+                         counted)
+
+    def test_deleted_answers_are_recounted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SurveyResponse.objects.filter(user=self.students[0]).delete()
+        total, results = self.results()
+        self.assertEqual((total, results['Rating?']['data'][5], results['Day?']['data']['Fri']), (2, 0, 1))
+
+    def add_respondents(self, count):
+        users = User.objects.bulk_create([User(username=f'extra{i}') for i in range(count)])
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(survey=self.survey, user=user, question=question, answer='5')
+            for user in users for question in (self.rating, self.choice, self.text)
+        ])
+        return users
+
+    def test_deleting_responses_recounts_once(self):
+        users = self.add_respondents(200)
+        with CaptureQueriesContext(connection) as few, self.captureOnCommitCallbacks(execute=True):
+            SurveyResponse.objects.filter(user__in=users[:2]).delete()
+        with CaptureQueriesContext(connection) as many, self.captureOnCommitCallbacks(execute=True):
+            SurveyResponse.objects.filter(user__in=users[2:]).delete()
+        # Only the DELETE batches grow with the number of rows, not the recount
+        def recount_queries(captured):
+            return [query['sql'] for query in captured if not query['sql'].startswith('DELETE')]
+        self.assertEqual(len(recount_queries(many)), len(recount_queries(few)))
+        self.assertEqual(self.results()[0], 3)
+
+    def test_deleting_a_survey_skips_recounts(self):
+        self.add_respondents(500)
+        batches = -(-SurveyResponse.objects.count() // 100)
+        # Collect the questions and responses, then delete the counters, the submissions, the responses
+        # 100 at a time, the questions and the survey; no recount. It used to be one recount per response.
+        with self.assertNumQueries(3 + 2 + batches + 2), self.captureOnCommitCallbacks(execute=True):
+            self.survey.delete()
+
+    def test_text_answers_are_truncated(self):
+        for i in range(surveys.TEXT_ANSWERS_SHOWN):
+            self.submit(self.create_student(i + 3), '5', 'Fri', f'reason {i + 3}')
+        self.survey.refresh_from_db()
+        with self.assertNumQueries(3):
+            surveys.results(self.survey)
+        _, results = self.results()
+        self.assertEqual(len(results['Why?']['responses']), surveys.TEXT_ANSWERS_SHOWN)
+        self.assertEqual(results['Why?']['responses'][0], f'reason {surveys.TEXT_ANSWERS_SHOWN + 2}')
+        self.assertEqual(results['Why?']['more'], 3)
+
+    def test_closed_survey_results_are_cached(self):
+        self.survey.is_active = False
+        self.survey.save()
+        self.results()
+        with self.assertNumQueries(0):
+            surveys.results(self.survey)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SurveyResponse.objects.filter(user=self.students[0]).delete()
+        self.assertEqual(self.results()[0], 2)
+
+    def test_submission_awards_points_once(self):
+        student = self.students[0]
+        self.assertEqual(MemberPoints.objects.get(user=student, club=self.club).points, 5)
+        self.submit(student, '1', 'Mon', 'again')
+        points = MemberPoints.objects.get(user=student, club=self.club)
+        self.assertEqual((points.points, points.contribution_count), (5, 1))
+        self.assertEqual(self.results()[0], 3)
+
+    def test_racing_submission_is_rejected_by_the_database(self):
+        student = self.create_student(3)
+        self.client.force_login(student)
+        url = reverse('view_survey', args=[self.survey.id])
+        self.client.post(url, {f'answer_{self.rating.id}': '1'})
+        # Both requests saw no earlier submission and answered different questions,
+        # so only the (survey, user) submission row conflicts
+        with mock.patch.object(SurveySubmission.objects, 'filter', return_value=SurveySubmission.objects.none()):
+            self.client.post(url, {f'answer_{self.choice.id}': 'Mon'})
+        self.assertEqual(list(SurveyResponse.objects.filter(user=student).values_list('answer', flat=True)), ['1'])
+        self.assertEqual(MemberPoints.objects.get(user=student, club=self.club).points, 5)
+        total, results = self.results()
+        self.assertEqual((total, results['Rating?']['data'][1], results['Day?']['data']['Mon']), (4, 1, 1))
+
+    def test_submissions_are_backfilled(self):
+        from django.apps import apps
+        from importlib import import_module
+        SurveySubmission.objects.all().delete()
+        import_module('clubs.migrations.0013_survey_submission').record_submissions(apps, None)
+        self.assertEqual(set(SurveySubmission.objects.values_list('user_id', flat=True)),
+                         {student.id for student in self.students})
+
+    def test_create_survey_adds_questions_and_counters(self):
+        self.client.force_login(self.founder)
+        self.client.post(reverse('create_survey', args=[self.club.id]), {
+            'title': 'Venue', 'description': '',
+            'question_text_1': 'Where?', 'question_type_1': 'choice', 'question_choices_1': 'Hall, Lab',
+            'question_text_2': 'Score?', 'question_type_2': 'rating', 'question_choices_2': '',
+        })
+        survey = Survey.objects.get(title='Venue')
+        self.assertEqual([question.question_text for question in survey.questions.all()], ['Where?', 'Score?'])
+        self.assertEqual(SurveyAnswerCount.objects.filter(question__survey=survey).count(), 3 + 6)
+
+    def test_closed_survey_takes_no_answers(self):
+        Survey.objects.filter(id=self.survey.id).update(is_active=False)
+        self.submit(self.create_student(3), '1', 'Mon', 'reason 3')
+        self.assertFalse(SurveyResponse.objects.filter(user=self.students[3]).exists())
+
+
+class ClubRouteQueryBudgetTests(QueryBudgetMixin, TestCase):
+    URLCONF = 'clubs.urls'
+    club = lambda world: {'club_id': world.club.id}
+    event = lambda world: {'event_id': world.event.id}
+
+    ROUTES = [
+        Route('clubs_list', 'student', 11),
+        Route('create_club', 'admin', 8),
+        Route('assign_founder', 'admin', 10, club),
+        Route('club_detail', 'student', 20, club),
+        Route('club_detail', 'founder', 20, club),
+        Route('edit_club', 'founder', 12, club),
+        Route('search_clubs', 'student', 14, data={'q': 'robot'}),
+        Route('register_for_club', 'student', 10, lambda world: {'club_id': world.other_club.id}),
+        Route('message_founder', 'student', 10, club),
+        Route('create_event', 'founder', 12, club),
+        Route('club_chat', 'student', 15, club),
+        Route('approve_membership', 'founder', 13, lambda world: {'membership_id': world.pending.id}, status=302),
+        Route('reject_membership', 'founder', 13, lambda world: {'membership_id': world.pending.id}, status=302),
+        Route('leave_club', 'student', 10, club),
+        Route('create_club_announcement', 'founder', 12, club),
+        Route('delete_club_announcement', 'founder', 15,
+              lambda world: {'announcement_id': world.club_announcement.id}, status=302),
+        Route('generate_event_qr', 'founder', 11, event, status=302),
+        Route('event_checkin', 'student', 15, event, status=302),
+        Route('event_register', 'student', 9, event, status=302),
+        Route('download_event_qr', 'student', 8, event),
+        Route('manage_event_attendance', 'founder', 15, event),
+        Route('export_event_attendance', 'founder', 11, event),
+        Route('create_survey', 'founder', 12, club),
+        Route('view_survey', 'student', 12, lambda world: {'survey_id': world.survey.id}),
+        Route('survey_results', 'founder', 15, lambda world: {'survey_id': world.survey.id}),
+        Route('export_survey_responses', 'founder', 11, lambda world: {'survey_id': world.survey.id}),
+        Route('create_club_post', 'founder', 12, club),
+        Route('like_post', 'student', 10, lambda world: {'post_id': world.post.id}),
+        Route('club_leaderboard', 'student', 13, club),
+        Route('export_leaderboard', 'founder', 11, club, data={'format': 'jsonl'}),
+        Route('toggle_favorite_club', 'student', 9, club, status=302),
+        Route('submit_club_feedback', 'student', 9, club),
+        Route('view_club_feedbacks', 'founder', 13, club),
+        Route('update_feedback_status', 'founder', 14, lambda world: {'feedback_id': world.feedback.id},
+              method='post', data={'status': 'reviewed'}, status=302),
+        Route('book_mentor_session', 'student', 12, club),
+        Route('view_mentor_sessions', 'founder', 13, club),
+        Route('update_mentor_session', 'founder', 14, lambda world: {'session_id': world.mentor_session.id},
+              method='post', data={'status': 'approved'}, status=302),
+        Route('create_club_meeting', 'founder', 12, club),
+        Route('join_club_meeting', 'student', 15,
+              lambda world: {'club_id': world.club.id, 'meeting_link': 'live-room'}),
+        Route('start_club_meeting', 'founder', 14, lambda world: {'meeting_id': world.meeting.id},
+              method='post', status=302),
+        Route('end_club_meeting', 'founder', 14, lambda world: {'meeting_id': world.live_meeting.id},
+              method='post', status=302),
+    ]
@@ -23,15 +23,18 @@ urlpatterns = [
     path('event/<int:event_id>/register/', views.event_register, name='event_register'),
     path('event/<int:event_id>/download-qr/', views.download_event_qr, name='download_event_qr'),
     path('event/<int:event_id>/manage-attendance/', views.manage_event_attendance, name='manage_event_attendance'),
+    path('event/<int:event_id>/export-attendance/', views.export_event_attendance, name='export_event_attendance'),
     
     path('<int:club_id>/create-survey/', views.create_survey, name='create_survey'),
     path('survey/<int:survey_id>/', views.view_survey, name='view_survey'),
     path('survey/<int:survey_id>/results/', views.survey_results, name='survey_results'),
+    path('survey/<int:survey_id>/export/', views.export_survey_responses, name='export_survey_responses'),
     
     path('<int:club_id>/create-post/', views.create_club_post, name='create_club_post'),
     path('post/<int:post_id>/like/', views.like_post, name='like_post'),
     
     path('<int:club_id>/leaderboard/', views.club_leaderboard, name='club_leaderboard'),
+    path('<int:club_id>/leaderboard/export/', views.export_leaderboard, name='export_leaderboard'),
     
     path('<int:club_id>/toggle-favorite/', views.toggle_favorite_club, name='toggle_favorite_club'),
     
@@ -1,7 +1,9 @@
 import qrcode
 from io import BytesIO
 from django.core.files import File
-from .models import Notification
+from jobs.queue import enqueue
+from .models import BroadcastNotification
+from . import counters, tasks
 
 
 def generate_qr_code_for_event(event, request=None):
@@ -40,21 +42,32 @@ def generate_qr_code_for_event(event, request=None):
 
 
 def create_notification(users, notification_type, title, message, link=''):
-    notifications = []
-    for user in users:
-        notification = Notification(
-            user=user,
-            notification_type=notification_type,
-            title=title,
-            message=message,
-            link=link
-        )
-        notifications.append(notification)
-    Notification.objects.bulk_create(notifications)
+    notify_user_ids([user.id for user in users], notification_type, title, message, link)
+
+
+def notify_user_ids(user_ids, notification_type, title, message, link=''):
+    user_ids = list(user_ids)
+    if user_ids:
+        enqueue(tasks.send_notifications, user_ids=user_ids, notification_type=notification_type,
+                title=title, message=message, link=link)
+
+
+def broadcast(scope, notification_type, title, message, link='', club=None, role=''):
+    """Notify a whole audience with a single BroadcastNotification row."""
+    notification = BroadcastNotification.objects.create(
+        scope=scope, club=club, role=role, notification_type=notification_type,
+        title=title, message=message, link=link,
+    )
+    counters.new_broadcast(notification.club_id if scope == 'club' else None)
+
+    from dashboard.realtime import push_broadcast
+    push_broadcast(notification)
+    return notification
 
 
 def notify_club_members(club, notification_type, title, message, link=''):
-    from clubs.models import Membership
-    members = Membership.objects.filter(club=club, status='approved').select_related('user')
-    users = [m.user for m in members]
-    create_notification(users, notification_type, title, message, link)
+    return broadcast('club', notification_type, title, message, link, club=club)
+
+
+def notify_all_users(notification_type, title, message, link=''):
+    return broadcast('all', notification_type, title, message, link)
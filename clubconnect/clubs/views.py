@@ -4,14 +4,42 @@ from django.contrib import messages
 from django.db.models import Q
 from django.http import HttpResponseForbidden
 from django.views.decorators.http import require_POST
-from .models import Club, Event, Membership, Message, Announcement
+from .models import Club, Event, Membership, Message, Announcement, Tag
 from accounts.models import User
 from .forms import ClubForm, EventForm, ClubRegistrationForm, MessageForm, AnnouncementForm
+from dashboard.realtime import push_message
+from . import exports, roles, surveys
+from clubconnect.pagination import paginate
+from accounts import presence
+
+# Tags shown in the facet sidebar, most used first
+TAG_FACETS = 30
+CLUBS_PER_PAGE = 24
+CLUB_CHAT_PAGE_SIZE = 50
+
+def tag_facets(selected_slug=None):
+    """The popular tags plus the selected one, straight from the precomputed counts."""
+    tags = list(Tag.objects.filter(club_count__gt=0).order_by('-club_count', 'name')[:TAG_FACETS])
+    selected = None
+    if selected_slug:
+        selected = next((tag for tag in tags if tag.slug == selected_slug), None)
+        if selected is None:
+            selected = Tag.objects.filter(slug=selected_slug).first()
+    return tags, selected
 
 @login_required
 def clubs_list(request):
-    clubs = Club.objects.all()
-    return render(request, 'clubs/clubs_list.html', {'clubs': clubs})
+    tags, selected_tag = tag_facets(request.GET.get('tag'))
+    clubs = Club.objects.prefetch_related('tags')
+    if request.GET.get('tag'):
+        clubs = clubs.filter(tags__slug=request.GET['tag'])
+    page = paginate(request, clubs, ['name'], CLUBS_PER_PAGE)
+    return render(request, 'clubs/clubs_list.html', {
+        'clubs': page,
+        'page_obj': page,
+        'tags': tags,
+        'selected_tag': selected_tag,
+    })
 
 # Admin-only club creation
 @login_required
@@ -75,33 +103,54 @@ def assign_founder(request, club_id):
 
 # Club detail view
 def club_detail(request, club_id):
+    from django.db.models import Count, Exists, OuterRef, Value
+    from .models import ClubPost, Survey, EventAttendance
+    from .cache import club_version
+
     club = get_object_or_404(Club, id=club_id)
-    events = Event.objects.filter(club=club).order_by('start_time').prefetch_related('attendances__user')
+    user = request.user
+
+    # Every permission check on the page comes from these flags
+    user_roles = roles.for_user(user)
+    is_founder = user_roles.is_founder(club)
+    is_rep = user_roles.is_rep(club)
+    is_member = user_roles.is_member(club)
+    is_favorite = False
+    user_registered_events = set()
+    if user.is_authenticated:
+        is_favorite = club.favorited_by.filter(id=user.id).exists()
+        user_registered_events = set(EventAttendance.objects.filter(
+            event__club=club,
+            user=user
+        ).values_list('event_id', flat=True))
+
+    events = Event.objects.filter(club=club).order_by('start_time').annotate(
+        attendance_count=Count('attendances')
+    )
+    # Only evaluated when the fragment caches miss
     founders = club.founders.all()
     announcements = Announcement.objects.filter(club=club).order_by('-created_at')[:5]
-    is_member = False
-    
-    if request.user.is_authenticated:
-        is_member = Membership.objects.filter(user=request.user, club=club, status='approved').exists()
-    
-    from .models import ClubPost, Survey
-    recent_posts = ClubPost.objects.filter(club=club).order_by('-created_at')[:5]
+
+    if user.is_authenticated:
+        liked = ClubPost.likes.through.objects.filter(clubpost=OuterRef('pk'), user_id=user.id)
+        is_liked = Exists(liked)
+    else:
+        is_liked = Value(False)
+    recent_posts = ClubPost.objects.filter(club=club).select_related('author').annotate(
+        like_count=Count('likes'), is_liked=is_liked
+    ).order_by('-created_at')[:5]
     active_surveys = Survey.objects.filter(club=club, is_active=True)
-    
-    user_registered_events = []
-    if request.user.is_authenticated:
-        from .models import EventAttendance
-        user_registered_events = EventAttendance.objects.filter(
-            event__club=club, 
-            user=request.user
-        ).values_list('event_id', flat=True)
-    
+
     context = {
         'club': club,
+        'club_version': club_version(club.id),
         'events': events,
         'founders': founders,
         'announcements': announcements,
         'is_member': is_member,
+        'is_founder': is_founder,
+        'is_rep': is_rep,
+        'is_favorite': is_favorite,
         'recent_posts': recent_posts,
         'active_surveys': active_surveys,
         'user_registered_events': user_registered_events,
@@ -110,19 +159,31 @@ def club_detail(request, club_id):
 
 # Search clubs
 def search_clubs(request):
+    from django.core.paginator import Paginator
+    from django.db.models import prefetch_related_objects
+    from search.backends import get_backend
     query = request.GET.get('q', '')
-    clubs = Club.objects.all()
-    
+    tag = request.GET.get('tag', '')
+    tags, selected_tag = tag_facets(tag)
+    tagged = Club.objects.filter(tags__slug=tag) if tag else None
+
     if query:
-        clubs = clubs.filter(
-            Q(name__icontains=query) | 
-            Q(short_description__icontains=query) |
-            Q(domain_tags__icontains=query)
-        )
+        # Ranked hits from the search index
+        results = get_backend().search(query, ['club'], within=tagged)
+        page_obj = Paginator(results, CLUBS_PER_PAGE).get_page(request.GET.get('page'))
+        clubs = [hit.object for hit in page_obj.object_list]
+    else:
+        matching = tagged if tagged is not None else Club.objects.all()
+        page_obj = Paginator(matching.order_by('name'), CLUBS_PER_PAGE).get_page(request.GET.get('page'))
+        clubs = list(page_obj.object_list)
+    prefetch_related_objects(clubs, 'tags')
     
     context = {
         'clubs': clubs,
         'query': query,
+        'page_obj': page_obj,
+        'tags': tags,
+        'selected_tag': selected_tag,
     }
     return render(request, 'clubs/search_results.html', context)
 
@@ -181,17 +242,18 @@ def send_message_to_founder(request, club_id):
                 is_read=False
             )
             message.save()
+            push_message(message, 'created')
             messages.success(request, "Your message has been sent to the club founder.")
             return redirect('club_detail', club_id=club_id)
     
-    return render(request, 'clubs/send_message.html', {'club': club, 'founders': founders})
+    return render(request, 'clubs/message_founder.html', {'club': club, 'founders': founders})
 
 @login_required
 def edit_club(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
     # Check if user is a founder of this club
-    if not club.founders.filter(id=request.user.id).exists():
+    if not roles.for_user(request.user).is_founder(club):
         messages.error(request, "Only club founders can edit club information.")
         return redirect('club_detail', club_id=club_id)
     
@@ -208,7 +270,7 @@ def edit_club(request, club_id):
 @login_required
 def create_event(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    if not club.founders.filter(id=request.user.id).exists():
+    if not roles.for_user(request.user).is_founder(club):
         messages.error(request, "Only club founders can create events.")
         return redirect('club_detail', club_id=club_id)
     if request.method == 'POST':
@@ -250,15 +312,15 @@ def club_chat(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
     # Check if user is a founder or member of this club
-    is_founder = club.founders.filter(id=request.user.id).exists()
-    is_member = Membership.objects.filter(user=request.user, club=club, status='approved').exists()
+    is_founder = roles.for_user(request.user).is_founder(club)
+    is_member = roles.for_user(request.user).is_member(club)
     
     if not (is_founder or is_member):
         messages.error(request, "You must be a founder or member to access the club chat.")
         return redirect('club_detail', club_id=club.id)
     
     # Get all approved members
-    members = Membership.objects.filter(club=club, status='approved')
+    members = Membership.objects.filter(club=club, status='approved').select_related('user')
 
     # Build recipient list: founders (for students) or members/admins (for founders)
     if is_founder:
@@ -273,26 +335,31 @@ def club_chat(request, club_id):
         content = request.POST.get('content')
         if receiver_id and content:
             receiver = get_object_or_404(User, id=receiver_id)
-            Message.objects.create(
+            message = Message.objects.create(
                 sender=request.user,
                 receiver=receiver,
                 club=club,
                 content=content.strip(),
                 is_read=False,
             )
+            push_message(message, 'created')
             messages.success(request, 'Message sent.')
             return redirect('club_chat', club_id=club_id)
         messages.error(request, 'Please select a recipient and enter a message.')
 
-    # Load club-specific messages (between founders and members only)
-    messages_qs = Message.objects.filter(club=club).order_by('created_at')
-    
+    presence.prefetch(member.user for member in members)
+
+    # Load club-specific messages (between founders and members only), newest page first
+    page = paginate(request, Message.objects.filter(club=club).select_related('sender'),
+                    ['-created_at'], CLUB_CHAT_PAGE_SIZE)
+
     context = {
         'club': club,
         'members': members,
         'is_founder': is_founder,
         'recipient_users': recipient_users,
-        'messages': messages_qs,
+        'messages': page.object_list[::-1],
+        'page_obj': page,
     }
     return render(request, 'clubs/club_chat.html', context)
 
@@ -302,14 +369,14 @@ def approve_membership(request, membership_id):
     club = membership.club
 
     # Ensure the user is a founder of the club
-    if not club.founders.filter(id=request.user.id).exists():
+    if not roles.for_user(request.user).is_founder(club):
         messages.error(request, "Only club founders can approve memberships.")
         return redirect('club_detail', club_id=club.id)
 
     membership.status = 'approved'
     membership.save()
     messages.success(request, f"Membership for {membership.user.username} has been approved.")
-    return redirect('founder_dashboard')
+    return redirect('dashboard')
 
 @login_required
 def leave_club(request, club_id):
@@ -329,19 +396,19 @@ def reject_membership(request, membership_id):
     club = membership.club
 
     # Ensure the user is a founder of the club
-    if not club.founders.filter(id=request.user.id).exists():
+    if not roles.for_user(request.user).is_founder(club):
         messages.error(request, "Only club founders can reject memberships.")
         return redirect('club_detail', club_id=club.id)
 
     membership.status = 'rejected'
     membership.save()
     messages.success(request, f"Membership for {membership.user.username} has been rejected.")
-    return redirect('founder_dashboard')
+    return redirect('dashboard')
 
 @login_required
 def create_club_announcement(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    if not club.founders.filter(id=request.user.id).exists() and not request.user.is_staff:
+    if not roles.for_user(request.user).is_founder(club) and not request.user.is_staff:
         messages.error(request, "You are not authorized to create an announcement for this club.")
         return redirect('club_detail', club_id=club.id)
 
@@ -373,7 +440,7 @@ def create_club_announcement(request, club_id):
 def delete_club_announcement(request, announcement_id):
     announcement = get_object_or_404(Announcement, id=announcement_id)
     club = announcement.club
-    if not club.founders.filter(id=request.user.id).exists() and not request.user.is_staff:
+    if not roles.for_user(request.user).is_founder(club) and not request.user.is_staff:
         messages.error(request, "You are not authorized to delete this announcement.")
         return redirect('club_detail', club_id=club.id)
 
@@ -386,7 +453,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from .models import Event, EventAttendance, Survey, SurveyQuestion, SurveyResponse, ClubPost, MemberPoints, Club, Membership
+from django.db import IntegrityError, transaction
+from .models import Event, EventAttendance, Survey, SurveyQuestion, SurveyResponse, SurveySubmission, ClubPost, MemberPoints, Club, Membership
 from .utils import generate_qr_code_for_event, notify_club_members
 from accounts.models import User
 
@@ -396,7 +464,7 @@ def generate_event_qr(request, event_id):
     event = get_object_or_404(Event, id=event_id)
     club = event.club
     
-    if not club.founders.filter(id=request.user.id).exists() and not request.user.is_admin():
+    if not roles.for_user(request.user).is_founder(club) and not request.user.is_admin():
         messages.error(request, "Only club founders can generate QR codes.")
         return redirect('club_detail', club_id=club.id)
     
@@ -415,9 +483,7 @@ def event_checkin(request, event_id):
     
     # If user_id is provided and requester is authorized, check in that user
     is_authorized = (
-        event.club.founders.filter(id=request.user.id).exists() or
-        request.user == event.club.president or
-        request.user == event.club.vice_president or
+        roles.for_user(request.user).is_rep(event.club_id) or
         request.user.is_admin()
     )
     
@@ -483,11 +549,9 @@ def event_register(request, event_id):
     )
     
     if created:
-        from .models import Notification
-        from .utils import create_notification
-        representatives = event.club.get_representatives()
-        create_notification(
-            representatives,
+        from .utils import notify_user_ids
+        notify_user_ids(
+            event.club.representative_ids(),
             'event',
             f'New Registration for {event.title}',
             f'{request.user.username} registered for the event',
@@ -546,7 +610,7 @@ def download_event_qr(request, event_id):
 def create_survey(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    if not club.founders.filter(id=request.user.id).exists():
+    if not roles.for_user(request.user).is_founder(club):
         messages.error(request, "Only club founders can create surveys.")
         return redirect('club_detail', club_id=club.id)
     
@@ -555,34 +619,39 @@ def create_survey(request, club_id):
         description = request.POST.get('description')
         
         if title:
-            survey = Survey.objects.create(
-                club=club,
-                creator=request.user,
-                title=title,
-                description=description
-            )
-            
-            question_count = int(request.POST.get('question_count', 0))
-            for i in range(question_count):
-                question_text = request.POST.get(f'question_{i}')
-                question_type = request.POST.get(f'type_{i}', 'text')
-                choices = request.POST.get(f'choices_{i}', '')
-                
+            # The form numbers its questions question_text_1, question_text_2, ...
+            questions = []
+            i = 1
+            while f'question_text_{i}' in request.POST:
+                question_text = request.POST.get(f'question_text_{i}')
                 if question_text:
-                    SurveyQuestion.objects.create(
-                        survey=survey,
+                    questions.append(SurveyQuestion(
                         question_text=question_text,
-                        question_type=question_type,
-                        choices=choices,
+                        question_type=request.POST.get(f'question_type_{i}', 'text'),
+                        choices=request.POST.get(f'question_choices_{i}', ''),
                         order=i
-                    )
+                    ))
+                i += 1
+            
+            with transaction.atomic():
+                survey = Survey.objects.create(
+                    club=club,
+                    creator=request.user,
+                    title=title,
+                    description=description
+                )
+                for question in questions:
+                    question.survey = survey
+                # bulk_create skips the post_save signal that adds the answer counters
+                SurveyQuestion.objects.bulk_create(questions)
+                surveys.add_counters(questions)
             
             notify_club_members(
                 club,
                 'general',
                 'New Survey Available',
                 f'A new survey "{title}" has been created in {club.name}',
-                f'/clubs/{club.id}/surveys/{survey.id}/'
+                f'/clubs/survey/{survey.id}/'
             )
             
             messages.success(request, "Survey created successfully!")
@@ -594,37 +663,43 @@ def create_survey(request, club_id):
 @login_required
 def view_survey(request, survey_id):
     survey = get_object_or_404(Survey, id=survey_id)
-    questions = survey.questions.all()
+    questions = list(survey.questions.all())
     
-    user_responses = SurveyResponse.objects.filter(survey=survey, user=request.user)
-    has_responded = user_responses.exists()
+    has_responded = SurveySubmission.objects.filter(survey=survey, user=request.user).exists()
     
-    if request.method == 'POST' and not has_responded:
+    if request.method == 'POST' and not has_responded and survey.is_active:
+        answers = {}
         for question in questions:
-            answer = request.POST.get(f'question_{question.id}')
+            answer = request.POST.get(f'answer_{question.id}')
             if answer:
-                SurveyResponse.objects.create(
-                    survey=survey,
-                    user=request.user,
-                    question=question,
-                    answer=answer
-                )
+                answers[question.id] = answer
         
-        member_points, _ = MemberPoints.objects.get_or_create(
-            user=request.user,
-            club=survey.club
-        )
-        member_points.contribution_count += 1
-        member_points.points += 5
-        member_points.save()
+        if not answers:
+            messages.error(request, "Please answer the survey before submitting.")
+            return redirect('view_survey', survey_id=survey.id)
+        
+        try:
+            with transaction.atomic():
+                # First, so a racing submit fails here whichever questions either one answered
+                SurveySubmission.objects.create(survey=survey, user=request.user)
+                SurveyResponse.objects.bulk_create([
+                    SurveyResponse(survey=survey, user=request.user, question_id=question_id, answer=answer)
+                    for question_id, answer in answers.items()
+                ])
+                surveys.record_submission(survey, questions, answers)
+                MemberPoints.award(request.user.id, survey.club_id, 5, 'contribution_count')
+        except IntegrityError:
+            # The unique (survey, user) submission already exists: a repeated submit
+            messages.info(request, "You have already completed this survey.")
+            return redirect('club_detail', club_id=survey.club_id)
         
         messages.success(request, "Thank you for completing the survey! You earned 5 points.")
-        return redirect('club_detail', club_id=survey.club.id)
+        return redirect('club_detail', club_id=survey.club_id)
     
     context = {
         'survey': survey,
         'questions': questions,
-        'has_responded': has_responded,
+        'already_completed': has_responded,
     }
     return render(request, 'clubs/view_survey.html', context)
 
@@ -633,65 +708,34 @@ def view_survey(request, survey_id):
 def survey_results(request, survey_id):
     survey = get_object_or_404(Survey, id=survey_id)
     
-    if not survey.club.founders.filter(id=request.user.id).exists() and not request.user.is_admin():
+    if not roles.for_user(request.user).is_founder(survey.club_id) and not request.user.is_admin():
         messages.error(request, "Only club founders can view survey results.")
         return redirect('club_detail', club_id=survey.club.id)
     
-    questions = survey.questions.all()
-    results = []
+    context = {'survey': survey, **surveys.results(survey)}
+    return render(request, 'clubs/survey_results.html', context)
+
+
+@login_required
+def export_survey_responses(request, survey_id):
+    survey = get_object_or_404(Survey, id=survey_id)
     
-    for question in questions:
-        question_responses = SurveyResponse.objects.filter(question=question)
-        
-        if question.question_type == 'choice':
-            choices = [c.strip() for c in question.choices.split(',')]
-            choice_counts = {choice: 0 for choice in choices}
-            
-            for response in question_responses:
-                if response.answer in choice_counts:
-                    choice_counts[response.answer] += 1
-            
-            results.append({
-                'question': question.question_text,
-                'type': 'choice',
-                'data': choice_counts,
-            })
-        elif question.question_type == 'rating':
-            ratings = [int(r.answer) for r in question_responses if r.answer.isdigit()]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
-            rating_counts = {i: ratings.count(i) for i in range(1, 6)}
-            
-            results.append({
-                'question': question.question_text,
-                'type': 'rating',
-                'average': round(avg_rating, 2),
-                'data': rating_counts,
-            })
-        else:
-            text_responses = [r.answer for r in question_responses]
-            results.append({
-                'question': question.question_text,
-                'type': 'text',
-                'responses': text_responses,
-            })
+    if not roles.for_user(request.user).is_founder(survey.club_id) and not request.user.is_admin():
+        messages.error(request, "Only club founders can export survey responses.")
+        return redirect('club_detail', club_id=survey.club_id)
     
-    context = {
-        'survey': survey,
-        'results': results,
-        'total_responses': SurveyResponse.objects.filter(survey=survey).values('user').distinct().count(),
-    }
-    return render(request, 'clubs/survey_results.html', context)
+    responses = SurveyResponse.objects.filter(survey=survey).order_by('user_id', 'question__order', 'id').values_list(
+        'user__username', 'question__order', 'question__question_text', 'answer', 'created_at',
+    )
+    header = ['username', 'question_number', 'question', 'answer', 'submitted_at']
+    return exports.export(request, f'survey_{survey.id}_responses', header, responses)
 
 
 @login_required
 def create_club_post(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    is_founder = club.founders.filter(id=request.user.id).exists()
-    is_president = request.user == club.president
-    is_vp = request.user == club.vice_president
-    
-    if not (is_founder or is_president or is_vp):
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can create posts.")
         return redirect('club_detail', club_id=club.id)
     
@@ -737,7 +781,7 @@ def create_club_post(request, club_id):
 def like_post(request, post_id):
     post = get_object_or_404(ClubPost, id=post_id)
     
-    if request.user in post.likes.all():
+    if post.likes.filter(id=request.user.id).exists():
         post.likes.remove(request.user)
         liked = False
     else:
@@ -757,16 +801,32 @@ def club_leaderboard(request, club_id):
     
     context = {
         'club': club,
-        'leaderboard': leaderboard,
+        'rankings': leaderboard,
+        'can_export': roles.for_user(request.user).is_rep(club) or request.user.is_admin(),
     }
     return render(request, 'clubs/leaderboard.html', context)
 
 
+@login_required
+def export_leaderboard(request, club_id):
+    club = get_object_or_404(Club, id=club_id)
+    
+    if not roles.for_user(request.user).is_rep(club) and not request.user.is_admin():
+        messages.error(request, "Only club representatives can export the leaderboard.")
+        return redirect('club_leaderboard', club_id=club.id)
+    
+    points = MemberPoints.objects.filter(club=club).order_by('-points', 'id').values_list(
+        'user__username', 'points', 'participation_count', 'contribution_count',
+    )
+    header = ['username', 'points', 'participation_count', 'contribution_count']
+    return exports.export(request, f'club_{club.id}_leaderboard', header, points)
+
+
 @login_required
 def toggle_favorite_club(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    if request.user in club.favorited_by.all():
+    if club.favorited_by.filter(id=request.user.id).exists():
         club.favorited_by.remove(request.user)
         favorited = False
         messages.success(request, f"Removed {club.name} from your favorites.")
@@ -799,11 +859,9 @@ def submit_club_feedback(request, club_id):
                 description=description
             )
             
-            from .models import Notification
-            from .utils import create_notification
-            representatives = club.get_representatives()
-            create_notification(
-                representatives,
+            from .utils import notify_user_ids
+            notify_user_ids(
+                club.representative_ids(),
                 'general',
                 f'New {feedback.get_feedback_type_display()} from {request.user.username}',
                 f'{title}: {description[:100]}...',
@@ -820,12 +878,12 @@ def submit_club_feedback(request, club_id):
 def view_club_feedbacks(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can view feedbacks.")
         return redirect('club_detail', club_id=club.id)
     
     from .models import ClubFeedback
-    feedbacks = ClubFeedback.objects.filter(club=club)
+    feedbacks = ClubFeedback.objects.filter(club=club).select_related('student')
     
     return render(request, 'clubs/view_feedbacks.html', {'club': club, 'feedbacks': feedbacks})
 
@@ -836,7 +894,7 @@ def update_feedback_status(request, feedback_id):
     feedback = get_object_or_404(ClubFeedback, id=feedback_id)
     club = feedback.club
     
-    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can update feedback status.")
         return redirect('club_detail', club_id=club.id)
     
@@ -866,7 +924,7 @@ def update_feedback_status(request, feedback_id):
 def book_mentor_session(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    is_member = Membership.objects.filter(user=request.user, club=club, status='approved').exists()
+    is_member = roles.for_user(request.user).is_member(club)
     if not is_member:
         messages.error(request, "You must be a club member to book a mentor session.")
         return redirect('club_detail', club_id=club.id)
@@ -892,11 +950,9 @@ def book_mentor_session(request, club_id):
                 preferred_date=aware_datetime
             )
             
-            from .models import Notification
-            from .utils import create_notification
-            representatives = club.get_representatives()
-            create_notification(
-                representatives,
+            from .utils import notify_user_ids
+            notify_user_ids(
+                club.representative_ids(),
                 'general',
                 f'New Mentor Session Request from {request.user.username}',
                 f'Topic: {mentor_topic}',
@@ -913,12 +969,12 @@ def book_mentor_session(request, club_id):
 def view_mentor_sessions(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can view mentor sessions.")
         return redirect('club_detail', club_id=club.id)
     
     from .models import MentorSession
-    sessions = MentorSession.objects.filter(club=club)
+    sessions = MentorSession.objects.filter(club=club).select_related('student', 'assigned_mentor')
     
     return render(request, 'clubs/view_mentor_sessions.html', {'club': club, 'sessions': sessions})
 
@@ -929,7 +985,7 @@ def update_mentor_session(request, session_id):
     session = get_object_or_404(MentorSession, id=session_id)
     club = session.club
     
-    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can manage mentor sessions.")
         return redirect('club_detail', club_id=club.id)
     
@@ -962,7 +1018,7 @@ def update_mentor_session(request, session_id):
 def create_club_meeting(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     
-    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can create meetings.")
         return redirect('club_detail', club_id=club.id)
     
@@ -1024,11 +1080,8 @@ def join_club_meeting(request, club_id, meeting_link):
             messages.error(request, "Multiple meetings found. Please contact support.")
             return redirect('club_detail', club_id=club.id)
     
-    is_member = Membership.objects.filter(user=request.user, club=club, status='approved').exists()
-    is_founder = club.founders.filter(id=request.user.id).exists()
-    is_representative = request.user == club.president or request.user == club.vice_president
-    
-    if not is_member and not is_founder and not is_representative:
+    user_roles = roles.for_user(request.user)
+    if not user_roles.is_member(club) and not user_roles.is_rep(club):
         messages.error(request, "Only club members can join meetings.")
         return redirect('club_detail', club_id=club.id)
     
@@ -1060,10 +1113,9 @@ def start_club_meeting(request, meeting_id):
     club = meeting.club
     
     # Check permissions - only representatives can start meetings
-    representatives = club.get_representatives()
-    if request.user not in representatives:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can start meetings.")
-        return redirect('founder_dashboard')
+        return redirect('dashboard')
     
     # Start the meeting
     if meeting.start_meeting(request.user):
@@ -1080,7 +1132,7 @@ def start_club_meeting(request, meeting_id):
     else:
         messages.error(request, "Unable to start this meeting. It may have already been started or ended.")
     
-    return redirect('founder_dashboard')
+    return redirect('dashboard')
 
 
 @login_required
@@ -1093,19 +1145,18 @@ def end_club_meeting(request, meeting_id):
     club = meeting.club
     
     # Check permissions - only representatives can end meetings
-    representatives = club.get_representatives()
-    if request.user not in representatives:
+    if not roles.for_user(request.user).is_rep(club):
         messages.error(request, "Only club representatives can end meetings.")
-        return redirect('founder_dashboard')
+        return redirect('dashboard')
     
     # Check current status
     if meeting.status == 'ended':
         messages.info(request, f"Meeting '{meeting.title}' has already been ended.")
-        return redirect('founder_dashboard')
+        return redirect('dashboard')
     
     if meeting.status == 'scheduled':
         messages.error(request, f"Cannot end meeting '{meeting.title}' - it hasn't been started yet.")
-        return redirect('founder_dashboard')
+        return redirect('dashboard')
     
     # End the meeting
     if meeting.end_meeting():
@@ -1122,7 +1173,7 @@ def end_club_meeting(request, meeting_id):
     else:
         messages.error(request, f"Unable to end meeting '{meeting.title}'. Please try again.")
     
-    return redirect('founder_dashboard')
+    return redirect('dashboard')
 
 
 @login_required
@@ -1131,7 +1182,7 @@ def manage_event_attendance(request, event_id):
     event = get_object_or_404(Event, id=event_id)
     club = event.club
     
-    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president and not request.user.is_admin():
+    if not roles.for_user(request.user).is_rep(club) and not request.user.is_admin():
         messages.error(request, "Only club representatives can manage event attendance.")
         return redirect('club_detail', club_id=club.id)
     
@@ -1146,3 +1197,18 @@ def manage_event_attendance(request, event_id):
         'checked_in_count': checked_in_count,
     }
     return render(request, 'clubs/manage_attendance.html', context)
+
+
+@login_required
+def export_event_attendance(request, event_id):
+    event = get_object_or_404(Event, id=event_id)
+    
+    if not roles.for_user(request.user).is_rep(event.club_id) and not request.user.is_admin():
+        messages.error(request, "Only club representatives can export event attendance.")
+        return redirect('club_detail', club_id=event.club_id)
+    
+    registrations = EventAttendance.objects.filter(event=event).order_by('id').values_list(
+        'user__username', 'user__email', 'checked_in_at', 'checked_in_via_qr',
+    )
+    header = ['username', 'email', 'checked_in_at', 'checked_in_via_qr']
+    return exports.export(request, f'event_{event.id}_attendance', header, registrations)
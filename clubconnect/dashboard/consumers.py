@@ -0,0 +1,44 @@
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+from accounts import presence
+from .realtime import user_group, broadcast_groups, badge_counts
+
+
+class ChatConsumer(JsonWebsocketConsumer):
+    """Per-tab push channel for chat messages and navbar badge counts.
+
+    Every socket joins its user's group, so events published with
+    ``realtime.push_to_users`` reach all of that user's open tabs, plus one
+    group per broadcast audience the user is in (see ``push_broadcast``).
+    """
+
+    group_names = ()
+
+    def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            self.close()
+            return
+
+        self.group_names = [user_group(user.id), *broadcast_groups(user)]
+        for group_name in self.group_names:
+            async_to_sync(self.channel_layer.group_add)(group_name, self.channel_name)
+        self.accept()
+        presence.connected(user.id)
+        # Send the current counts straight away so the page doesn't have to poll for them
+        self.send_json({'type': 'badges', **badge_counts(user.id)})
+
+    def disconnect(self, code):
+        for group_name in self.group_names:
+            async_to_sync(self.channel_layer.group_discard)(group_name, self.channel_name)
+        if self.group_names:
+            presence.disconnected(self.scope['user'].id)
+
+    def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            # chat.js pings while the tab is open; it doubles as the presence heartbeat
+            presence.ping(self.scope['user'].id)
+            self.send_json({'type': 'pong'})
+
+    def chat_event(self, event):
+        self.send_json(event['payload'])
@@ -1,8 +1,11 @@
-from clubs.models import Notification
+from django.utils.functional import SimpleLazyObject
+from clubs import counters
 
 def notification_count(request):
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+        # Only counted if a template actually renders the badge
+        user_id = request.user.id
+        unread_count = SimpleLazyObject(lambda: counters.unread_notifications(user_id))
         return {
             'unread_notification_count': unread_count
         }
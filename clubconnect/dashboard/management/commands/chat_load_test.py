@@ -0,0 +1,135 @@
+import random
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from accounts.models import User
+from clubconnect.benchmarks import throwaway_database, QueryCounter
+from dashboard.realtime import user_group
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the traffic chat.js generates for many open chat tabs, once with "
+        "the old 3s/5s polling and once with WebSocket push, and compare request volume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help='Number of open chat tabs (default: 100)')
+        parser.add_argument('--duration', type=int, default=60, help='Simulated seconds of traffic (default: 60)')
+        parser.add_argument('--messages-per-minute', type=int, default=30,
+                            help='Chat messages sent per minute across all clients (default: 30)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        clients = max(2, options['clients'] - options['clients'] % 2)
+
+        with throwaway_database():
+            users = self.seed_users(clients)
+            results = [
+                self.run('polling', users, options),
+                self.run('push', users, options),
+            ]
+
+        self.stdout.write(f"{clients} clients, {options['duration']}s simulated, "
+                          f"{options['messages_per_minute']} messages/min\n")
+        self.stdout.write(f"{'mode':<10}{'requests':>10}{'req/s':>10}{'pushes':>10}{'queries':>10}{'db ms':>10}{'wall ms':>10}")
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<10}{result['requests']:>10}{result['requests'] / options['duration']:>10.1f}"
+                f"{result['pushes']:>10}{result['queries']:>10}{result['db_ms']:>10.0f}{result['wall_ms']:>10.0f}"
+            )
+        polling, push = results
+        if polling['requests']:
+            saved = 100 * (1 - push['requests'] / polling['requests'])
+            self.stdout.write(self.style.SUCCESS(f"HTTP requests reduced by {saved:.1f}%"))
+
+    def seed_users(self, count):
+        password = make_password('password123')
+        User.objects.bulk_create([
+            User(username=f'loadtest{i}', password=password, user_type='student' if i % 2 else 'founder')
+            for i in range(count)
+        ])
+        return list(User.objects.filter(username__startswith='loadtest').order_by('id'))
+
+    def run(self, mode, users, options):
+        rng = random.Random(options['seed'])
+        sessions = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            sessions.append(client)
+        # Every tab has the conversation with its neighbour open
+        partner = {i: i ^ 1 for i in range(len(users))}
+
+        counter = QueryCounter()
+        pushes = 0
+        requests = 0
+        channel_layer = get_channel_layer()
+        group_send = channel_layer.group_send
+
+        async def counting_group_send(group, message):
+            nonlocal pushes
+            pushes += 1
+            await group_send(group, message)
+
+        def request(method, i, path, **kwargs):
+            nonlocal requests
+            requests += 1
+            getattr(sessions[i], method)(path, **kwargs)
+
+        def load_messages(i):
+            # What the pre-push chat.js did on every refresh
+            request('get', i, f'/ajax/messages/{users[partner[i]].id}/')
+            request('post', i, f'/ajax/mark_messages_as_read/{users[partner[i]].id}/')
+            request('get', i, '/ajax/unread_messages_count/')
+
+        if mode == 'push':
+            # Stand-in for the sockets chat.js would hold open
+            for user in users:
+                async_to_sync(channel_layer.group_add)(user_group(user.id), f'loadtest.{user.id}')
+            channel_layer.group_send = counting_group_send
+
+        pending = 0.0
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                for second in range(options['duration']):
+                    pending += options['messages_per_minute'] / 60
+                    while pending >= 1:
+                        pending -= 1
+                        sender = rng.randrange(len(users))
+                        request('post', sender, '/ajax/send_message/',
+                                data={'receiver_id': users[partner[sender]].id, 'content': f'hello at {second}s'},
+                                content_type='application/json')
+                        if mode == 'polling':
+                            load_messages(sender)
+                        else:
+                            # The 'message' event carries the message to both tabs;
+                            # only the receiver calls back to mark it read
+                            request('post', partner[sender], f'/ajax/mark_messages_as_read/{users[sender].id}/')
+
+                    if mode == 'polling':
+                        for i in range(len(users)):
+                            if (second + i) % 3 == 0:
+                                request('get', i, '/ajax/unread_messages_count/')
+                                load_messages(i)
+                            if (second + i) % 5 == 0:
+                                request('get', i, '/ajax/unread_notifications_count/')
+                                request('get', i, '/ajax/unread_messages_count/')
+        finally:
+            channel_layer.group_send = group_send
+
+        return {
+            'mode': mode,
+            'requests': requests,
+            'pushes': pushes,
+            'queries': counter.count,
+            'db_ms': counter.duration * 1000,
+            'wall_ms': (time.perf_counter() - start) * 1000,
+        }
@@ -0,0 +1,120 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from clubs.models import Conversation, Membership
+from clubs import counters
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f'user_{user_id}'
+
+
+def broadcast_group(scope, target=None):
+    return f'broadcast_{scope}' if target is None else f'broadcast_{scope}_{target}'
+
+
+def broadcast_groups(user):
+    """The broadcast audiences ``user`` belongs to, as channel group names."""
+    club_ids = Membership.objects.filter(user=user, status='approved').values_list('club_id', flat=True)
+    return [
+        broadcast_group('all'),
+        broadcast_group('role', user.user_type),
+        *(broadcast_group('club', club_id) for club_id in club_ids),
+    ]
+
+
+def _group_send(group, payload):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, {'type': 'chat.event', 'payload': payload})
+    except Exception:
+        logger.exception("Could not push %s event to %s", payload.get('type'), group)
+
+
+def push_to_users(user_ids, payload):
+    """Send ``payload`` to every open socket of the given users.
+
+    Delivery is best effort: chat.js falls back to polling whenever its socket
+    is down, so a failing channel layer must never break the request.
+    """
+    for user_id in set(user_ids):
+        _group_send(user_group(user_id), payload)
+
+
+def push_broadcast(broadcast):
+    """One group send reaches every connected member of the broadcast's audience."""
+    target = {'all': None, 'club': broadcast.club_id, 'role': broadcast.role}[broadcast.scope]
+    _group_send(broadcast_group(broadcast.scope, target), {
+        'type': 'notification',
+        'notification_type': broadcast.notification_type,
+        'title': broadcast.title,
+        'link': broadcast.link,
+    })
+
+
+def push_presence(user_id, online):
+    """Tell everyone ``user_id`` has a conversation with that they came online or left."""
+    low_partners, high_partners = Conversation.partner_ids(user_id)
+    partners = [*low_partners.values_list('user_high', flat=True), *high_partners.values_list('user_low', flat=True)]
+    push_to_users(partners, {'type': 'presence', 'user_id': user_id, 'online': online})
+
+
+# Columns needed to build a message payload without touching related objects
+MESSAGE_VALUES = (
+    'id', 'sender_id', 'sender__username', 'receiver_id', 'receiver__username',
+    'content', 'created_at', 'updated_at',
+)
+
+
+def message_payload(row):
+    return {
+        'id': row['id'],
+        'sender': row['sender__username'],
+        'sender_id': row['sender_id'],
+        'receiver': row['receiver__username'],
+        'receiver_id': row['receiver_id'],
+        'content': row['content'],
+        'created_at': row['created_at'].isoformat(),
+        'updated_at': row['updated_at'].isoformat(),
+    }
+
+
+def serialize_message(message):
+    return message_payload({
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender__username': message.sender.username,
+        'receiver_id': message.receiver_id,
+        'receiver__username': message.receiver.username,
+        'content': message.content,
+        'created_at': message.created_at,
+        'updated_at': message.updated_at,
+    })
+
+
+def push_message(message, action):
+    """Fan a created/edited/unsent message out to both sides of the conversation."""
+    push_to_users(
+        [message.sender_id, message.receiver_id],
+        {'type': 'message', 'action': action, 'message': serialize_message(message)},
+    )
+    if action == 'created':
+        push_badges([message.receiver_id])
+
+
+def badge_counts(user_id):
+    return {
+        'unread_messages': counters.get_count(counters.MESSAGES, user_id),
+        'unread_senders': Conversation.unread_by_partner(user_id),
+        'unread_notifications': counters.unread_notifications(user_id),
+    }
+
+
+def push_badges(user_ids):
+    for user_id in set(user_ids):
+        push_to_users([user_id], {'type': 'badges', **badge_counts(user_id)})
@@ -1,3 +1,253 @@
+from datetime import timedelta
+from unittest import mock
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from clubconnect.pagination import KeysetPaginator, decode_cursor, InvalidCursor
+from clubconnect.testing import QueryBudgetMixin, RenderQueryCountMixin, Route
+from clubs.models import Club, Membership, Message, Notification
+from .consumers import ChatConsumer
+from .realtime import broadcast_group, user_group
+
+
+class NotificationCountContextProcessorTests(RenderQueryCountMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password123')
+        Notification.objects.create(user=self.user, notification_type='general', title='Hi', message='')
+
+    def test_unused_badge_costs_nothing(self):
+        self.assertRenderQueries(0, '<p>{{ request.path }}</p>', user=self.user)
+
+    def test_badge_counted_once_per_render(self):
+        # Personal notifications and broadcasts are counted separately
+        output = self.assertRenderQueries(
+            2,
+            '{% if unread_notification_count > 0 %}{{ unread_notification_count }}{% endif %}',
+            user=self.user,
+        )
+        self.assertEqual(output, '1')
+
+    def test_cached_badge_costs_nothing(self):
+        self.render_with_queries('{{ unread_notification_count }}', user=self.user)
+        self.assertRenderQueries(0, '{{ unread_notification_count }}', user=self.user)
+
+    def test_anonymous_badge_is_zero(self):
+        output = self.assertRenderQueries(0, '{{ unread_notification_count }}')
+        self.assertEqual(output, '0')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='password123', user_type='admin')
+        # Shared names make the primary key the tie-breaker
+        Club.objects.bulk_create([
+            Club(name=f'Club {i // 3}', short_description='', long_description='', domain_tags='')
+            for i in range(10)
+        ])
+        self.expected = list(Club.objects.order_by('name', 'id'))
+
+    def walk(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_and_backward_walks_are_stable(self):
+        paginator = KeysetPaginator(Club.objects.all(), ['name'], 4)
+        pages = self.walk(paginator)
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual([club for page in pages for club in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        back = paginator.page(back.previous_cursor)
+        self.assertEqual(list(back), list(pages[0]))
+        self.assertFalse(back.has_previous)
+
+    def test_descending_datetime_ordering(self):
+        other = User.objects.create_user(username='other', password='password123')
+        Message.objects.bulk_create([
+            Message(sender=self.admin, receiver=other, content=str(i)) for i in range(7)
+        ])
+        # Pairs of messages share a timestamp, microseconds apart from the next pair
+        now = timezone.now()
+        for message in Message.objects.all():
+            Message.objects.filter(id=message.id).update(created_at=now - timedelta(microseconds=message.id // 2))
+        paginator = KeysetPaginator(Message.objects.all(), ['-created_at'], 3)
+        walked = [message.id for page in self.walk(paginator) for message in page]
+        self.assertEqual(walked, list(Message.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_estimated_count_is_capped(self):
+        page = KeysetPaginator(Club.objects.all(), ['name'], 4, count='estimate', count_limit=5).page()
+        self.assertEqual(page.count, 6)
+        self.assertTrue(page.count_is_estimate)
+        page = KeysetPaginator(Club.objects.all(), ['name'], 4, count='exact').page()
+        self.assertEqual((page.count, page.count_is_estimate), (10, False))
+
+    def test_invalid_cursors(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not a cursor')
+        paginator = KeysetPaginator(Club.objects.all(), ['name'], 4)
+        with self.assertRaises(InvalidCursor):
+            paginator.page_from(['Club 1'])
+
+    def test_clubs_list_links_next_page_keeping_filters(self):
+        self.client.force_login(self.admin)
+        with mock.patch('clubs.views.CLUBS_PER_PAGE', 4):
+            response = self.client.get(reverse('clubs_list'), {'tag': ''})
+        page = response.context['page_obj']
+        self.assertEqual(list(page), self.expected[:4])
+        self.assertContains(response, f'?tag=&amp;cursor={page.next_cursor}')
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('manage_clubs'), {'cursor': 'garbage'})
+        self.assertEqual(list(response.context['clubs']), self.expected)
+
+
+class ChatConsumerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password123')
+        self.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        Membership.objects.create(user=self.user, club=self.club, status='approved')
+        Notification.objects.create(user=self.user, notification_type='general', title='Hi', message='')
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), '/ws/chat/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_anonymous_sockets_are_rejected(self):
+        _, connected = await self.connect(AnonymousUser())
+        self.assertFalse(connected)
+
+    async def test_badges_are_sent_on_connect(self):
+        communicator, connected = await self.connect(self.user)
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_json_from(), {
+            'type': 'badges', 'unread_messages': 0, 'unread_senders': {}, 'unread_notifications': 1,
+        })
+        await communicator.disconnect()
+
+    async def test_joins_user_and_club_groups(self):
+        communicator, _ = await self.connect(self.user)
+        await communicator.receive_json_from()
+        layer = get_channel_layer()
+        for group in (user_group(self.user.id), broadcast_group('club', self.club.id)):
+            await layer.group_send(group, {'type': 'chat.event', 'payload': {'type': 'test', 'group': group}})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'test', 'group': group})
+        await communicator.disconnect()
+
+    async def test_ping_keeps_the_user_online(self):
+        communicator, _ = await self.connect(self.user)
+        await communicator.receive_json_from()
+        with mock.patch('dashboard.consumers.presence.ping') as ping:
+            await communicator.send_json_to({'type': 'ping'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'pong'})
+        ping.assert_called_once_with(self.user.id)
+        await communicator.disconnect()
+
+
+class MessageSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create_user(username='me', password='password123')
+        self.friend = User.objects.create_user(username='friend', password='password123')
+        self.messages = Message.objects.bulk_create([
+            Message(sender=self.friend, receiver=self.me, content=f'hello {i}') for i in range(3)
+        ])
+        self.client.force_login(self.me)
+
+    def sync(self, **params):
+        response = self.client.get(reverse('get_messages', args=[self.friend.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def contents(self, data):
+        return [message['content'] for message in data['messages']]
+
+    def test_after_id_returns_only_new_messages(self):
+        Message.objects.create(sender=self.friend, receiver=self.me, content='new')
+        data = self.sync(after_id=self.messages[-1].id)
+        self.assertEqual(self.contents(data), ['new'])
+        self.assertFalse(data['has_more'])
+
+    def test_since_adds_edited_messages(self):
+        server_time = self.sync()['server_time']
+        Message.objects.filter(id=self.messages[0].id).update(
+            content='edited', updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        data = self.sync(after_id=self.messages[-1].id, since=server_time)
+        self.assertEqual(self.contents(data), ['edited'])
+
+    def test_edited_messages_are_capped(self):
+        from .views import MAX_MESSAGE_PAGE_SIZE
+        since = timezone.now()
+        Message.objects.bulk_create([
+            Message(sender=self.friend, receiver=self.me, content='old') for _ in range(MAX_MESSAGE_PAGE_SIZE + 5)
+        ])
+        Message.objects.update(updated_at=since + timedelta(seconds=1))
+        data = self.sync(after_id=Message.objects.order_by('id').last().id, since=since.isoformat())
+        self.assertEqual(len(data['messages']), MAX_MESSAGE_PAGE_SIZE)
+
+    def test_impossible_since_is_ignored(self):
+        data = self.sync(after_id=self.messages[0].id, since='2024-13-40T00:00:00')
+        self.assertEqual(self.contents(data), ['hello 1', 'hello 2'])
+
+
+class DashboardRouteQueryBudgetTests(QueryBudgetMixin, TestCase):
+    URLCONF = 'dashboard.urls'
+    founder = lambda world: {'user_id': world.founder.id}
+    student = lambda world: {'user_id': world.student.id}
 
-# Create your tests here.
+    ROUTES = [
+        Route('dashboard', 'student', 18),
+        Route('dashboard', 'founder', 23),
+        Route('dashboard', 'admin', 15),
+        Route('home', 'student', 18),
+        Route('chat', 'student', 11),
+        Route('chat', 'founder', 11),
+        Route('get_messages', 'student', 14, founder),
+        Route('send_message', 'student', 13, method='post', as_json=True,
+              data=lambda world: {'receiver_id': world.founder.id, 'content': 'Hello'}),
+        Route('edit_message', 'student', 10, lambda world: {'message_id': world.message.id}, method='post',
+              as_json=True, data={'content': 'Hello again'}),
+        Route('unsend_message', 'student', 10, lambda world: {'message_id': world.message.id}, method='post'),
+        Route('mark_messages_as_read', 'founder', 13, student, method='post'),
+        Route('unread_messages_count', 'student', 8),
+        Route('my_week', 'student', 8),
+        Route('search', 'student', 12, data={'q': 'robot'}),
+        Route('notifications', 'student', 10),
+        Route('mark_notification_read', 'student', 12, lambda world: {'notification_id': world.notification.id},
+              method='post'),
+        Route('mark_broadcast_read', 'student', 15, lambda world: {'broadcast_id': world.broadcast.id}, method='post'),
+        Route('get_unread_notifications_count', 'student', 8),
+        Route('admin_analytics_data', 'admin', 12),
+        Route('activity_feed', 'student', 9),
+        Route('activity_feed', 'student', 9, data={'mine': '1'}, label='activity_feed[student,mine]'),
+        Route('my_clubs', 'student', 12),
+        Route('my_clubs', 'founder', 9),
+        Route('manage_users', 'admin', 10),
+        Route('manage_clubs', 'admin', 11),
+        Route('manage_settings', 'admin', 12),
+        Route('edit_user', 'admin', 9, student),
+        Route('delete_user', 'admin', 9, student),
+        Route('reset_user_password', 'admin', 9, student),
+        Route('events', 'student', 8),
+        Route('profile', 'student', 9),
+        Route('create_announcement', 'admin', 8),
+        Route('delete_announcement', 'admin', 11, lambda world: {'announcement_id': world.announcement.id},
+              method='post', status=302),
+        Route('student_club_meetings', 'student', 12),
+    ]
@@ -15,6 +15,7 @@ urlpatterns = [
     path('search/', views.search, name='search'),
     path('notifications/', views.notifications, name='notifications'),
     path('notifications/mark-read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/broadcasts/mark-read/<int:broadcast_id>/', views.mark_broadcast_read, name='mark_broadcast_read'),
     path('ajax/unread_notifications_count/', views.get_unread_notifications_count, name='get_unread_notifications_count'),
     path('ajax/admin_analytics/', views.admin_analytics_data, name='admin_analytics_data'),
     path('activity-feed/', views.activity_feed, name='activity_feed'),
@@ -1,8 +1,9 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
-from clubs.models import Club, Event, Membership, Message, Announcement
+from clubs.models import Club, Event, Membership, Message, Announcement, Conversation
 from accounts.models import User
 from django.http import JsonResponse
 from django.db.models import Q
@@ -10,6 +11,12 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from django.views.decorators.http import require_POST
 from django.db.models import Count
+from django.utils.dateparse import parse_datetime
+from clubs import counters, roles
+from analytics import activity, rollups
+from accounts import presence
+from clubconnect.pagination import paginate, KeysetPaginator
+from .realtime import push_message, push_badges, message_payload, MESSAGE_VALUES
 
 def home(request):
     clubs = Club.objects.all()[:6]  # Get 6 clubs for display
@@ -32,6 +39,8 @@ def profile(request):
     user = request.user
     context = {
         'user': user,
+        'memberships': user.membership_set.select_related('club'),
+        'founded_clubs': user.founded_clubs.all(),
     }
     return render(request, 'dashboard/profile.html', context)
 
@@ -40,22 +49,21 @@ def dashboard(request):
     user = request.user
     clubs = Club.objects.all()[:5]  # Get 5 clubs for display
     events = Event.objects.filter(start_time__gte=timezone.now()).order_by('start_time')  # Get all upcoming events
-    announcements = Announcement.objects.all().order_by('-created_at')[:3]  # Get 3 recent announcements
+    announcements = Announcement.objects.select_related('club').prefetch_related('club__founders').order_by('-created_at')[:3]  # Get 3 recent announcements
     user_clubs = []
     
     if user.is_student() or user.is_founder():
-        memberships = Membership.objects.filter(user=user, status='approved')
-        user_clubs = [membership.club for membership in memberships]
+        user_clubs = Club.objects.filter(id__in=roles.for_user(user).club_ids(roles.MEMBER))
     
     # Get unread messages count
-    unread_messages = Message.objects.filter(receiver=user, is_read=False).count()
+    unread_messages = counters.get_count(counters.MESSAGES, user.id)
     
     # Get all users for admin
     all_users = User.objects.all() if user.is_admin() else None
 
     # At-a-glance data
     next_event = events.first()
-    recent_messages = Message.objects.filter(receiver=user).order_by('-created_at')[:3]
+    recent_messages = Message.objects.filter(receiver=user).select_related('sender', 'club').order_by('-created_at')[:3]
     
     # Gamification: Club of the Week
     club_of_the_week = Club.objects.order_by('?').first()
@@ -75,37 +83,22 @@ def dashboard(request):
     
     # Render different templates based on user type
     if user.is_admin():
-        from datetime import timedelta
-        from django.db.models import Count
-        from django.db.models.functions import TruncDate
-        
-        now = timezone.now()
-        seven_days_ago = now - timedelta(days=7)
-        
-        total_users_count = User.objects.count()
-        total_clubs_count = Club.objects.count()
-        total_events_count = Event.objects.count()
-        upcoming_events_count = Event.objects.filter(start_time__gte=now).count()
-        
-        context.update({
-            'total_users': total_users_count,
-            'total_clubs': total_clubs_count,
-            'total_events': total_events_count,
-            'upcoming_events_count': upcoming_events_count,
-        })
+        totals = admin_totals()
+        totals['upcoming_events_count'] = totals.pop('upcoming_events')
+        context.update(totals)
         return render(request, 'dashboard/admin_dashboard.html', context)
     elif user.is_founder():
         from clubs.models import MentorSession, ClubFeedback, ClubMeeting
         founder_clubs = Club.objects.filter(founders=user)
-        membership_requests = Membership.objects.filter(club__in=founder_clubs, status='pending')
-        pending_mentor_sessions = MentorSession.objects.filter(club__in=founder_clubs, status='pending')
-        pending_feedbacks = ClubFeedback.objects.filter(club__in=founder_clubs, status='pending')
+        membership_requests = Membership.objects.filter(club__in=founder_clubs, status='pending').select_related('user', 'club')
+        pending_mentor_sessions = MentorSession.objects.filter(club__in=founder_clubs, status='pending').select_related('student', 'club')
+        pending_feedbacks = ClubFeedback.objects.filter(club__in=founder_clubs, status='pending').select_related('student', 'club')
         
         # Get upcoming meetings for founder clubs
         upcoming_meetings = ClubMeeting.objects.filter(
             club__in=founder_clubs,
             scheduled_time__gte=timezone.now()
-        ).exclude(status='ended').order_by('scheduled_time')
+        ).exclude(status='ended').select_related('club').order_by('scheduled_time')
         
         context.update({
             'membership_requests': membership_requests,
@@ -118,33 +111,26 @@ def dashboard(request):
     else:  # Default to student dashboard
         return render(request, 'dashboard/student_dashboard.html', context)
 
+CONVERSATIONS_PER_PAGE = 30
+
+
 @login_required
 def chat_view(request):
     user = request.user
-    # Get all conversations for the current user
-    conversations = Message.objects.filter(Q(sender=request.user) | Q(receiver=request.user)).order_by('-created_at')
-
-    # Get a unique list of users the current user has had conversations with
-    users_with_last_message = []
-    users_in_conversations = []
-
-    for message in conversations:
-        other_user = None
-        if message.sender != request.user and message.sender not in users_in_conversations:
-            other_user = message.sender
-            users_in_conversations.append(other_user)
-        elif message.receiver != request.user and message.receiver not in users_in_conversations:
-            other_user = message.receiver
-            users_in_conversations.append(other_user)
-        
-        if other_user:
-            last_message = Message.objects.filter(
-                (Q(sender=request.user, receiver=other_user) | Q(sender=other_user, receiver=request.user))
-            ).latest('created_at')
-            users_with_last_message.append({
-                'user': other_user,
-                'last_message': last_message
-            })
+    # Conversations come from the per-pair summary table, most recent first
+    conversations = Conversation.for_user(user)\
+        .select_related('user_low', 'user_high', 'last_message')\
+        .order_by('-last_activity_at')
+    page = Paginator(conversations, CONVERSATIONS_PER_PAGE).get_page(request.GET.get('page'))
+
+    users_with_last_message = [
+        {
+            'user': conversation.other_user(user),
+            'last_message': conversation.last_message,
+            'unread': conversation.unread_for(user),
+        }
+        for conversation in page
+    ]
 
     # Build recipient list based on role
     candidates = User.objects.exclude(id=user.id)
@@ -165,16 +151,21 @@ def chat_view(request):
         admins = candidates.filter(user_type='admin')
         allowed_recipients = (founders | admins).distinct().order_by('username')
 
-    # Add users from allowed_recipients who are not in conversations yet
-    for recipient in allowed_recipients:
-        if recipient not in users_in_conversations:
+    # After the last page of conversations, list allowed recipients not talked to yet
+    if not page.has_next():
+        low_partners, high_partners = Conversation.partner_ids(user)
+        for recipient in allowed_recipients.exclude(id__in=low_partners).exclude(id__in=high_partners):
             users_with_last_message.append({
                 'user': recipient,
-                'last_message': None
+                'last_message': None,
+                'unread': 0,
             })
 
+    presence.prefetch(item['user'] for item in users_with_last_message)
+
     context = {
         'users_with_last_message': users_with_last_message,
+        'page_obj': page,
     }
     return render(request, 'dashboard/chat.html', context)
 
@@ -185,42 +176,34 @@ def chat_view(request):
 def my_week(request):
     return render(request, 'dashboard/my_week.html')
 
+SEARCH_RESULTS_PER_PAGE = 20
+
 @login_required
 def search(request):
-    query = request.GET.get('q')
-    results = {}
-    if query:
-        # Search users, clubs, events, and announcements
-        user_results = User.objects.filter(
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )
-        club_results = Club.objects.filter(name__icontains=query)
-        event_results = Event.objects.filter(title__icontains=query)
-        announcement_results = Announcement.objects.filter(title__icontains=query)
-
-        if user_results:
-            results['users'] = list(user_results)
-        if club_results:
-            results['clubs'] = list(club_results)
-        if event_results:
-            results['events'] = list(event_results)
-        if announcement_results:
-            results['announcements'] = list(announcement_results)
+    from search.backends import get_backend
+    query = request.GET.get('q', '')
+    doc_type = request.GET.get('type')
+    results = get_backend().search(query, [doc_type] if doc_type else None)
+    page_obj = Paginator(results, SEARCH_RESULTS_PER_PAGE).get_page(request.GET.get('page'))
 
     context = {
         'query': query,
         'results': results,
+        'page_obj': page_obj,
+        'selected_type': doc_type,
     }
     return render(request, 'dashboard/search_results.html', context)
 
 @login_required
 def notifications(request):
-    from clubs.models import Notification
-    all_notifications = Notification.objects.filter(user=request.user)
-    unread_count = all_notifications.filter(is_read=False).count()
-    user_notifications = all_notifications.order_by('-created_at')[:20]
+    from clubs.models import Notification, BroadcastNotification
+    unread_count = counters.unread_notifications(request.user.id)
+    # Newest 20 of the user's own notifications and the broadcasts they can see
+    personal = Notification.objects.filter(user=request.user).order_by('-created_at')[:20]
+    broadcasts = BroadcastNotification.visible_to(request.user.id).order_by('-created_at')[:20]
+    user_notifications = sorted(
+        [*personal, *broadcasts], key=lambda notification: notification.created_at, reverse=True
+    )[:20]
     
     context = {
         'notifications': user_notifications,
@@ -234,14 +217,15 @@ def my_clubs(request):
     if user.is_founder():
         clubs = Club.objects.filter(founders=user)
     else:
-        memberships = Membership.objects.filter(user=user, status='approved')
-        clubs = [membership.club for membership in memberships]
+        clubs = Club.objects.filter(id__in=roles.for_user(user).club_ids(roles.MEMBER))
     
     context = {
         'clubs': clubs,
     }
     return render(request, 'dashboard/my_clubs.html', context)
 
+ADMIN_PAGE_SIZE = 50
+
 @login_required
 def manage_users(request):
     # Ensure user is admin
@@ -249,8 +233,9 @@ def manage_users(request):
         messages.error(request, "You don't have permission to access this page.")
         return redirect('dashboard')
     
-    users = User.objects.all()
-    return render(request, 'dashboard/manage_users.html', {'users': users})
+    page = paginate(request, User.objects.all(), ['username'], ADMIN_PAGE_SIZE, count='estimate')
+    presence.prefetch(page)
+    return render(request, 'dashboard/manage_users.html', {'users': page, 'page_obj': page})
 
 @login_required
 def manage_clubs(request):
@@ -259,8 +244,9 @@ def manage_clubs(request):
         messages.error(request, "You don't have permission to access this page.")
         return redirect('dashboard')
     
-    clubs = Club.objects.all()
-    return render(request, 'dashboard/manage_clubs.html', {'clubs': clubs})
+    clubs = Club.objects.prefetch_related('founders').annotate(member_count=Count('membership'))
+    page = paginate(request, clubs, ['name'], ADMIN_PAGE_SIZE, count='estimate')
+    return render(request, 'dashboard/manage_clubs.html', {'clubs': page, 'page_obj': page})
 
 from sitetheme.models import ThemeSettings
 
@@ -349,12 +335,9 @@ def create_announcement(request):
                 club=None
             )
             
-            from clubs.models import Notification
-            from clubs.utils import create_notification
-            
-            all_users = User.objects.all()
-            create_notification(
-                all_users,
+            from clubs.utils import notify_all_users
+
+            notify_all_users(
                 'announcement',
                 f'New Announcement: {title}',
                 content,
@@ -402,7 +385,7 @@ def delete_announcement(request, announcement_id):
     announcement = get_object_or_404(Announcement, id=announcement_id)
     
     if announcement.club:
-        if not announcement.club.founders.filter(id=request.user.id).exists() and not request.user.is_admin():
+        if not roles.for_user(request.user).is_founder(announcement.club_id) and not request.user.is_admin():
             messages.error(request, "You are not authorized to delete this announcement.")
             return redirect('club_detail', club_id=announcement.club.id)
         redirect_url = 'club_detail'
@@ -424,31 +407,78 @@ def delete_announcement(request, announcement_id):
 
 
 
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+
+def _parse_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_since(value):
+    # A '+' in the offset arrives as a space when the client doesn't encode it
+    try:
+        return parse_datetime((value or '').replace(' ', '+'))
+    except ValueError:
+        # Well-formed but not a real date, e.g. month 13
+        return None
+
+
 @login_required
 def get_messages(request, user_id):
+    """Cursor-based sync for one conversation.
+
+    With no cursor the latest page is returned. ``before_id`` pages backwards
+    through history, ``after_id`` returns only messages newer than the last one
+    the client has, and ``since`` (the ``server_time`` of a previous response)
+    adds messages edited or unsent after that moment.
+    """
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'User not authenticated'}, status=401)
 
     other_user = get_object_or_404(User, id=user_id)
     
     # Mark messages as read
-    Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
-
-    messages = Message.objects.filter(
+    marked = Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
+    if marked:
+        Conversation.record_read(request.user.id, other_user.id)
+        counters.decrement(counters.MESSAGES, request.user.id, marked)
+        push_badges([request.user.id])
+
+    limit = min(max(_parse_int(request.GET.get('limit'), MESSAGE_PAGE_SIZE), 1), MAX_MESSAGE_PAGE_SIZE)
+    after_id = _parse_int(request.GET.get('after_id'))
+    before_id = _parse_int(request.GET.get('before_id'))
+    since = _parse_since(request.GET.get('since'))
+    server_time = timezone.now()
+
+    conversation = Message.objects.filter(
         (Q(sender=request.user, receiver=other_user) | Q(sender=other_user, receiver=request.user))
-    ).order_by('created_at')
-
-    message_list = []
-    for message in messages:
-        message_list.append({
-            'id': message.id,
-            'sender': message.sender.username,
-            'receiver': message.receiver.username,
-            'content': message.content,
-            'created_at': message.created_at.isoformat()
-        })
+    )
+
+    if after_id is not None:
+        # Forward sync: oldest first, so a capped page never skips messages
+        page = KeysetPaginator(conversation.values(*MESSAGE_VALUES), ['id'], limit).page_from([after_id])
+        has_more = page.has_next
+        rows = page.object_list
+        if since:
+            edited = conversation.filter(id__lte=after_id, updated_at__gt=since).order_by('id').values(*MESSAGE_VALUES)
+            rows = list(edited[:MAX_MESSAGE_PAGE_SIZE]) + rows
+    else:
+        paginator = KeysetPaginator(conversation.values(*MESSAGE_VALUES), ['-id'], limit)
+        page = paginator.page_from(None if before_id is None else [before_id])
+        has_more = page.has_next
+        rows = page.object_list[::-1]
+
+    message_list = [message_payload(row) for row in rows]
 
-    return JsonResponse({'messages': message_list})
+    return JsonResponse({
+        'messages': message_list,
+        'has_more': has_more,
+        'server_time': server_time.isoformat(),
+    })
 
 @require_POST
 @login_required
@@ -460,6 +490,7 @@ def edit_message(request, message_id):
     if new_content:
         message.content = new_content
         message.save()
+        push_message(message, 'edited')
         return JsonResponse({'status': 'Message edited'})
     return JsonResponse({'error': 'No content provided'}, status=400)
 
@@ -469,23 +500,27 @@ def unsend_message(request, message_id):
     message = get_object_or_404(Message, id=message_id, sender=request.user)
     message.content = "This message was unsent."
     message.save()
+    push_message(message, 'unsent')
     return JsonResponse({'status': 'Message unsent'})
 
 @require_POST
 @login_required
 def mark_messages_as_read(request, user_id):
     other_user = get_object_or_404(User, id=user_id)
-    Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
+    marked = Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
+    if marked:
+        Conversation.record_read(request.user.id, other_user.id)
+        counters.decrement(counters.MESSAGES, request.user.id, marked)
+        push_badges([request.user.id])
     return JsonResponse({'status': 'ok'})
 
 @login_required
 def unread_messages_count(request):
-    unread_count = Message.objects.filter(receiver=request.user, is_read=False).count()
-    unread_senders = Message.objects.filter(receiver=request.user, is_read=False)\
-        .values('sender')\
-        .annotate(count=Count('sender'))
-    
-    unread_senders_dict = {item['sender']: item['count'] for item in unread_senders}
+    unread_count = counters.get_count(counters.MESSAGES, request.user.id)
+    # The navbar badge only needs the total; the chat sidebar asks for the breakdown
+    if request.GET.get('senders') == '0':
+        return JsonResponse({'unread_count': unread_count})
+    unread_senders_dict = Conversation.unread_by_partner(request.user.id)
 
     return JsonResponse({'unread_count': unread_count, 'unread_senders': unread_senders_dict})
 
@@ -509,6 +544,7 @@ def send_message(request):
             receiver=receiver,
             content=content
         )
+        push_message(message, 'created')
 
         return JsonResponse({'status': 'Message sent'})
 
@@ -516,123 +552,102 @@ def send_message(request):
 
 
 @login_required
+@require_POST
 def mark_notification_read(request, notification_id):
     from clubs.models import Notification
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    if not notification.is_read:
+        notification.is_read = True
+        notification.save()
+        counters.decrement(counters.NOTIFICATIONS, request.user.id)
+        push_badges([request.user.id])
+    return JsonResponse({'status': 'success'})
+
+
+@login_required
+@require_POST
+def mark_broadcast_read(request, broadcast_id):
+    from clubs.models import BroadcastNotification, BroadcastRead
+    broadcast = get_object_or_404(BroadcastNotification.visible_to(request.user.id), id=broadcast_id)
+    _, created = BroadcastRead.objects.get_or_create(broadcast=broadcast, user=request.user)
+    if created:
+        counters.decrement(counters.BROADCASTS, request.user.id)
+        push_badges([request.user.id])
     return JsonResponse({'status': 'success'})
 
 
 @login_required
 def get_unread_notifications_count(request):
-    from clubs.models import Notification
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_count = counters.unread_notifications(request.user.id)
     return JsonResponse({'unread_count': unread_count})
 
 
+# Bounds for the analytics date range, in days
+ANALYTICS_DEFAULT_DAYS = 7
+ANALYTICS_MAX_DAYS = 365
+
+
+def analytics_range(params):
+    """The ``start``/``end`` dates (or last ``days``) asked for, clamped to a year."""
+    from datetime import timedelta
+    from django.utils.dateparse import parse_date
+
+    today = timezone.localdate()
+    try:
+        end = parse_date(params.get('end', '')) or today
+        start = parse_date(params.get('start', ''))
+    except ValueError:
+        end, start = today, None
+    if start is None or start > end:
+        days = min(max(_parse_int(params.get('days'), ANALYTICS_DEFAULT_DAYS), 1), ANALYTICS_MAX_DAYS)
+        start = end - timedelta(days=days - 1)
+    return max(start, end - timedelta(days=ANALYTICS_MAX_DAYS - 1)), end
+
+
+def admin_totals():
+    totals = rollups.totals()
+    return {
+        'total_users': totals['signups'],
+        'total_clubs': totals['clubs'],
+        'total_events': totals['events'],
+        'total_announcements': totals['announcements'],
+        'upcoming_events': Event.objects.filter(start_time__gte=timezone.now()).count(),
+    }
+
+
 @login_required
 def admin_analytics_data(request):
     if not request.user.is_admin():
         return JsonResponse({'error': 'Unauthorized'}, status=403)
-    
-    from datetime import datetime, timedelta
-    from django.db.models import Count
-    from django.db.models.functions import TruncDate
-    
-    now = timezone.now()
-    seven_days_ago = now - timedelta(days=7)
-    
-    from django.db.models import Q
-    
-    signin_labels = []
-    signin_data = []
-    signup_data = []
-    
-    daily_signins_dict = {}
-    for user in User.objects.filter(last_seen__gte=seven_days_ago, last_seen__isnull=False):
-        date_key = user.last_seen.date()
-        daily_signins_dict[date_key] = daily_signins_dict.get(date_key, 0) + 1
-    
-    daily_signups_dict = {}
-    for user in User.objects.filter(date_joined__gte=seven_days_ago):
-        date_key = user.date_joined.date()
-        daily_signups_dict[date_key] = daily_signups_dict.get(date_key, 0) + 1
-    
-    today = now.date()
-    start_date = (now - timedelta(days=6)).date()
-    
-    for i in range(7):
-        date = start_date + timedelta(days=i)
-        signin_labels.append(date.strftime('%b %d'))
-        signin_data.append(daily_signins_dict.get(date, 0))
-        signup_data.append(daily_signups_dict.get(date, 0))
-    
-    total_users = User.objects.count()
-    total_clubs = Club.objects.count()
-    total_events = Event.objects.count()
-    upcoming_events = Event.objects.filter(start_time__gte=now).count()
-    
-    total_announcements = Announcement.objects.count()
-    
+
+    start, end = analytics_range(request.GET)
+    days, data = rollups.series(start, end)
+    active = activity.daily_active(start, end)
+
     return JsonResponse({
-        'signin_labels': signin_labels,
-        'signin_data': signin_data,
-        'signup_data': signup_data,
-        'total_users': total_users,
-        'total_clubs': total_clubs,
-        'total_events': total_events,
-        'upcoming_events': upcoming_events,
-        'total_announcements': total_announcements,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'signin_labels': [day.strftime('%b %d') for day in days],
+        'active_data': [active.get(day, 0) for day in days],
+        'signin_data': data['signins'],
+        'signup_data': data['signups'],
+        'club_data': data['clubs'],
+        'event_data': data['events'],
+        'announcement_data': data['announcements'],
+        'membership_data': data['memberships'],
+        **activity.active_users(end),
+        'retention': {f'd{n}': share for n, share in activity.retention().items()},
+        **admin_totals(),
     })
 
 
 @login_required
 def activity_feed(request):
-    from clubs.models import ClubPost
-    from datetime import timedelta
-    
-    now = timezone.now()
-    recent_announcements = Announcement.objects.all().order_by('-created_at')[:10]
-    upcoming_events = Event.objects.filter(start_time__gte=now).order_by('start_time')[:10]
-    recent_posts = ClubPost.objects.all().order_by('-created_at')[:10]
-    
-    activity_items = []
-    
-    for announcement in recent_announcements:
-        activity_items.append({
-            'type': 'announcement',
-            'title': announcement.title,
-            'content': announcement.content,
-            'club': announcement.club.name if announcement.club else 'General',
-            'created_at': announcement.created_at,
-            'link': f'/clubs/{announcement.club.id}/' if announcement.club else '#',
-        })
-    
-    for event in upcoming_events:
-        activity_items.append({
-            'type': 'event',
-            'title': event.title,
-            'content': event.description,
-            'club': event.club.name,
-            'created_at': event.start_time,
-            'link': f'/clubs/{event.club.id}/',
-        })
-    
-    for post in recent_posts:
-        activity_items.append({
-            'type': 'post',
-            'title': post.title,
-            'content': post.content,
-            'club': post.club.name,
-            'created_at': post.created_at,
-            'link': f'/clubs/{post.club.id}/',
-        })
-    
-    activity_items.sort(key=lambda x: x['created_at'], reverse=True)
-    activity_items = activity_items[:20]
-    
-    return render(request, 'dashboard/activity_feed.html', {'activity_items': activity_items})
+    from feed import stream
+    # Everything by default; ?mine=1 narrows it to the user's own clubs
+    mine = request.GET.get('mine') == '1'
+    page = stream.page(request.user if mine else None, request.GET.get('cursor'))
+    return render(request, 'dashboard/activity_feed.html', {'activities': page, 'page_obj': page, 'mine': mine})
 
 
 @login_required
@@ -641,14 +656,14 @@ def student_club_meetings(request):
     from clubs.models import ClubMeeting
     
     # Get all clubs where user is an approved member
-    user_memberships = Membership.objects.filter(user=request.user, status='approved')
-    user_clubs = [membership.club for membership in user_memberships]
+    club_ids = roles.for_user(request.user).club_ids(roles.MEMBER)
+    user_clubs = Club.objects.filter(id__in=club_ids)
     
     # Get all upcoming meetings from these clubs
     upcoming_meetings = ClubMeeting.objects.filter(
-        club__in=user_clubs,
+        club_id__in=club_ids,
         scheduled_time__gte=timezone.now()
-    ).exclude(status='ended').order_by('scheduled_time')
+    ).exclude(status='ended').select_related('club', 'created_by').order_by('scheduled_time')
     
     context = {
         'meetings': upcoming_meetings,
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from feed import stream
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the activity stream from announcements, events and club posts. "
+        "Signals keep it current; run this after bulk imports or to repair drift."
+    )
+
+    def handle(self, *args, **options):
+        total = stream.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the activity feed with {total} items."))
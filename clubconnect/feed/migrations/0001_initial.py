@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from feed import stream
+    stream.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clubs', '0011_club_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('announcement', 'Announcement'), ('event', 'Event'), ('post', 'Post')], max_length=20)),
+                ('source_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('summary', models.TextField(blank=True)),
+                ('link', models.CharField(max_length=500)),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('club', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clubs.club')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='activity_item_recent_idx'), models.Index(fields=['club', '-created_at', '-id'], name='activity_item_club_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source_id'), name='activity_item_source_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
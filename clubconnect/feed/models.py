@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class ActivityItem(models.Model):
+    """One entry of the activity stream, copied from its source row by feed.stream."""
+    KIND_CHOICES = (
+        ('announcement', 'Announcement'),
+        ('event', 'Event'),
+        ('post', 'Post'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    source_id = models.PositiveIntegerField()
+    # Empty for site-wide announcements
+    club = models.ForeignKey('clubs.Club', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=200)
+    summary = models.TextField(blank=True)
+    link = models.CharField(max_length=500)
+    location = models.CharField(max_length=100, blank=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'source_id'], name='activity_item_source_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='activity_item_recent_idx'),
+            models.Index(fields=['club', '-created_at', '-id'], name='activity_item_club_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.source_id}: {self.title}'
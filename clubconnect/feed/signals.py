@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from . import stream
+
+
+def _connect(kind, label):
+    def saved(sender, instance, created, raw=False, **kwargs):
+        if not raw:
+            stream.record(kind, instance, created)
+
+    def deleted(sender, instance, **kwargs):
+        stream.remove(kind, instance.pk)
+
+    model = apps.get_model(label)
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=f'feed_{kind}_saved')
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f'feed_{kind}_deleted')
+
+
+for kind, (label, build) in stream.SOURCES.items():
+    _connect(kind, label)
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Announcement, Club, ClubPost, Event, Membership
+from . import stream
+from .models import ActivityItem
+
+
+class ActivityStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password123')
+        self.chess = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+        self.robots = Club.objects.create(name='Robots', short_description='', long_description='', domain_tags='')
+        self.go = Club.objects.create(name='Go', short_description='', long_description='', domain_tags='')
+        Membership.objects.create(user=self.user, club=self.chess, status='approved')
+        Membership.objects.create(user=self.user, club=self.go, status='pending')
+        self.robots.favorited_by.add(self.user)
+
+    def event(self, club, title):
+        start = timezone.now() + timedelta(days=1)
+        return Event.objects.create(club=club, title=title, description='', location='Hall',
+                                    start_time=start, end_time=start + timedelta(hours=1))
+
+    def titles(self, page):
+        return [item.title for item in page]
+
+    def test_written_on_create_edit_and_delete(self):
+        event = self.event(self.chess, 'Blitz night')
+        item = ActivityItem.objects.get(kind='event', source_id=event.id)
+        self.assertEqual((item.club, item.location, item.starts_at), (self.chess, 'Hall', event.start_time))
+
+        event.title = 'Rapid night'
+        event.save()
+        self.assertEqual(ActivityItem.objects.get(kind='event', source_id=event.id).title, 'Rapid night')
+
+        event.delete()
+        self.assertFalse(ActivityItem.objects.filter(kind='event').exists())
+
+    def test_one_query_per_page_newest_first(self):
+        Announcement.objects.create(title='Welcome', content='')
+        self.event(self.chess, 'Blitz night')
+        ClubPost.objects.create(club=self.robots, author=self.user, title='New arm', content='')
+
+        with self.assertNumQueries(1):
+            page = stream.page(self.user)
+            self.assertEqual(self.titles(page), ['New arm', 'Blitz night', 'Welcome'])
+            self.assertEqual(page[1].club.name, 'Chess')
+
+    def test_cursor_pages(self):
+        for i in range(stream.PAGE_SIZE + 5):
+            Announcement.objects.create(title=f'News {i}', content='')
+        first = stream.page(self.user)
+        second = stream.page(self.user, first.next_cursor)
+        self.assertEqual(len(first) + len(second), stream.PAGE_SIZE + 5)
+        self.assertEqual(second[-1].title, 'News 0')
+        self.assertFalse(second.has_next)
+        self.assertEqual(self.titles(stream.page(self.user, 'garbage')), self.titles(first))
+
+    def test_personal_feed_keeps_own_and_favorite_clubs(self):
+        Announcement.objects.create(title='Site news', content='')
+        Announcement.objects.create(club=self.chess, title='Chess news', content='')
+        Announcement.objects.create(club=self.robots, title='Robot news', content='')
+        Announcement.objects.create(club=self.go, title='Go news', content='')
+
+        self.assertEqual(set(self.titles(stream.page(self.user))), {'Site news', 'Chess news', 'Robot news'})
+        self.assertEqual(len(stream.page()), 4)
+
+    def test_global_feed_is_cached_until_a_write(self):
+        Announcement.objects.create(title='Welcome', content='')
+        stream.page()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(stream.page()), ['Welcome'])
+
+        Announcement.objects.create(title='Second', content='')
+        self.assertEqual(self.titles(stream.page()), ['Second', 'Welcome'])
+
+    def test_rebuild_merges_sources_in_time_order(self):
+        now = timezone.now()
+        Announcement.objects.create(title='Welcome', content='')
+        self.event(self.chess, 'Blitz night')
+        Announcement.objects.create(title='Later', content='')
+        Announcement.objects.filter(title='Later').update(created_at=now + timedelta(hours=1))
+
+        self.assertEqual(stream.rebuild(), 3)
+        items = list(ActivityItem.objects.order_by('id').values_list('title', flat=True))
+        self.assertEqual(items, ['Welcome', 'Blitz night', 'Later'])
+
+    def test_view_filters_to_own_clubs(self):
+        Announcement.objects.create(club=self.go, title='Go news', content='')
+        Announcement.objects.create(club=self.chess, title='Chess news', content='')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('activity_feed'))
+        self.assertContains(response, 'Go news')
+        response = self.client.get(reverse('activity_feed'), {'mine': '1'})
+        self.assertContains(response, 'Chess news')
+        self.assertNotContains(response, 'Go news')
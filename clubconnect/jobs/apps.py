@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+
+    def ready(self):
+        # Register the @task functions every app keeps in its tasks.py
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (notification fan-outs and the like). Keep one or more running."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty (default: 2)')
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending()
+            if count:
+                self.stdout.write(f"Ran {count} job(s).")
+            if options['once']:
+                break
+            if not count:
+                time.sleep(options['sleep'])
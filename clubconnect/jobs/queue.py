@@ -0,0 +1,128 @@
+"""Database-backed job queue.
+
+Tasks are plain functions registered with ``@task`` in an app's tasks.py and
+called with JSON-serializable keyword arguments. ``enqueue`` stores a Job row
+in the caller's transaction, so a job only becomes visible to the
+``run_jobs`` worker once the request that created it commits. A failing job
+is retried with exponential backoff until it has used ``max_attempts``.
+An attempt's database writes are rolled back when it fails; anything else
+a task does (cache counters, socket pushes) belongs in
+``transaction.on_commit`` so a retry doesn't repeat it.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+tasks = {}
+
+RETRY_DELAY = 10
+# A running job whose worker died is handed out again after this long
+STALE_AFTER = timedelta(minutes=15)
+
+
+def task(func):
+    name = f'{func.__module__}.{func.__name__}'
+    tasks[name] = func
+    func.task_name = name
+    return func
+
+
+def enqueue(func, *, run_at=None, max_attempts=None, **kwargs):
+    """Queue ``func(**kwargs)``, or run it right away if JOBS_ALWAYS_EAGER is set."""
+    if settings.JOBS_ALWAYS_EAGER:
+        func(**kwargs)
+        return None
+    return Job.objects.create(
+        name=func.task_name,
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_many(func, kwargs_list, batch_size=500):
+    """Queue one job per kwargs dict with a single bulk insert."""
+    if settings.JOBS_ALWAYS_EAGER:
+        for kwargs in kwargs_list:
+            func(**kwargs)
+        return
+    now = timezone.now()
+    Job.objects.bulk_create(
+        (Job(name=func.task_name, kwargs=kwargs, run_at=now, max_attempts=settings.JOBS_MAX_ATTEMPTS)
+         for kwargs in kwargs_list),
+        batch_size=batch_size,
+    )
+
+
+def requeue_stale():
+    return Job.objects.filter(status='running', locked_at__lt=timezone.now() - STALE_AFTER).update(
+        status='queued', locked_at=None
+    )
+
+
+def claim_next():
+    """Mark the next due job as running and return it, or None when the queue is empty.
+
+    The claim is a conditional UPDATE, so two workers racing for the same row
+    can't both win it.
+    """
+    while True:
+        job = Job.objects.filter(status='queued', run_at__lte=timezone.now()).order_by('run_at', 'id').first()
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status='queued').update(
+            status='running', locked_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    func = tasks.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        # Each attempt is all-or-nothing, so a retry never sees half its writes
+        with transaction.atomic():
+            func(**job.kwargs)
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.name, job.attempts)
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'run_at', 'locked_at', 'last_error', 'finished_at'])
+        return False
+
+    job.status = 'done'
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'locked_at', 'finished_at'])
+    return True
+
+
+def run_pending(limit=None):
+    """Run due jobs until the queue is empty (or ``limit`` jobs ran). Returns the number run."""
+    requeue_stale()
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
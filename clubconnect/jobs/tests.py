@@ -0,0 +1,112 @@
+import os
+import runpy
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from clubs import counters, tasks
+from clubs.models import Notification
+from clubs.utils import create_notification
+from .models import Job
+from .queue import enqueue_many, run_pending, task, tasks as registry
+
+
+@task
+def failing_task():
+    raise RuntimeError("boom")
+
+
+@override_settings(JOBS_ALWAYS_EAGER=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = User.objects.bulk_create([User(username=f'member{i}') for i in range(4)])
+
+    def test_tasks_are_registered(self):
+        self.assertIn('clubs.tasks.send_notifications', registry)
+
+    def test_notifications_are_queued_then_delivered(self):
+        create_notification(self.users, 'event', 'New Event', 'Details', '/clubs/')
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(Job.objects.get().name, 'clubs.tasks.send_notifications')
+
+        with mock.patch.object(tasks, 'NOTIFICATION_BATCH_SIZE', 3):
+            self.assertEqual(run_pending(), 1)
+
+        self.assertEqual(Notification.objects.filter(title='New Event').count(), 4)
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_failed_job_is_retried_with_backoff_then_given_up(self):
+        job = Job.objects.create(name=failing_task.task_name, max_attempts=2)
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def queue_notification(self):
+        enqueue_many(tasks.send_notifications, [{
+            'user_ids': [self.users[0].id], 'notification_type': 'general', 'title': 'T', 'message': '',
+        }])
+
+    def test_failed_attempt_rolls_back_its_writes_and_side_effects(self):
+        bulk_create = Notification.objects.bulk_create
+
+        def write_then_fail(*args, **kwargs):
+            bulk_create(*args, **kwargs)
+            raise RuntimeError
+
+        self.queue_notification()
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=write_then_fail), \
+                mock.patch('dashboard.realtime.push_to_users') as push, self.captureOnCommitCallbacks(execute=True):
+            with self.assertLogs('jobs.queue', 'ERROR'):
+                run_pending()
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(Job.objects.get().status, 'queued')
+        self.assertEqual(counters.get_count(counters.NOTIFICATIONS, self.users[0].id), 0)
+        push.assert_not_called()
+
+    def test_side_effects_wait_for_the_commit(self):
+        counters.get_count(counters.NOTIFICATIONS, self.users[0].id)
+        self.queue_notification()
+        with mock.patch('dashboard.realtime.push_to_users', side_effect=RuntimeError) as push:
+            # A failing push is logged, not turned into a retry of delivered notifications
+            with self.assertLogs('django.test', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                run_pending()
+                push.assert_not_called()
+                self.assertEqual(counters.get_count(counters.NOTIFICATIONS, self.users[0].id), 0)
+        push.assert_called_once()
+        self.assertEqual(Job.objects.get().status, 'done')
+        self.assertEqual(counters.get_count(counters.NOTIFICATIONS, self.users[0].id), 1)
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        counters.get_count(counters.NOTIFICATIONS, self.users[0].id)
+        with mock.patch('dashboard.realtime.push_to_users') as push, self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.users, 'event', 'New Event', 'Details')
+        self.assertEqual(Job.objects.count(), 0)
+        self.assertEqual(Notification.objects.count(), 4)
+        # The badges and sockets of this process are the ones updated
+        self.assertEqual(counters.get_count(counters.NOTIFICATIONS, self.users[0].id), 1)
+        push.assert_called_once()
+
+    def test_eager_by_default_without_redis(self):
+        path = settings.BASE_DIR / 'clubconnect' / 'settings.py'
+        for environ, eager in [({}, True), ({'REDIS_URL': 'redis://localhost'}, False),
+                               ({'REDIS_URL': 'redis://localhost', 'JOBS_ALWAYS_EAGER': '1'}, True),
+                               ({'JOBS_ALWAYS_EAGER': '0'}, False)]:
+            with mock.patch.dict(os.environ, environ, clear=True):
+                self.assertEqual(runpy.run_path(str(path))['JOBS_ALWAYS_EAGER'], eager, environ)
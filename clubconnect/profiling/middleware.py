@@ -0,0 +1,130 @@
+"""Per-view query, render and latency measurements (see profiling.stats).
+
+Only installed when PROFILING=1. A PROFILING_SAMPLE_RATE share of requests
+also runs under cProfile, and the profiles of the slowest of those are
+kept for the report. Only one profiler can be active per process (Python
+3.12+ refuses a second one), so a sampled request that finds another
+request, or anything else, profiling just isn't profiled.
+"""
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+from clubconnect.benchmarks import QueryCounter
+from . import stats
+
+# Functions listed per kept profile
+PROFILE_LINES = 40
+
+# [milliseconds, nesting depth] of template rendering in the current request
+_render = ContextVar('profiling_render', default=None)
+
+# Held by the request that is running under cProfile
+_profiling = threading.Lock()
+
+
+class QueryRecorder(QueryCounter):
+    """QueryCounter that also counts statements the request already ran (N+1s)."""
+
+    def __init__(self):
+        super().__init__()
+        self.duplicates = 0
+        self.seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql in self.seen:
+            self.duplicates += 1
+        else:
+            self.seen.add(sql)
+        return super().__call__(execute, sql, params, many, context)
+
+
+def _instrument_templates():
+    """Time Template.render of the Django backend; includes render inside it."""
+    if getattr(Template.render, 'profiled', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        state = _render.get()
+        if state is None or state[1]:
+            return original(self, context, request)
+        state[1] += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            state[0] += (time.perf_counter() - start) * 1000
+            state[1] -= 1
+
+    render.profiled = True
+    Template.render = render
+
+
+def format_profile(profile):
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return output.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def _start_profile(self):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE or not _profiling.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this process
+            _profiling.release()
+            return None
+        return profile
+
+    def __call__(self, request):
+        queries = QueryRecorder()
+        token = _render.set([0.0, 0])
+        start = time.perf_counter()
+        profile = None
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                profile = self._start_profile()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profile:
+                        profile.disable()
+                        _profiling.release()
+            total_ms = (time.perf_counter() - start) * 1000
+            render_ms = _render.get()[0]
+        finally:
+            _render.reset(token)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        sample = {
+            'queries': queries.count,
+            'duplicates': queries.duplicates,
+            'db_ms': queries.duration * 1000,
+            'render_ms': render_ms,
+            'total_ms': total_ms,
+        }
+        kept = None
+        if profile and stats.recorder.is_slow(total_ms):
+            kept = {'path': request.path, 'stats': format_profile(profile)}
+        stats.recorder.record(view, sample, kept)
+        return response
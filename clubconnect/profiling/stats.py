@@ -0,0 +1,162 @@
+"""In-process request metrics collected by ProfilingMiddleware.
+
+Every request is recorded twice: into a per-minute slot, of which the last
+WINDOW_MINUTES form the rolling window the report page shows, and into
+lifetime totals, which the Prometheus export needs because its counters
+must only ever go up. Latency goes into fixed histogram buckets so the
+window's percentiles can be estimated without keeping every sample.
+
+Like the in-memory channel layer this is per process: each worker reports
+the requests it served.
+"""
+import heapq
+import threading
+import time
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+WINDOW_MINUTES = 15
+# Slowest profiled requests kept with their cProfile output
+SLOWEST_KEPT = 10
+
+METRICS = ('queries', 'duplicates', 'db_ms', 'render_ms', 'total_ms')
+
+
+class ViewStats:
+    def __init__(self):
+        self.count = 0
+        self.queries = 0
+        self.duplicates = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, sample):
+        self.count += 1
+        for metric in METRICS:
+            setattr(self, metric, getattr(self, metric) + sample[metric])
+        self.max_ms = max(self.max_ms, sample['total_ms'])
+        self.buckets[next(i for i, bound in enumerate(BUCKETS_MS) if sample['total_ms'] <= bound)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        for metric in METRICS:
+            setattr(self, metric, getattr(self, metric) + getattr(other, metric))
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile of latency."""
+        target = fraction * self.count
+        seen = 0
+        for bound, hits in zip(BUCKETS_MS, self.buckets):
+            seen += hits
+            if hits and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'avg_queries': self.queries / count,
+            'avg_duplicates': self.duplicates / count,
+            'avg_db_ms': self.db_ms / count,
+            'avg_render_ms': self.render_ms / count,
+            'avg_ms': self.total_ms / count,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.minutes = {}
+        self.totals = {}
+        self.slowest = []
+        self._sequence = 0
+
+    def reset(self):
+        with self.lock:
+            self._clear()
+
+    def record(self, view, sample, profile=None, now=None):
+        minute = int((time.time() if now is None else now) // 60)
+        with self.lock:
+            slot = self.minutes.setdefault(minute, {})
+            slot.setdefault(view, ViewStats()).add(sample)
+            self.totals.setdefault(view, ViewStats()).add(sample)
+            for old in [m for m in self.minutes if m <= minute - WINDOW_MINUTES]:
+                del self.minutes[old]
+            if profile is not None:
+                self._sequence += 1
+                entry = (sample['total_ms'], self._sequence, {'view': view, **sample, 'profile': profile})
+                if len(self.slowest) < SLOWEST_KEPT:
+                    heapq.heappush(self.slowest, entry)
+                else:
+                    heapq.heappushpop(self.slowest, entry)
+
+    def is_slow(self, total_ms):
+        """Whether a request this slow would make the slowest-requests list."""
+        with self.lock:
+            return len(self.slowest) < SLOWEST_KEPT or total_ms > self.slowest[0][0]
+
+    def window(self, now=None):
+        """``{view: ViewStats}`` merged over the last WINDOW_MINUTES."""
+        oldest = int((time.time() if now is None else now) // 60) - WINDOW_MINUTES
+        merged = {}
+        with self.lock:
+            for minute, slot in self.minutes.items():
+                if minute > oldest:
+                    for view, stats in slot.items():
+                        merged.setdefault(view, ViewStats()).merge(stats)
+        return merged
+
+    def lifetime(self):
+        with self.lock:
+            merged = {}
+            for view, stats in self.totals.items():
+                merged.setdefault(view, ViewStats()).merge(stats)
+            return merged
+
+    def slowest_requests(self):
+        with self.lock:
+            return [entry[2] for entry in sorted(self.slowest, reverse=True)]
+
+
+recorder = Recorder()
+
+
+def prometheus_text(stats):
+    """Lifetime ``{view: ViewStats}`` in the Prometheus text exposition format."""
+    lines = [
+        '# HELP clubconnect_request_duration_seconds Request latency per view.',
+        '# TYPE clubconnect_request_duration_seconds histogram',
+    ]
+    for view, entry in sorted(stats.items()):
+        cumulative = 0
+        for bound, hits in zip(BUCKETS_MS, entry.buckets):
+            cumulative += hits
+            le = '+Inf' if bound == float('inf') else f'{bound / 1000:g}'
+            lines.append(f'clubconnect_request_duration_seconds_bucket{{view="{view}",le="{le}"}} {cumulative}')
+        lines.append(f'clubconnect_request_duration_seconds_sum{{view="{view}"}} {entry.total_ms / 1000:.6f}')
+        lines.append(f'clubconnect_request_duration_seconds_count{{view="{view}"}} {entry.count}')
+    for name, metric, kind, scale in (
+        ('queries', 'queries', 'SQL queries run', 1),
+        ('duplicate_queries', 'duplicates', 'SQL queries repeating an earlier statement of the same request', 1),
+        ('db_seconds', 'db_ms', 'Time spent in the database', 1000),
+        ('render_seconds', 'render_ms', 'Time spent rendering templates', 1000),
+    ):
+        lines.append(f'# HELP clubconnect_request_{name}_total {kind}, summed per view.')
+        lines.append(f'# TYPE clubconnect_request_{name}_total counter')
+        for view, entry in sorted(stats.items()):
+            value = getattr(entry, metric) / scale
+            lines.append(f'clubconnect_request_{name}_total{{view="{view}"}} {value:g}')
+    return '\n'.join(lines) + '\n'
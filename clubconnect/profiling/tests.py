@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from clubs.models import Club
+from . import stats
+
+PROFILED_MIDDLEWARE = ['profiling.middleware.ProfilingMiddleware', *settings.MIDDLEWARE]
+
+
+@override_settings(MIDDLEWARE=PROFILED_MIDDLEWARE, PROFILING=True, PROFILING_SAMPLE_RATE=1.0)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        stats.recorder.reset()
+        self.admin = User.objects.create_user(username='admin', password='password123', user_type='admin')
+        self.student = User.objects.create_user(username='student', password='password123')
+        Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='')
+
+    def test_records_queries_render_and_latency_per_view(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('clubs_list'))
+        self.client.get(reverse('clubs_list'))
+
+        entry = stats.recorder.window()['clubs_list']
+        self.assertEqual(entry.count, 2)
+        self.assertGreater(entry.queries, 0)
+        self.assertGreater(entry.render_ms, 0)
+        self.assertGreaterEqual(entry.total_ms, entry.render_ms)
+        self.assertEqual(sum(entry.buckets), 2)
+        self.assertEqual(stats.recorder.slowest_requests()[0]['profile']['path'], reverse('clubs_list'))
+
+    def test_concurrent_sampled_request_is_not_profiled(self):
+        from .middleware import _profiling
+        self.client.force_login(self.student)
+        # Another request holds the profiler: this one still succeeds and is measured, unprofiled
+        with _profiling:
+            response = self.client.get(reverse('clubs_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stats.recorder.window()['clubs_list'].count, 1)
+        self.assertEqual(stats.recorder.slowest_requests(), [])
+
+    def test_foreign_profiler_is_tolerated(self):
+        self.client.force_login(self.student)
+        with mock.patch('cProfile.Profile.enable', side_effect=ValueError('Another profiling tool is already active')):
+            response = self.client.get(reverse('clubs_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stats.recorder.slowest_requests(), [])
+        # The lock was given back
+        self.client.get(reverse('clubs_list'))
+        self.assertEqual(len(stats.recorder.slowest_requests()), 1)
+
+    def test_counts_repeated_statements(self):
+        from .middleware import QueryRecorder
+        recorder = QueryRecorder()
+        run = lambda sql, params, many, context: None
+        for sql in ('SELECT 1', 'SELECT 2', 'SELECT 1', 'SELECT 1'):
+            recorder(run, sql, (), False, {})
+        self.assertEqual((recorder.count, recorder.duplicates), (4, 2))
+
+    def test_report_and_exports_are_staff_only(self):
+        self.client.force_login(self.student)
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('profiling_report')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('clubs_list'))
+        response = self.client.get(reverse('profiling_report'))
+        self.assertContains(response, 'clubs_list')
+
+        data = self.client.get(reverse('profiling_metrics_json')).json()
+        self.assertEqual(data['window']['clubs_list']['count'], 1)
+
+        text = self.client.get(reverse('profiling_metrics')).content.decode()
+        self.assertIn('clubconnect_request_duration_seconds_count{view="clubs_list"} 1', text)
+        self.assertIn('clubconnect_request_duration_seconds_bucket{view="clubs_list",le="+Inf"} 1', text)
+
+
+class ViewStatsTests(TestCase):
+    def test_percentiles_come_from_buckets(self):
+        entry = stats.ViewStats()
+        for total_ms in (3, 4, 20, 30, 40, 45, 48, 49, 300, 700):
+            entry.add({'queries': 1, 'duplicates': 0, 'db_ms': 1, 'render_ms': 1, 'total_ms': total_ms})
+        self.assertEqual(entry.percentile(0.5), 50)
+        self.assertEqual(entry.percentile(0.95), 700)
+
+    def test_window_drops_old_minutes(self):
+        recorder = stats.Recorder()
+        sample = {'queries': 1, 'duplicates': 0, 'db_ms': 1, 'render_ms': 0, 'total_ms': 10}
+        recorder.record('old', sample, now=0)
+        recorder.record('new', sample, now=stats.WINDOW_MINUTES * 60)
+        self.assertEqual(set(recorder.window(now=stats.WINDOW_MINUTES * 60)), {'new'})
+        self.assertEqual(set(recorder.lifetime()), {'old', 'new'})
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.report, name='profiling_report'),
+    path('metrics.json', views.metrics_json, name='profiling_metrics_json'),
+    path('metrics', views.metrics_prometheus, name='profiling_metrics'),
+]
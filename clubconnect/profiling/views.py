@@ -0,0 +1,57 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.shortcuts import render
+
+from . import stats
+
+
+def staff_required(view):
+    @login_required
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not (request.user.is_staff or request.user.is_admin()):
+            return HttpResponseForbidden()
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+def _summaries(view_stats):
+    return {view: entry.summary() for view, entry in view_stats.items()}
+
+
+@staff_required
+def report(request):
+    rows = sorted(
+        ({'view': view, **summary} for view, summary in _summaries(stats.recorder.window()).items()),
+        key=lambda row: row['p95_ms'], reverse=True,
+    )
+    return render(request, 'profiling/report.html', {
+        'enabled': settings.PROFILING,
+        'rows': rows,
+        'slowest': stats.recorder.slowest_requests(),
+        'window_minutes': stats.WINDOW_MINUTES,
+    })
+
+
+@staff_required
+def metrics_json(request):
+    return JsonResponse({
+        'window_minutes': stats.WINDOW_MINUTES,
+        'window': _summaries(stats.recorder.window()),
+        'lifetime': _summaries(stats.recorder.lifetime()),
+        'slowest': [
+            {key: value for key, value in entry.items() if key != 'profile'} | {'path': entry['profile']['path']}
+            for entry in stats.recorder.slowest_requests()
+        ],
+    })
+
+
+@staff_required
+def metrics_prometheus(request):
+    return HttpResponse(
+        stats.prometheus_text(stats.recorder.lifetime()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,269 @@
+"""Search backends.
+
+``get_backend()`` returns the backend named by settings.SEARCH_BACKEND.
+SqliteFTSBackend keeps an FTS5 inverted index of every Document, kept
+current by signals.py, and supports ranking, prefix matching and typo
+correction. DatabaseBackend needs no index and matches with icontains;
+use it on databases without FTS5 until a native backend exists.
+
+Backends return a SearchResults object. It is lazy and sliceable, so views
+can hand it straight to Django's Paginator.
+"""
+import difflib
+import functools
+import operator
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .documents import DOCUMENTS, BY_TYPE, for_model
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKENS = 8
+
+
+def tokenize(query):
+    return TOKEN_RE.findall((query or '').lower())[:MAX_TOKENS]
+
+
+@functools.lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _load_backend(settings.SEARCH_BACKEND)
+
+
+class Hit:
+    def __init__(self, document, object_id, score=None):
+        self.document = document
+        self.doc_type = document.doc_type
+        self.object_id = object_id
+        self.score = score
+        self.object = None
+
+
+class SearchResults:
+    def __init__(self, backend, query, doc_types=None, within=None):
+        self.backend = backend
+        self.query = query
+        self.tokens = tokenize(query)
+        self.doc_types = [doc_type for doc_type in doc_types or () if doc_type in BY_TYPE] or None
+        # Optional queryset; hits of its model must be in it (e.g. clubs with a given tag)
+        self.within = within
+        # Misspelt query tokens and the indexed terms also searched for them
+        self.corrections = {}
+        self._facets = None
+
+    @property
+    def documents(self):
+        if self.doc_types is None:
+            return DOCUMENTS
+        return [document for document in DOCUMENTS if document.doc_type in self.doc_types]
+
+    def facets(self):
+        """Hits per document type, ignoring the doc_types filter."""
+        if self._facets is None:
+            self._facets = self.backend.facets(self) if self.tokens else {}
+        return self._facets
+
+    def facet_list(self):
+        facets = self.facets()
+        return [(document, facets[document.doc_type]) for document in DOCUMENTS if facets.get(document.doc_type)]
+
+    def count(self):
+        facets = self.facets()
+        return sum(facets.get(document.doc_type, 0) for document in self.documents)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if not self.tokens or stop <= start:
+            return []
+        return self._hydrate(self.backend.fetch(self, start, stop - start))
+
+    @staticmethod
+    def _hydrate(hits):
+        ids = defaultdict(list)
+        for hit in hits:
+            ids[hit.document].append(hit.object_id)
+        objects = {document: document.model.objects.in_bulk(object_ids) for document, object_ids in ids.items()}
+        for hit in hits:
+            hit.object = objects[hit.document].get(hit.object_id)
+        # An object deleted since it was indexed is skipped rather than shown broken
+        return [hit for hit in hits if hit.object is not None]
+
+
+class BaseBackend:
+    def search(self, query, doc_types=None, within=None):
+        return SearchResults(self, query, doc_types, within)
+
+    def index_object(self, obj):
+        pass
+
+    def remove_object(self, obj):
+        pass
+
+    def rebuild(self, batch_size=2000, apps=None):
+        pass
+
+    def facets(self, results):
+        raise NotImplementedError
+
+    def fetch(self, results, offset, limit):
+        raise NotImplementedError
+
+
+class SqliteFTSBackend(BaseBackend):
+    """FTS5 index in the search_index table (created by the search migrations).
+
+    Each row's rowid encodes the document type and object id, so updates and
+    deletes are rowid lookups rather than scans of the index.
+    """
+
+    # bm25 weights per column: doc_type, object_id, title, body
+    RANK = 'bm25(search_index, 0.0, 0.0, 10.0, 1.0)'
+    CODE_SPACE = 16
+    MIN_CORRECTION_LENGTH = 4
+
+    def _rowid(self, document, object_id):
+        return object_id * self.CODE_SPACE + document.code
+
+    def _row(self, document, obj):
+        return [self._rowid(document, obj.pk), document.doc_type, obj.pk, document.title(obj), document.body(obj)]
+
+    def index_object(self, obj):
+        document = for_model(type(obj))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO search_index(rowid, doc_type, object_id, title, body) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                self._row(document, obj),
+            )
+
+    def remove_object(self, obj):
+        document = for_model(type(obj))
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_index WHERE rowid = %s', [self._rowid(document, obj.pk)])
+
+    def rebuild(self, batch_size=2000, apps=None):
+        """Reindex everything. Migrations pass their historical ``apps``."""
+        insert = 'INSERT INTO search_index(rowid, doc_type, object_id, title, body) VALUES (%s, %s, %s, %s, %s)'
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_index')
+            for document in DOCUMENTS:
+                rows = []
+                model = apps.get_model(document.model_label) if apps else document.model
+                for obj in model.objects.only(*document.fields).iterator(chunk_size=batch_size):
+                    rows.append(self._row(document, obj))
+                    if len(rows) == batch_size:
+                        cursor.executemany(insert, rows)
+                        rows = []
+                if rows:
+                    cursor.executemany(insert, rows)
+            # Merge the index b-trees now rather than on later writes
+            cursor.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+    def _has_prefix(self, cursor, token):
+        cursor.execute(
+            'SELECT 1 FROM search_index_vocab WHERE term >= %s AND term < %s LIMIT 1',
+            [token, token + '\U0010ffff'],
+        )
+        return cursor.fetchone() is not None
+
+    def _corrections(self, cursor, token):
+        # Candidates share the first two letters; typos are rarely that early
+        cursor.execute(
+            'SELECT term FROM search_index_vocab WHERE term >= %s AND term < %s',
+            [token[:2], token[:2] + '\U0010ffff'],
+        )
+        return difflib.get_close_matches(token, [row[0] for row in cursor.fetchall()], n=3, cutoff=0.75)
+
+    def _match(self, results):
+        """The FTS5 MATCH expression: every token as a prefix, or one of its corrections."""
+        if getattr(results, '_match', None) is None:
+            parts = []
+            with connection.cursor() as cursor:
+                for token in results.tokens:
+                    if len(token) >= self.MIN_CORRECTION_LENGTH and not self._has_prefix(cursor, token):
+                        corrections = self._corrections(cursor, token)
+                        if corrections:
+                            results.corrections[token] = corrections
+                            parts.append('(' + ' OR '.join(f'"{term}"' for term in corrections) + ')')
+                            continue
+                    parts.append(f'"{token}"*')
+            results._match = ' AND '.join(parts)
+        return results._match
+
+    def _where(self, results):
+        sql = 'search_index MATCH %s'
+        params = [self._match(results)]
+        if results.within is not None:
+            within_sql, within_params = results.within.values('pk').query.sql_with_params()
+            sql += f' AND (doc_type != %s OR object_id IN ({within_sql}))'
+            params += [for_model(results.within.model).doc_type, *within_params]
+        return sql, params
+
+    def facets(self, results):
+        where, params = self._where(results)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT doc_type, COUNT(*) FROM search_index WHERE {where} GROUP BY doc_type', params)
+            return dict(cursor.fetchall())
+
+    def fetch(self, results, offset, limit):
+        where, params = self._where(results)
+        sql = f'SELECT doc_type, object_id, {self.RANK} AS score FROM search_index WHERE {where}'
+        if results.doc_types:
+            sql += ' AND doc_type IN (%s)' % ', '.join(['%s'] * len(results.doc_types))
+            params += results.doc_types
+        sql += ' ORDER BY score LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [Hit(BY_TYPE[doc_type], object_id, score) for doc_type, object_id, score in cursor.fetchall()]
+
+
+class DatabaseBackend(BaseBackend):
+    """No index: every token must appear (icontains) in one of the document's fields.
+
+    Hits are grouped by document type and unranked.
+    """
+
+    def _queryset(self, document, results):
+        condition = Q()
+        for token in results.tokens:
+            condition &= functools.reduce(
+                operator.or_, (Q(**{f'{field}__icontains': token}) for field in document.fields)
+            )
+        queryset = document.model.objects.filter(condition)
+        if results.within is not None and results.within.model is document.model:
+            queryset = queryset.filter(pk__in=results.within.values('pk'))
+        return queryset.order_by('pk')
+
+    def facets(self, results):
+        return {document.doc_type: self._queryset(document, results).count() for document in DOCUMENTS}
+
+    def fetch(self, results, offset, limit):
+        hits = []
+        facets = self.facets(results)
+        for document in results.documents:
+            count = facets[document.doc_type]
+            if offset >= count:
+                offset -= count
+                continue
+            ids = self._queryset(document, results).values_list('pk', flat=True)[offset:offset + limit - len(hits)]
+            hits += [Hit(document, object_id) for object_id in ids]
+            offset = 0
+            if len(hits) >= limit:
+                break
+        return hits
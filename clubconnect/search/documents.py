@@ -0,0 +1,49 @@
+"""What goes into the search index.
+
+Each searchable model is described by a Document: the field shown as the
+hit's title (weighted highest when ranking) and the fields searched as its
+body. ``code`` identifies the document type inside the index and must
+never be reused.
+"""
+from django.apps import apps
+
+
+class Document:
+    def __init__(self, doc_type, label, model, code, title_field, body_fields):
+        self.doc_type = doc_type
+        self.label = label
+        self.model_label = model
+        self.code = code
+        self.title_field = title_field
+        self.body_fields = body_fields
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def fields(self):
+        return [self.title_field, *self.body_fields]
+
+    def title(self, obj):
+        return getattr(obj, self.title_field) or ''
+
+    def body(self, obj):
+        return ' '.join(str(getattr(obj, field) or '') for field in self.body_fields)
+
+
+DOCUMENTS = [
+    Document('club', 'Clubs', 'clubs.Club', 1, 'name', ['short_description', 'domain_tags', 'long_description']),
+    Document('event', 'Events', 'clubs.Event', 2, 'title', ['description', 'location']),
+    Document('announcement', 'Announcements', 'clubs.Announcement', 3, 'title', ['content']),
+    Document('user', 'Users', 'accounts.User', 4, 'username', ['first_name', 'last_name']),
+]
+
+BY_TYPE = {document.doc_type: document for document in DOCUMENTS}
+
+
+def for_model(model):
+    for document in DOCUMENTS:
+        if document.model is model:
+            return document
+    return None
@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import User
+from clubconnect.benchmarks import throwaway_database
+from clubs.models import Announcement, Club, Event
+from search.backends import SqliteFTSBackend
+
+BATCH_SIZE = 5000
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database with clubs, events, announcements and users and compare "
+        "the old icontains search with the FTS5 index (ranked first page plus facets)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Total rows to seed (default: 100,000)')
+        parser.add_argument('--repeat', type=int, default=10, help='Runs per query; the median is reported')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = self.vocabulary(rng)
+
+        with throwaway_database():
+            self.stdout.write(f"Seeding {options['rows']:,} rows...")
+            self.seed(rng, words, options['rows'])
+            backend = SqliteFTSBackend()
+            start = time.perf_counter()
+            backend.rebuild()
+            self.stdout.write(f"Indexed in {time.perf_counter() - start:.1f}s\n")
+
+            frequent, medium, rare = words[10], words[200], words[3000]
+            typo = medium[:2] + medium[3] + medium[2] + medium[4:]
+            queries = {
+                f'frequent word ({frequent})': frequent,
+                f'medium word ({medium})': medium,
+                f'rare word ({rare})': rare,
+                f'two words ({frequent} {medium})': f'{frequent} {medium}',
+                f'prefix ({medium[:4]})': medium[:4],
+                f'typo ({typo})': typo,
+            }
+            self.stdout.write(f"{'query':<40}{'icontains ms':>14}{'hits':>8}{'fts ms':>10}{'hits':>8}{'speedup':>9}")
+            for name, query in queries.items():
+                before, before_hits = self.measure(lambda: self.legacy_search(query), options['repeat'])
+                after, after_hits = self.measure(lambda: self.indexed_search(backend, query), options['repeat'])
+                self.stdout.write(
+                    f"{name:<40}{before:>14.2f}{before_hits:>8}{after:>10.2f}{after_hits:>8}"
+                    f"{before / after if after else 0:>8.1f}x"
+                )
+
+    def vocabulary(self, rng):
+        syllables = ['ka', 'lo', 'mi', 'ren', 'tor', 'sa', 'vi', 'dun', 'pe', 'gra', 'no', 'shi', 'bel', 'qua']
+        words = set()
+        while len(words) < 5000:
+            words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+        words = sorted(words)
+        rng.shuffle(words)
+        # Zipf distribution: the word at rank i is drawn with weight 1 / (i + 1)
+        self.cum_weights = []
+        total = 0.0
+        for rank in range(len(words)):
+            total += 1 / (rank + 1)
+            self.cum_weights.append(total)
+        return words
+
+    def text(self, rng, words, count):
+        return ' '.join(rng.choices(words, cum_weights=self.cum_weights, k=count))
+
+    def seed(self, rng, words, rows):
+        now = timezone.now()
+        password = make_password('password123')
+        counts = {'user': rows * 4 // 10, 'club': rows // 10, 'event': rows * 3 // 10}
+        counts['announcement'] = rows - sum(counts.values())
+
+        User.objects.bulk_create((
+            User(username=f'user{i}', password=password, first_name=self.text(rng, words, 1),
+                 last_name=self.text(rng, words, 1))
+            for i in range(counts['user'])
+        ), batch_size=BATCH_SIZE)
+        Club.objects.bulk_create((
+            Club(name=self.text(rng, words, 2).title(), short_description=self.text(rng, words, 8),
+                 long_description=self.text(rng, words, 40), domain_tags=','.join(rng.sample(words[:50], 2)))
+            for _ in range(counts['club'])
+        ), batch_size=BATCH_SIZE)
+        club_ids = list(Club.objects.values_list('id', flat=True))
+        Event.objects.bulk_create((
+            Event(club_id=rng.choice(club_ids), title=self.text(rng, words, 3).title(),
+                  description=self.text(rng, words, 30), location=self.text(rng, words, 1),
+                  start_time=now, end_time=now + timedelta(hours=2))
+            for _ in range(counts['event'])
+        ), batch_size=BATCH_SIZE)
+        Announcement.objects.bulk_create((
+            Announcement(club_id=rng.choice(club_ids), title=self.text(rng, words, 4).title(),
+                         content=self.text(rng, words, 30))
+            for _ in range(counts['announcement'])
+        ), batch_size=BATCH_SIZE)
+
+    def legacy_search(self, query):
+        """What dashboard.views.search did before the index: four unbounded icontains scans."""
+        results = [
+            list(User.objects.filter(Q(username__icontains=query) | Q(first_name__icontains=query)
+                                     | Q(last_name__icontains=query))),
+            list(Club.objects.filter(name__icontains=query)),
+            list(Event.objects.filter(title__icontains=query)),
+            list(Announcement.objects.filter(title__icontains=query)),
+        ]
+        return sum(len(rows) for rows in results)
+
+    def indexed_search(self, backend, query):
+        results = backend.search(query)
+        results.facets()
+        results[0:PAGE_SIZE]
+        return results.count()
+
+    def measure(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), hits
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = "Reindex every searchable club, event, announcement and user."
+
+    def handle(self, *args, **options):
+        get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "doc_type UNINDEXED, object_id UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # Term list used for typo correction
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index_vocab USING fts5vocab(search_index, 'row')"
+    )
+
+
+def fill_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from search.backends import SqliteFTSBackend
+    SqliteFTSBackend().rebuild(apps=apps)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS search_index_vocab")
+    schema_editor.execute("DROP TABLE IF EXISTS search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_last_seen'),
+        ('clubs', '0009_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+
+from .backends import get_backend
+from .documents import DOCUMENTS, for_model
+
+
+def update_index(sender, instance, update_fields=None, **kwargs):
+    # e.g. update_last_login saves only last_login on every login
+    if update_fields is not None and update_fields.isdisjoint(for_model(sender).fields):
+        return
+    get_backend().index_object(instance)
+
+
+def remove_from_index(sender, instance, **kwargs):
+    get_backend().remove_object(instance)
+
+
+for document in DOCUMENTS:
+    post_save.connect(update_index, sender=document.model, dispatch_uid=f'search_index_{document.doc_type}')
+    post_delete.connect(remove_from_index, sender=document.model, dispatch_uid=f'search_unindex_{document.doc_type}')
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Announcement, Club, Event
+from .backends import get_backend
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.robotics = Club.objects.create(name='Robotics Society', short_description='We build robots',
+                                            long_description='', domain_tags='engineering,hardware')
+        self.chess = Club.objects.create(name='Chess Club', short_description='Weekly games and a robotics-free zone',
+                                         long_description='', domain_tags='games')
+        now = timezone.now()
+        Event.objects.create(club=self.robotics, title='Robot battle', description='Bring your bots',
+                             location='Lab', start_time=now, end_time=now + timedelta(hours=2))
+        Announcement.objects.create(club=self.chess, title='Tournament', content='Chess tournament on Friday')
+        User.objects.create_user(username='ada', first_name='Ada', last_name='Lovelace', password='password123')
+
+    def search(self, query, doc_types=None):
+        return get_backend().search(query, doc_types)
+
+    def titles(self, results):
+        return [hit.document.title(hit.object) for hit in results[0:20]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles(self.search('robotics', ['club'])), ['Robotics Society', 'Chess Club'])
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.titles(self.search('tourn')), ['Tournament'])
+        self.assertEqual(self.titles(self.search('love')), ['ada'])
+
+    def test_typo_tolerance(self):
+        results = self.search('tournamnet')
+        self.assertEqual(self.titles(results), ['Tournament'])
+        self.assertEqual(results.corrections, {'tournamnet': ['tournament']})
+
+    def test_facets_and_type_filter(self):
+        results = self.search('robot')
+        self.assertEqual(results.facets(), {'club': 2, 'event': 1})
+        self.assertEqual(results.count(), 3)
+        self.assertEqual(self.titles(self.search('robot', ['event'])), ['Robot battle'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.chess.name = 'Checkers Club'
+        self.chess.save()
+        self.assertEqual(self.titles(self.search('checkers')), ['Checkers Club'])
+        self.chess.delete()
+        self.assertEqual(self.search('checkers').count(), 0)
+
+    def test_saves_of_unindexed_fields_skip_the_index(self):
+        ada = User.objects.get(username='ada')
+        with mock.patch.object(type(get_backend()), 'index_object') as index_object:
+            self.client.login(username='ada', password='password123')
+            ada.last_name = 'King'
+            ada.save(update_fields=['last_name'])
+        index_object.assert_called_once_with(ada)
+
+    def test_rebuild(self):
+        get_backend().rebuild(batch_size=2)
+        self.assertEqual(self.search('robot').count(), 3)
+
+    @override_settings(SEARCH_BACKEND='search.backends.DatabaseBackend')
+    def test_database_backend(self):
+        results = self.search('robot')
+        self.assertEqual(results.facets()['club'], 2)
+        self.assertEqual(len(results[0:1]), 1)
+        self.assertEqual(len(results[1:10]), 2)
+
+    def test_search_view_paginates(self):
+        self.client.force_login(User.objects.get(username='ada'))
+        response = self.client.get(reverse('search'), {'q': 'robot'})
+        self.assertContains(response, 'Robotics Society')
+        self.assertContains(response, 'Robot battle')
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+        response = self.client.get(reverse('search_clubs'), {'q': 'robot'})
+        self.assertEqual(response.context['clubs'], [self.robotics, self.chess])
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SitethemeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sitetheme'
+
+    def ready(self):
+        from . import signals
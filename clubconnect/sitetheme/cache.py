@@ -0,0 +1,40 @@
+"""Two-tier cache for the site-wide ThemeSettings row.
+
+Each process keeps the row in memory and re-reads it from the shared cache
+at most every LOCAL_TTL seconds; the database is only queried when the
+shared entry is missing. Saving or deleting the row drops the shared entry
+(see signals.py), so with Redis every worker shows a theme change within
+LOCAL_TTL. The default cache is per process and the drop only reaches the
+process that saved, so the entry also expires after THEME_TIMEOUT: that is
+how long other workers can keep showing the old theme.
+"""
+import time
+
+from django.core.cache import cache
+from .models import ThemeSettings
+
+CACHE_KEY = 'sitetheme:theme_settings'
+LOCAL_TTL = 5
+THEME_TIMEOUT = 60
+
+_local = {'value': None, 'loaded_at': None}
+
+
+def get_theme_settings():
+    now = time.monotonic()
+    if _local['loaded_at'] is not None and now - _local['loaded_at'] < LOCAL_TTL:
+        return _local['value']
+
+    # Wrapped in a tuple so a missing row (None) can be cached too
+    cached = cache.get(CACHE_KEY)
+    if cached is None:
+        cached = (ThemeSettings.objects.filter(pk=1).first(),)
+        cache.set(CACHE_KEY, cached, THEME_TIMEOUT)
+
+    _local['value'], _local['loaded_at'] = cached[0], now
+    return cached[0]
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+    _local['value'], _local['loaded_at'] = None, None
@@ -1,8 +1,6 @@
-from .models import ThemeSettings
+from django.utils.functional import SimpleLazyObject
+from .cache import get_theme_settings
 
 def theme_settings(request):
-    try:
-        settings = ThemeSettings.objects.get(pk=1)
-    except ThemeSettings.DoesNotExist:
-        settings = None
-    return {'theme_settings': settings}
\ No newline at end of file
+    # Only looked up if a template actually uses it
+    return {'theme_settings': SimpleLazyObject(get_theme_settings)}
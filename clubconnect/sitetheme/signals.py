@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ThemeSettings
+from .cache import invalidate
+
+
+@receiver([post_save, post_delete], sender=ThemeSettings)
+def invalidate_theme_settings(sender, **kwargs):
+    invalidate()
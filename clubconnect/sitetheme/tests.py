@@ -1,3 +1,34 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from clubconnect.testing import RenderQueryCountMixin
+from .cache import THEME_TIMEOUT, get_theme_settings, invalidate
+from .models import ThemeSettings
+
+
+class ThemeSettingsContextProcessorTests(RenderQueryCountMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        ThemeSettings.objects.create(pk=1, primary_color='#112233')
+        invalidate()
+
+    def test_unused_theme_costs_nothing(self):
+        self.assertRenderQueries(0, '<p>{{ request.path }}</p>')
+
+    def test_theme_loaded_once_per_render(self):
+        output = self.assertRenderQueries(
+            1, '{{ theme_settings.primary_color }} {{ theme_settings.secondary_color }}'
+        )
+        self.assertEqual(output, '#112233 #6c757d')
+
+    def test_cached_theme_costs_nothing(self):
+        self.render_with_queries('{{ theme_settings.primary_color }}')
+        self.assertRenderQueries(0, '{{ theme_settings.primary_color }}')
+
+    def test_shared_entry_expires(self):
+        # Other processes' copies can't be dropped by invalidate(), so they have to age out
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_theme_settings()
+        self.assertEqual(cache_set.call_args.args[2], THEME_TIMEOUT)
@@ -1,63 +1,125 @@
 document.addEventListener('DOMContentLoaded', function() {
-    // Auto-refresh notification and message badges in navbar
+    function setNotificationBadge(count) {
+        const notificationBadge = document.querySelector('.notification-badge');
+        if (count > 0) {
+            if (notificationBadge) {
+                notificationBadge.textContent = count;
+                notificationBadge.style.display = 'inline';
+            } else {
+                // Create badge if it doesn't exist
+                const notificationIcon = document.querySelector('.notification-icon');
+                if (notificationIcon) {
+                    const badge = document.createElement('span');
+                    badge.className = 'notification-badge';
+                    badge.textContent = count;
+                    notificationIcon.appendChild(badge);
+                }
+            }
+        } else {
+            if (notificationBadge) {
+                notificationBadge.style.display = 'none';
+            }
+        }
+    }
+
+    function setMessageBadge(count) {
+        const messageBadgeNav = document.querySelector('.message-icon .message-badge');
+        if (count > 0) {
+            if (messageBadgeNav) {
+                messageBadgeNav.textContent = count;
+                messageBadgeNav.style.display = 'inline';
+            } else {
+                // Create badge if it doesn't exist
+                const messageIcon = document.querySelector('.message-icon');
+                if (messageIcon) {
+                    const badge = document.createElement('span');
+                    badge.className = 'message-badge';
+                    badge.textContent = count;
+                    messageIcon.appendChild(badge);
+                }
+            }
+        } else {
+            if (messageBadgeNav) {
+                messageBadgeNav.style.display = 'none';
+            }
+        }
+    }
+
+    // Fallback: refresh notification and message badges in navbar over HTTP
     function updateNavbarBadges() {
         // Update notification badge
         fetch('/ajax/unread_notifications_count/')
             .then(response => response.json())
-            .then(data => {
-                const notificationBadge = document.querySelector('.notification-badge');
-                if (data.unread_count > 0) {
-                    if (notificationBadge) {
-                        notificationBadge.textContent = data.unread_count;
-                        notificationBadge.style.display = 'inline';
-                    } else {
-                        // Create badge if it doesn't exist
-                        const notificationIcon = document.querySelector('.notification-icon');
-                        if (notificationIcon) {
-                            const badge = document.createElement('span');
-                            badge.className = 'notification-badge';
-                            badge.textContent = data.unread_count;
-                            notificationIcon.appendChild(badge);
-                        }
-                    }
-                } else {
-                    if (notificationBadge) {
-                        notificationBadge.style.display = 'none';
-                    }
-                }
-            })
+            .then(data => setNotificationBadge(data.unread_count))
             .catch(error => console.error('Error fetching notifications:', error));
 
         // Update message badge
-        fetch('/ajax/unread_messages_count/')
+        fetch('/ajax/unread_messages_count/?senders=0')
             .then(response => response.json())
-            .then(data => {
-                const messageBadgeNav = document.querySelector('.message-icon .message-badge');
-                if (data.unread_count > 0) {
-                    if (messageBadgeNav) {
-                        messageBadgeNav.textContent = data.unread_count;
-                        messageBadgeNav.style.display = 'inline';
-                    } else {
-                        // Create badge if it doesn't exist
-                        const messageIcon = document.querySelector('.message-icon');
-                        if (messageIcon) {
-                            const badge = document.createElement('span');
-                            badge.className = 'message-badge';
-                            badge.textContent = data.unread_count;
-                            messageIcon.appendChild(badge);
-                        }
-                    }
-                } else {
-                    if (messageBadgeNav) {
-                        messageBadgeNav.style.display = 'none';
-                    }
-                }
-            })
+            .then(data => setMessageBadge(data.unread_count))
             .catch(error => console.error('Error fetching messages:', error));
     }
 
-    // Update badges every 5 seconds
-    setInterval(updateNavbarBadges, 5000);
+    // Live updates are pushed over a WebSocket. Polling only runs while the
+    // socket is down (server without WebSocket support, network drop, ...).
+    const socketHandlers = [];
+    let socketOpen = false;
+    let reconnectDelay = 1000;
+    let notificationCount = 0;
+
+    function onSocketEvent(handler) {
+        socketHandlers.push(handler);
+    }
+
+    function connectSocket() {
+        if (!('WebSocket' in window) || document.body.dataset.authenticated !== 'true') {
+            return;
+        }
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${scheme}://${window.location.host}/ws/chat/`);
+
+        let pingTimer = null;
+
+        socket.addEventListener('open', function() {
+            socketOpen = true;
+            reconnectDelay = 1000;
+            // Keeps this user shown as online while the tab stays open
+            pingTimer = setInterval(() => socket.send(JSON.stringify({ type: 'ping' })), 60000);
+        });
+
+        socket.addEventListener('message', function(event) {
+            const data = JSON.parse(event.data);
+            socketHandlers.forEach(handler => handler(data));
+        });
+
+        socket.addEventListener('close', function() {
+            socketOpen = false;
+            clearInterval(pingTimer);
+            // Back off up to a minute between reconnect attempts
+            setTimeout(connectSocket, reconnectDelay);
+            reconnectDelay = Math.min(reconnectDelay * 2, 60000);
+        });
+    }
+
+    onSocketEvent(function(data) {
+        if (data.type === 'badges') {
+            notificationCount = data.unread_notifications;
+            setNotificationBadge(data.unread_notifications);
+            setMessageBadge(data.unread_messages);
+        } else if (data.type === 'notification') {
+            notificationCount += 1;
+            setNotificationBadge(notificationCount);
+        }
+    });
+
+    connectSocket();
+
+    // Update badges every 5 seconds while the socket is unavailable
+    setInterval(function() {
+        if (!socketOpen) {
+            updateNavbarBadges();
+        }
+    }, 5000);
     // Initial update
     updateNavbarBadges();
 
@@ -112,107 +174,198 @@ document.addEventListener('DOMContentLoaded', function() {
         }
 
         if (chatWindow && messageInput && sendMessageBtn) {
-            function loadMessages(userId) {
-                fetch(`/ajax/messages/${userId}/`)
+            // Cursor state for the open conversation
+            let newestId = null;
+            let oldestId = null;
+            let hasOlder = false;
+            let serverTime = null;
+            let loadingOlder = false;
+
+            function buildMessageElement(message) {
+                const messageElement = document.createElement('div');
+                messageElement.classList.add('message');
+                messageElement.dataset.messageId = message.id;
+
+                const isSent = message.sender === currentUserUsername;
+                messageElement.classList.add(isSent ? 'sent' : 'received');
+
+                const p = document.createElement('p');
+                p.textContent = message.content;
+                const small = document.createElement('small');
+                small.textContent = new Date(message.created_at).toLocaleString();
+                messageElement.append(p, small);
+
+                if (isSent) {
+                    messageElement.insertAdjacentHTML('beforeend', `
+                        <div class="message-actions">
+                            <div class="dots-menu">...</div>
+                            <div class="actions-dropdown">
+                                <a href="#" class="edit-btn">Edit</a>
+                                <a href="#" class="unsend-btn">Unsend</a>
+                            </div>
+                        </div>
+                    `);
+                }
+                return messageElement;
+            }
+
+            // Insert a new message or replace an edited one, keeping id order
+            function upsertMessage(message, prepend) {
+                const element = buildMessageElement(message);
+                const existing = chatMessages.querySelector(`[data-message-id="${message.id}"]`);
+                if (existing) {
+                    existing.replaceWith(element);
+                    return;
+                }
+                if (prepend) {
+                    chatMessages.prepend(element);
+                } else {
+                    chatMessages.appendChild(element);
+                }
+                if (newestId === null || message.id > newestId) {
+                    newestId = message.id;
+                }
+                if (oldestId === null || message.id < oldestId) {
+                    oldestId = message.id;
+                }
+            }
+
+            function fetchMessages(userId, params) {
+                const query = new URLSearchParams(params).toString();
+                return fetch(`/ajax/messages/${userId}/${query ? '?' + query : ''}`)
                     .then(response => response.json())
                     .then(data => {
-                        chatMessages.innerHTML = '';
-                        data.messages.forEach(message => {
-                            const messageElement = document.createElement('div');
-                            messageElement.classList.add('message');
-                            messageElement.dataset.messageId = message.id;
-
-                            if (message.sender === currentUserUsername) {
-                                messageElement.classList.add('sent');
-                            } else {
-                                messageElement.classList.add('received');
-                            }
-
-                            let messageHTML = `<p>${message.content}</p><small>${new Date(message.created_at).toLocaleString()}</small>`;
-
-                            if (message.sender === currentUserUsername) {
-                                messageHTML += `
-                                    <div class="message-actions">
-                                        <div class="dots-menu">...</div>
-                                        <div class="actions-dropdown">
-                                            <a href="#" class="edit-btn">Edit</a>
-                                            <a href="#" class="unsend-btn">Unsend</a>
-                                        </div>
-                                    </div>
-                                `;
-                            }
+                        serverTime = data.server_time;
+                        return data;
+                    });
+            }
 
-                            messageElement.innerHTML = messageHTML;
-                            chatMessages.appendChild(messageElement);
-                        });
+            // Open a conversation with its most recent page of messages
+            function loadMessages(userId) {
+                newestId = null;
+                oldestId = null;
+                fetchMessages(userId, {})
+                    .then(data => {
+                        chatMessages.innerHTML = '';
+                        hasOlder = data.has_more;
+                        data.messages.forEach(message => upsertMessage(message));
                         chatWindow.style.display = 'block';
                         chatMessages.scrollTop = chatMessages.scrollHeight;
 
-                        // Add event listeners for message actions
-                        addMessageActionListeners();
-                        
-                        // Mark messages as read
-                        markMessagesAsRead(userId);
+                        // Mark messages as read. get_messages already did that on the
+                        // server, and over the socket the new counts are pushed to us.
+                        if (!socketOpen) {
+                            markMessagesAsRead(userId);
+                        }
                     });
             }
 
-            function addMessageActionListeners() {
-                chatMessages.querySelectorAll('.dots-menu').forEach(menu => {
-                    menu.addEventListener('click', function(event) {
-                        event.stopPropagation();
-                        const dropdown = this.nextElementSibling;
-                        dropdown.style.display = dropdown.style.display === 'block' ? 'none' : 'block';
+            // Fetch only what changed since the last sync
+            function syncMessages(userId) {
+                if (newestId === null) {
+                    loadMessages(userId);
+                    return;
+                }
+                fetchMessages(userId, { after_id: newestId, since: serverTime })
+                    .then(data => {
+                        if (String(userId) !== String(selectedUserId)) {
+                            return;
+                        }
+                        const atBottom = chatMessages.scrollTop + chatMessages.clientHeight >= chatMessages.scrollHeight - 10;
+                        data.messages.forEach(message => upsertMessage(message));
+                        if (atBottom) {
+                            chatMessages.scrollTop = chatMessages.scrollHeight;
+                        }
+                        if (data.has_more) {
+                            syncMessages(userId);
+                        }
                     });
-                });
-
-                chatMessages.querySelectorAll('.edit-btn').forEach(btn => {
-                    btn.addEventListener('click', function(event) {
-                        event.preventDefault();
-                        const messageElement = this.closest('.message');
-                        const messageId = messageElement.dataset.messageId;
-                        const p = messageElement.querySelector('p');
-                        const currentContent = p.textContent;
-                        
-                        const input = document.createElement('input');
-                        input.type = 'text';
-                        input.value = currentContent;
-                        
-                        p.replaceWith(input);
-                        input.focus();
-
-                        input.addEventListener('blur', function() {
-                            const newContent = this.value;
-                            if (newContent.trim() !== '' && newContent !== currentContent) {
-                                editMessage(messageId, newContent);
-                            } else {
-                                p.textContent = currentContent;
-                                input.replaceWith(p);
-                            }
-                        });
+            }
 
-                        input.addEventListener('keypress', function(e) {
-                            if (e.key === 'Enter') {
-                                this.blur();
-                            }
-                        });
+            function loadOlderMessages() {
+                if (!hasOlder || loadingOlder || oldestId === null) {
+                    return;
+                }
+                loadingOlder = true;
+                const userId = selectedUserId;
+                fetchMessages(userId, { before_id: oldestId })
+                    .then(data => {
+                        if (String(userId) !== String(selectedUserId)) {
+                            return;
+                        }
+                        const previousHeight = chatMessages.scrollHeight;
+                        hasOlder = data.has_more;
+                        data.messages.slice().reverse().forEach(message => upsertMessage(message, true));
+                        // Keep the view anchored where the user was reading
+                        chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+                    })
+                    .finally(() => {
+                        loadingOlder = false;
                     });
-                });
+            }
+
+            chatMessages.addEventListener('scroll', function() {
+                if (chatMessages.scrollTop < 50) {
+                    loadOlderMessages();
+                }
+            });
+
+            // Message actions are delegated so newly synced messages need no extra wiring
+            chatMessages.addEventListener('click', function(event) {
+                const menu = event.target.closest('.dots-menu');
+                if (menu) {
+                    event.stopPropagation();
+                    const dropdown = menu.nextElementSibling;
+                    dropdown.style.display = dropdown.style.display === 'block' ? 'none' : 'block';
+                    return;
+                }
 
-                chatMessages.querySelectorAll('.unsend-btn').forEach(btn => {
-                    btn.addEventListener('click', function(event) {
-                        event.preventDefault();
-                        const messageElement = this.closest('.message');
-                        const messageId = messageElement.dataset.messageId;
-                        unsendMessage(messageId);
+                const editBtn = event.target.closest('.edit-btn');
+                if (editBtn) {
+                    event.preventDefault();
+                    const messageElement = editBtn.closest('.message');
+                    const messageId = messageElement.dataset.messageId;
+                    const p = messageElement.querySelector('p');
+                    const currentContent = p.textContent;
+
+                    const input = document.createElement('input');
+                    input.type = 'text';
+                    input.value = currentContent;
+
+                    p.replaceWith(input);
+                    input.focus();
+
+                    input.addEventListener('blur', function() {
+                        const newContent = this.value;
+                        if (newContent.trim() !== '' && newContent !== currentContent) {
+                            editMessage(messageId, newContent);
+                        } else {
+                            p.textContent = currentContent;
+                            input.replaceWith(p);
+                        }
                     });
-                });
 
-                document.addEventListener('click', function() {
-                    chatMessages.querySelectorAll('.actions-dropdown').forEach(dropdown => {
-                        dropdown.style.display = 'none';
+                    input.addEventListener('keypress', function(e) {
+                        if (e.key === 'Enter') {
+                            this.blur();
+                        }
                     });
+                    return;
+                }
+
+                const unsendBtn = event.target.closest('.unsend-btn');
+                if (unsendBtn) {
+                    event.preventDefault();
+                    const messageElement = unsendBtn.closest('.message');
+                    unsendMessage(messageElement.dataset.messageId);
+                }
+            });
+
+            document.addEventListener('click', function() {
+                chatMessages.querySelectorAll('.actions-dropdown').forEach(dropdown => {
+                    dropdown.style.display = 'none';
                 });
-            }
+            });
 
             function editMessage(messageId, newContent) {
                 fetch(`/ajax/edit_message/${messageId}/`, {
@@ -225,8 +378,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
                 .then(response => response.json())
                 .then(data => {
-                    if (data.status === 'Message edited') {
-                        loadMessages(selectedUserId);
+                    // With a live socket the 'edited' event updates the message
+                    if (data.status === 'Message edited' && !socketOpen) {
+                        syncMessages(selectedUserId);
                     }
                 });
             }
@@ -241,8 +395,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
                 .then(response => response.json())
                 .then(data => {
-                    if (data.status === 'Message unsent') {
-                        loadMessages(selectedUserId);
+                    if (data.status === 'Message unsent' && !socketOpen) {
+                        syncMessages(selectedUserId);
                     }
                 });
             }
@@ -255,8 +409,11 @@ document.addEventListener('DOMContentLoaded', function() {
                         'X-CSRFToken': getCookie('csrftoken')
                     }
                 }).then(() => {
-                    // After marking messages as read, check for new messages again to update the UI
-                    checkForNewMessages();
+                    // After marking messages as read, check for new messages again to update the UI.
+                    // Over the socket the server pushes the new counts instead.
+                    if (!socketOpen) {
+                        checkForNewMessages();
+                    }
                 });
             }
 
@@ -276,30 +433,7 @@ document.addEventListener('DOMContentLoaded', function() {
                             }
                         }
 
-                        // Reset all user badges first
-                        const userItems = userList.querySelectorAll('.list-group-item');
-                        userItems.forEach(item => {
-                            const badge = item.querySelector('.badge.bg-success');
-                            if (badge) {
-                                badge.style.display = 'none';
-                                badge.textContent = '';
-                            }
-                        });
-
-                        // Update individual user unread counts
-                        if (data.unread_senders) {
-                            for (const senderId in data.unread_senders) {
-                                const userItem = userList.querySelector(`[data-user-id="${senderId}"]`);
-                                if (userItem) {
-                                    const badge = userItem.querySelector('.badge.bg-success');
-                                    const unreadCount = data.unread_senders[senderId];
-                                    if (badge && unreadCount > 0) {
-                                        badge.textContent = unreadCount;
-                                        badge.style.display = 'inline';
-                                    }
-                                }
-                            }
-                        }
+                        updateUserBadges(data.unread_senders || {});
                     })
                     .catch(error => console.error('Error fetching unread messages:', error));
             }
@@ -325,7 +459,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 .then(data => {
                     if (data.status === 'Message sent') {
                         messageInput.value = '';
-                        loadMessages(selectedUserId);
+                        if (!socketOpen) {
+                            syncMessages(selectedUserId);
+                        }
                     }
                 });
             }
@@ -342,12 +478,79 @@ document.addEventListener('DOMContentLoaded', function() {
                 });
             }
 
-            // Periodically check for new messages and reload active conversation
+            function updateUserBadges(unreadSenders) {
+                // Reset all user badges first
+                const userItems = userList.querySelectorAll('.list-group-item');
+                userItems.forEach(item => {
+                    const badge = item.querySelector('.badge.bg-success');
+                    if (badge) {
+                        badge.style.display = 'none';
+                        badge.textContent = '';
+                    }
+                });
+
+                // Update individual user unread counts
+                for (const senderId in unreadSenders) {
+                    const userItem = userList.querySelector(`[data-user-id="${senderId}"]`);
+                    if (userItem) {
+                        const badge = userItem.querySelector('.badge.bg-success');
+                        const unreadCount = unreadSenders[senderId];
+                        if (badge && unreadCount > 0) {
+                            badge.textContent = unreadCount;
+                            badge.style.display = 'inline';
+                        }
+                    }
+                }
+            }
+
+            function setOnline(userId, online) {
+                const userItem = userList.querySelector(`[data-user-id="${userId}"]`);
+                if (!userItem) {
+                    return;
+                }
+                let indicator = userItem.querySelector('.online-indicator');
+                if (online && !indicator) {
+                    indicator = document.createElement('span');
+                    indicator.className = 'online-indicator';
+                    userItem.appendChild(indicator);
+                } else if (!online && indicator) {
+                    indicator.remove();
+                }
+            }
+
+            onSocketEvent(function(data) {
+                if (data.type === 'badges') {
+                    updateUserBadges(data.unread_senders || {});
+                } else if (data.type === 'presence') {
+                    setOnline(data.user_id, data.online);
+                } else if (data.type === 'message' && selectedUserId) {
+                    // The event carries the message itself, so the open conversation
+                    // is updated without another request
+                    const incoming = String(data.message.sender_id) !== String(currentUserId);
+                    const otherUserId = incoming ? data.message.sender_id : data.message.receiver_id;
+                    if (String(otherUserId) === String(selectedUserId) && newestId !== null) {
+                        const atBottom = chatMessages.scrollTop + chatMessages.clientHeight >= chatMessages.scrollHeight - 10;
+                        upsertMessage(data.message);
+                        if (atBottom) {
+                            chatMessages.scrollTop = chatMessages.scrollHeight;
+                        }
+                        if (incoming && data.action === 'created') {
+                            markMessagesAsRead(selectedUserId);
+                        }
+                    }
+                }
+            });
+
+            // Fallback polling while the socket is down: check for new messages
+            // and reload the active conversation
             setInterval(function() {
+                if (socketOpen) {
+                    return;
+                }
                 checkForNewMessages();
-                // Auto-refresh active conversation if one is selected
+                // Pull changes to the active conversation if one is selected
                 if (selectedUserId) {
-                    loadMessages(selectedUserId);
+                    syncMessages(selectedUserId);
                 }
             }, 3000); // Refresh every 3 seconds
 